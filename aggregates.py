@@ -0,0 +1,102 @@
+# Arquivo: aggregates.py
+# Agregados materializados por continente (mais "Todos") usados pelos dashboards:
+# KPIs da previsão e a ordem do ranking de CAGR já ordenada nos dois sentidos.
+# O ETL grava a tabela em Parquet; os apps fazem apenas uma busca por continente
+# e um fatiamento das listas, sem max/idxmax/nlargest a cada rerun.
+import numpy as np
+import pandas as pd
+
+ALL_CONTINENTS = "Todos"
+KPI_DEFAULTS = {"max_gdp": 0.0, "top_gdp_country": "N/A", "avg_gdp": 0.0, "top_cagr_country": "N/A",
+                "max_cagr_val": 0.0}
+
+
+def _continent_record(continent, df):
+    """KPIs e ordens de ranking de um recorte da previsão."""
+    record = {"Continent": continent, **KPI_DEFAULTS}
+
+    gdp = df["GDP_per_capita"].dropna()
+    if not gdp.empty:
+        record["max_gdp"] = float(gdp.max())
+        record["top_gdp_country"] = df.at[gdp.idxmax(), "Country"]
+        record["avg_gdp"] = float(gdp.mean())
+
+    ranked = df.dropna(subset=["CAGR"])
+    if not ranked.empty:
+        top_row = ranked.loc[ranked["CAGR"].idxmax()]
+        record["top_cagr_country"] = top_row["Country"]
+        record["max_cagr_val"] = float(top_row["CAGR"])
+
+    # Ordenações estáveis: empates ficam na mesma ordem que nlargest/nsmallest(keep="first")
+    desc = ranked.sort_values("CAGR", ascending=False, kind="stable")
+    asc = ranked.sort_values("CAGR", ascending=True, kind="stable")
+    record["n_rank"] = int(ranked["Country"].nunique())
+    record["rank_desc_country"] = desc["Country"].tolist()
+    record["rank_desc_cagr"] = desc["CAGR"].astype("float64").tolist()
+    record["rank_asc_country"] = asc["Country"].tolist()
+    record["rank_asc_cagr"] = asc["CAGR"].astype("float64").tolist()
+    return record
+
+
+def record_from_arrays(continent, countries, gdp, cagr):
+    """
+    O mesmo registro de `_continent_record` a partir de vetores NumPy alinhados
+    (país, PIB, CAGR), com argmax/argsort: usado pelos cenários e pelos anos da
+    previsão, que recalculam registros sem montar DataFrames.
+    """
+    record = {"Continent": continent, **KPI_DEFAULTS}
+
+    has_gdp = ~np.isnan(gdp)
+    if has_gdp.any():
+        top = int(np.nanargmax(gdp))  # primeira ocorrência, como idxmax
+        record["max_gdp"] = float(gdp[top])
+        record["top_gdp_country"] = countries[top]
+        record["avg_gdp"] = float(gdp[has_gdp].mean())
+
+    ranked = np.flatnonzero(~np.isnan(cagr))
+    desc = ranked[np.argsort(-cagr[ranked], kind="stable")]
+    asc = ranked[np.argsort(cagr[ranked], kind="stable")]
+    if len(ranked):
+        record["top_cagr_country"] = countries[desc[0]]
+        record["max_cagr_val"] = float(cagr[desc[0]])
+    record["n_rank"] = len(set(countries[ranked]))
+    record["rank_desc_country"] = countries[desc].tolist()
+    record["rank_desc_cagr"] = cagr[desc].tolist()
+    record["rank_asc_country"] = countries[asc].tolist()
+    record["rank_asc_cagr"] = cagr[asc].tolist()
+    return record
+
+
+def build_aggregates(df_fc: pd.DataFrame) -> pd.DataFrame:
+    """
+    Constrói a tabela de agregados a partir das linhas de previsão do ano-alvo.
+    Retorna uma linha por continente, mais a linha "Todos".
+    """
+    df_fc = df_fc.reset_index(drop=True)
+    records = [_continent_record(ALL_CONTINENTS, df_fc)]
+    for continent, df_cont in df_fc.groupby("Continent", sort=True):
+        records.append(_continent_record(continent, df_cont))
+    return pd.DataFrame.from_records(records)
+
+
+def aggregates_to_dict(df_agg: pd.DataFrame) -> dict:
+    """Indexa a tabela por continente para buscas O(1)."""
+    return {row["Continent"]: row for row in df_agg.to_dict("records")}
+
+
+def lookup(aggregates: dict, continent: str) -> dict:
+    """Registro do continente; devolve um registro vazio se não houver dados."""
+    record = aggregates.get(continent)
+    if record is None:
+        record = {"Continent": continent, **KPI_DEFAULTS, "n_rank": 0,
+                  "rank_desc_country": [], "rank_desc_cagr": [], "rank_asc_country": [], "rank_asc_cagr": []}
+    return record
+
+
+def rank_slice(record: dict, n: int, largest: bool = True) -> pd.DataFrame:
+    """Os `n` maiores (ou menores) CAGR do continente, na ordem do ranking."""
+    order = "desc" if largest else "asc"
+    return pd.DataFrame({
+        "Country": list(record[f"rank_{order}_country"][:n]),
+        "CAGR": list(record[f"rank_{order}_cagr"][:n]),
+    })
@@ -1,11 +1,34 @@
 # Arquivo: app.py
+# Plotly (graph_objects/express) e st_aggrid são importados dentro das funções que os
+# usam, e os templates do Plotly só são registrados ao construir a primeira figura:
+# o título e os KPIs chegam ao navegador antes dessas importações. Perfil de
+# inicialização sob demanda: ?profile=1 na URL ou DASHBOARD_PROFILE=1 (ver startup_profile.py).
+#
+# Só a aba aberta é executada (st.tabs com on_change="rerun") e cada aba é um
+# fragmento: mudar um widget da aba reexecuta apenas ela, não as demais.
+# Spans dos caminhos quentes (dados, filtros, KPIs, figuras, tabela, exportação) sob
+# demanda com DASHBOARD_TRACE=1 (ver tracing.py).
+from startup_profile import RunProfile, track_cost
+
+PROFILE = RunProfile.start()
+
 import streamlit as st
 from pathlib import Path
 import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
 import numpy as np
-from st_aggrid import AgGrid, GridOptionsBuilder
+
+from aggregates import aggregates_to_dict, build_aggregates, lookup, rank_slice
+from data_store import DashboardStore, open_dataset
+from detail_grid import PagedFrame, render_detail_grid
+from exports import render_export
+from figure_cache import FigureCache, content_hash
+from formatting import CAGR_LABEL, GDP_LABEL, with_labels
+from geometry_cache import choropleth_geometry
+from scenarios import engine_for, render_scenario_controls
+from tracing import set_selection, span
+from year_frames import add_year_frames, cube_for
+
+PROFILE.mark("importações")
 
 # --- CONSTANTES GLOBAIS ---
 ROOT = Path(__file__).resolve().parent
@@ -33,8 +56,10 @@ st.markdown(f"<style>{load_css('assets/custom.css')}</style>", unsafe_allow_html
 
 
 # ─── 2) CONFIGURAÇÃO DO PLOTLY ────────────────────────────────────
+@st.cache_resource
 def register_plotly_templates():
-    """Define e registra templates customizados para Plotly."""
+    """Define e registra templates customizados para Plotly (uma vez por processo, na primeira figura)."""
+    import plotly.graph_objects as go
     import plotly.io as pio
     colorway = ['#00BCD4', '#E91E63', '#4CAF50', '#FFC107', '#FF5722', '#9C27B0']
 
@@ -57,44 +82,77 @@ def register_plotly_templates():
     pio.templates.default = "custom_dark_base"
 
 
-register_plotly_templates()
+# ─── 3) CARREGAMENTO DE DADOS (OTIMIZADO) ───────────────────────
+# O ETL grava um dataset Parquet particionado (Type/Continent) ordenado por País/Ano.
+# Os dados são lidos uma única vez por processo, com os filtros empurrados para o
+# Parquet, e ficam num armazém somente leitura compartilhado por todas as sessões:
+# cada rerun recebe visões dele, sem cópias (ver `data_store.py`).
+AGGREGATES_FILE = "data/dashboard_aggregates.parquet"
 
 
-# ─── 3) CARREGAMENTO DE DADOS (OTIMIZADO) ───────────────────────
-@st.cache_data
-def load_data(file_path):
-    """Carrega dados pré-processados de um único arquivo Parquet."""
-    path = ROOT / file_path
-    if not path.exists():
-        st.error(f"Arquivo de dados '{file_path}' não encontrado. Execute o script `preprocess_data.py` primeiro.")
-        return None
+@st.cache_resource
+def get_store():
+    """Armazém de dados compartilhado pelo processo (somente leitura)."""
     try:
-        return pd.read_parquet(path)
+        dataset = open_dataset()
+        if dataset is None:
+            st.error("Arquivo de dados 'data/dashboard_data.parquet' não encontrado. "
+                     "Execute o script `preprocess_data.py` primeiro.")
+            return None
+        with span("dados: carga do armazém") as sp:
+            store = DashboardStore.from_dataset(dataset, FORECAST_YEAR)
+            sp.rows = len(store.forecast())
+        return store
     except Exception as e:
-        st.error(f"Erro ao ler o arquivo Parquet '{path}': {e}")
+        st.error(f"Erro ao ler os dados Parquet: {e}")
         return None
 
 
+@st.cache_resource
+def load_aggregates():
+    """KPIs e rankings por continente gerados pelo ETL (calculados aqui uma vez, se ausentes).
+    Compartilhado entre sessões e tratado como somente leitura."""
+    path = ROOT / AGGREGATES_FILE
+    try:
+        df_agg = pd.read_parquet(path) if path.exists() else None
+    except Exception as e:
+        st.warning(f"Erro ao ler '{AGGREGATES_FILE}', recalculando os agregados: {e}")
+        df_agg = None
+    if df_agg is None:
+        df_agg = build_aggregates(get_store().forecast())
+    return aggregates_to_dict(df_agg)
+
+
+@st.cache_resource
+def get_figure_cache():
+    """Cache LRU de figuras Plotly (JSON pré-serializado), compartilhado entre sessões."""
+    return FigureCache()
+
+
 # ─── 4) FUNÇÕES DE GERAÇÃO DE GRÁFICOS E COMPONENTES ──────────────
 def create_plotly_globe_map(df_map: pd.DataFrame):
     """Cria e retorna uma figura de globo interativo do Plotly."""
     if df_map is None or df_map.empty or 'ISO_Alpha3' not in df_map.columns:
         return None
+    import plotly.graph_objects as go
+    register_plotly_templates()
 
-    df_plot = df_map.dropna(subset=['ISO_Alpha3', 'GDP_per_capita']).copy()
+    df_plot = df_map.dropna(subset=['ISO_Alpha3', 'GDP_per_capita'])
     if df_plot.empty:
         return None
 
-    df_plot['GDP_log'] = np.log1p(df_plot['GDP_per_capita'])
-    df_plot['CAGR_hover'] = df_plot['CAGR'].apply(lambda x: f"{x:.2%}" if pd.notna(x) else "N/A")
+    if CAGR_LABEL not in df_plot.columns:
+        df_plot = with_labels(df_plot)
+    gdp_log = np.log1p(df_plot['GDP_per_capita'])
 
     fig = go.Figure(data=go.Choropleth(
         locations=df_plot['ISO_Alpha3'],
-        z=df_plot['GDP_log'],
-        customdata=df_plot[['Country', 'GDP_per_capita', 'CAGR_hover']],
+        **choropleth_geometry(df_plot['ISO_Alpha3']),
+        z=gdp_log,
+        customdata=df_plot[['Country', GDP_LABEL, CAGR_LABEL]],
         hovertemplate=(
             "<b>%{customdata[0]}</b><br><br>"
-            f"PIB per Capita ({FORECAST_YEAR}): $%{{customdata[1]:,.0f}}<br>"
+            f"PIB per Capita ({FORECAST_YEAR}): %{{customdata[1]}}<br>"
             f"CAGR (até {FORECAST_YEAR}): %{{customdata[2]}}"
             "<extra></extra>"
         ),
@@ -112,35 +170,18 @@ def create_plotly_globe_map(df_map: pd.DataFrame):
     return fig
 
 
-def calculate_kpis(df: pd.DataFrame):
-    """Calcula os KPIs (Key Performance Indicators) a partir do DataFrame de previsão."""
-    if df is None or df.empty:
-        return {"max_gdp": 0, "top_gdp_country": "N/A", "avg_gdp": 0, "top_cagr_country": "N/A", "max_cagr_val": 0}
-
-    kpis = {}
-    kpis["max_gdp"] = df["GDP_per_capita"].max()
-    kpis["top_gdp_country"] = df.loc[df["GDP_per_capita"].idxmax()]["Country"] if not df.empty else "N/A"
-    kpis["avg_gdp"] = df["GDP_per_capita"].mean()
-
-    if "CAGR" in df.columns and df["CAGR"].notna().any():
-        max_cagr_row = df.loc[df["CAGR"].idxmax()]
-        kpis["top_cagr_country"] = max_cagr_row["Country"]
-        kpis["max_cagr_val"] = max_cagr_row["CAGR"]
-    else:
-        kpis["top_cagr_country"] = "N/A"
-        kpis["max_cagr_val"] = 0
-    return kpis
+def calculate_kpis(aggregates: dict, selected_continent: str):
+    """Retorna os KPIs (Key Performance Indicators) pré-calculados do continente selecionado."""
+    record = lookup(aggregates, selected_continent)
+    return {key: record[key] for key in ("max_gdp", "top_gdp_country", "avg_gdp", "top_cagr_country", "max_cagr_val")}
 
 
-def display_timeseries_tab(df_ts: pd.DataFrame, selected_continent: str):
+@st.fragment
+@track_cost("aba: série temporal")
+def display_timeseries_tab(selected_continent: str):
     st.subheader("Série Temporal: Histórico vs. Previsão")
-    df_plot = df_ts if selected_continent == "Todos" else df_ts[df_ts["Continent"] == selected_continent]
-
-    if df_plot.empty:
-        st.info(f"Nenhum dado de série temporal disponível para '{selected_continent}'.")
-        return
-
-    countries_available = sorted(df_plot["Country"].dropna().unique())
+    store = get_store()
+    countries_available = store.countries(selected_continent)
     if not countries_available:
         st.info(f"Nenhum país com dados disponíveis para '{selected_continent}'.")
         return
@@ -152,124 +193,197 @@ def display_timeseries_tab(df_ts: pd.DataFrame, selected_continent: str):
     )
 
     if sel_ct:
-        df_chart = df_plot[df_plot["Country"].isin(sel_ct)].sort_values(by=['Country', 'Type', 'Year'])
-        fig = px.line(
-            df_chart, x="Year", y="GDP_per_capita", color="Country", line_dash="Type", markers=True,
-            labels={"GDP_per_capita": "PIB per Capita (USD)", "Year": "Ano", "Country": "País", "Type": "Tipo"}
-        )
-        fig.update_layout(yaxis_tickformat="$,.0f")
+        with span("filtro: países da série temporal") as sp:
+            df_chart = store.country_rows(selected_continent, sel_ct)
+            sp.rows = len(df_chart)
+
+        def build():
+            import plotly.express as px
+            register_plotly_templates()
+            fig = px.line(
+                df_chart, x="Year", y="GDP_per_capita", color="Country", line_dash="Type", markers=True,
+                labels={"GDP_per_capita": "PIB per Capita (USD)", "Year": "Ano", "Country": "País", "Type": "Tipo"}
+            )
+            fig.update_layout(yaxis_tickformat="$,.0f")
+            return fig
+
+        with span("figura: série temporal", rows=len(df_chart)):
+            key = content_hash("timeseries", selected_continent, tuple(sel_ct), df_chart)
+            fig = get_figure_cache().get_figure(key, build)
         st.plotly_chart(fig, use_container_width=True)
     else:
         st.info("Selecione um ou mais países para visualizar o gráfico.")
 
 
-def display_ranking_tab(df_fc: pd.DataFrame, selected_continent: str):
+@st.fragment
+@track_cost("aba: ranking")
+def display_ranking_tab(aggregates: dict, selected_continent: str):
     st.subheader("Top/Bottom CAGR Previsto")
-    df_rank = df_fc if selected_continent == "Todos" else df_fc[df_fc["Continent"] == selected_continent]
-    df_rank = df_rank.dropna(subset=['CAGR'])
+    record = lookup(aggregates, selected_continent)
 
-    if df_rank.empty:
+    if record["n_rank"] == 0:
         st.info("Não há dados de CAGR para exibir um ranking com os filtros atuais.")
         return
 
-    n_countries = min(20, df_rank['Country'].nunique())
+    n_countries = min(20, record["n_rank"])
     n = st.slider(
         "Número de países para ranking:", min_value=1, max_value=n_countries,
         value=min(10, n_countries), key="ranking_slider"
     ) if n_countries > 1 else 1
 
+    def ranking_figure(data, color_scale):
+        def build():
+            import plotly.express as px
+            register_plotly_templates()
+            fig = px.bar(data, x="CAGR", y="Country", orientation="h", color="CAGR",
+                         color_continuous_scale=color_scale, labels={"CAGR": "CAGR (%)", "Country": ""})
+            fig.update_layout(xaxis_tickformat=".2%");
+            return fig
+        with span("figura: ranking", rows=len(data)):
+            return get_figure_cache().get_figure(content_hash("ranking", selected_continent, n, color_scale, data),
+                                                 build)
+
     col_top, col_bot = st.columns(2)
     with col_top:
         st.markdown("##### Top Maiores Crescimentos (CAGR)")
-        top_data = df_rank.nlargest(n, "CAGR").sort_values("CAGR", ascending=True)
-        fig = px.bar(top_data, x="CAGR", y="Country", orientation="h", color="CAGR",
-                     color_continuous_scale=px.colors.sequential.Viridis,
-                     labels={"CAGR": "CAGR (%)", "Country": ""})
-        fig.update_layout(xaxis_tickformat=".2%");
-        st.plotly_chart(fig, use_container_width=True)
+        top_data = rank_slice(record, n, largest=True).iloc[::-1]
+        st.plotly_chart(ranking_figure(top_data, "Viridis"), use_container_width=True)
     with col_bot:
         st.markdown("##### Bottom Menores Crescimentos (CAGR)")
-        bot_data = df_rank.nsmallest(n, "CAGR").sort_values("CAGR", ascending=False)
-        fig = px.bar(bot_data, x="CAGR", y="Country", orientation="h", color="CAGR",
-                     color_continuous_scale=px.colors.sequential.Plasma_r,
-                     labels={"CAGR": "CAGR (%)", "Country": ""})
-        fig.update_layout(xaxis_tickformat=".2%");
-        st.plotly_chart(fig, use_container_width=True)
+        bot_data = rank_slice(record, n, largest=False).iloc[::-1]
+        st.plotly_chart(ranking_figure(bot_data, "Plasma_r"), use_container_width=True)
+
+
+@st.fragment
+@track_cost("aba: mapa")
+def display_globe_tab(df_fc_2030: pd.DataFrame, cube=None, year=FORECAST_YEAR):
+    if cube is None:
+        st.subheader(f"Visão Global do PIB per Capita ({FORECAST_YEAR}) - Globo Interativo")
+        with span("figura: globo", rows=len(df_fc_2030)):
+            fig_globe = get_figure_cache().get_figure(content_hash("globe", FORECAST_YEAR, df_fc_2030),
+                                                      lambda: create_plotly_globe_map(df_fc_2030))
+    else:
+        # Um quadro por ano na mesma figura: o slider do globo troca os anos no navegador (ver year_frames.py)
+        st.subheader(f"Visão Global do PIB per Capita ({cube.years[0]}–{cube.years[-1]}) - Globo Interativo")
+
+        def build_globe():
+            fig = create_plotly_globe_map(df_fc_2030)
+            return add_year_frames(fig, cube, year, np.log1p) if fig is not None else None
+
+        with span("figura: globo", rows=len(df_fc_2030), years=len(cube.years)):
+            fig_globe = get_figure_cache().get_figure(content_hash("globe_frames", year, cube.key), build_globe)
+    if fig_globe:
+        st.plotly_chart(fig_globe, use_container_width=True, config={'displayModeBar': False})
+    else:
+        st.warning(
+            "Não foi possível gerar o mapa globo. Verifique se os dados de previsão e os códigos ISO estão disponíveis.")
+
+
+@st.fragment
+@track_cost("aba: sobre o modelo")
+def display_model_tab():
+    st.subheader("Sobre o Modelo e Confiabilidade")
+    mae, r2, mse = 178.14, 0.9885, 937337
+    st.markdown(f"- **Modelo:** LSTM (Keras), otimizado com Optuna.\n"
+                f"- **Métricas (Teste):** MAE: ${mae:,.2f}, R²: {r2:.4f}, MSE: {mse:,.2f}\n"
+                "> **Nota:** Projeções de longo prazo são inerentemente incertas e devem ser "
+                "interpretadas como tendências e não como valores exatos.")
+
+
+@st.cache_resource
+def get_paged_frame():
+    """Ordens memorizadas da tabela detalhada, compartilhadas entre sessões (ver `detail_grid.py`)."""
+    return PagedFrame()
+
+
+@st.fragment
+@track_cost("tabela detalhada")
+def display_detail_grid(selected_continent: str):
+    # Só a página visível vai para a AgGrid; busca, ordenação e paginação são resolvidas no servidor
+    render_detail_grid(st, get_store().forecast(selected_continent), get_paged_frame(), cache_key=selected_continent)
 
 
 # ─── 5) FUNÇÃO PRINCIPAL (MAIN) ──────────────────────────────────
+@track_cost("script completo")
 def main():
-    df_full = load_data("data/dashboard_data.parquet")
-    if df_full is None:
+    store = get_store()
+    if store is None:
         st.stop()
-
-    df_fc_2030 = df_full[(df_full['Type'] == 'Forecast') & (df_full['Year'] == FORECAST_YEAR)].copy()
+    df_fc_2030 = store.forecast()
 
     st.title(f"🌐 Dashboard de Previsão do PIB per Capita Global {FORECAST_YEAR}")
     st.write(f"Análise histórica e projeções interativas do PIB per capita até {FORECAST_YEAR}.")
 
     st.sidebar.header("Filtros Globais 🌍")
-    continents = ["Todos"] + sorted(df_full["Continent"].dropna().unique())
+    continents = ["Todos"] + store.continents
     selected_continent = st.sidebar.selectbox("Selecione o Continente:", continents, key="sb_continent")
+    set_selection(st, continent=selected_continent)
+
+    with span("filtro: previsão do continente") as sp:
+        df_filtered_fc = store.forecast(selected_continent)
+        sp.rows = len(df_filtered_fc)
 
-    df_filtered_fc = df_fc_2030 if selected_continent == "Todos" else df_fc_2030[
-        df_fc_2030["Continent"] == selected_continent]
+    # Cenário "e se": KPIs, ranking e globo passam a usar os valores recalculados (ver scenarios.py)
+    with span("cenário"):
+        scenario = render_scenario_controls(st, engine_for(store, FORECAST_YEAR))
+    if scenario is not None:
+        df_fc_2030 = scenario.frame()
+
+    # Anos do horizonte: KPIs e ranking do ano escolhido, pré-calculados para todos os anos
+    cube = cube_for(store, FORECAST_YEAR)
+    selected_year = st.sidebar.select_slider("Ano da previsão:", options=cube.years.tolist(), value=FORECAST_YEAR,
+                                             key="sb_year")
 
     st.sidebar.markdown("---")
     st.sidebar.info("Dashboard desenvolvido por Douglas Souza.")
     st.sidebar.markdown("[Repositório GitHub](#) • [Perfil LinkedIn](#)")
 
-    kpis = calculate_kpis(df_filtered_fc)
+    with span("kpis"):
+        if selected_year != FORECAST_YEAR:
+            aggregates = cube.aggregates(selected_year)
+        else:
+            aggregates = load_aggregates() if scenario is None else scenario
+        kpis = calculate_kpis(aggregates, selected_continent)
     c1, c2, c3, c4 = st.columns(4)
-    c1.metric(f"Maior PIB/Cap ({FORECAST_YEAR})", f"${kpis['max_gdp']:,.0f}")
+    c1.metric(f"Maior PIB/Cap ({selected_year})", f"${kpis['max_gdp']:,.0f}")
     c2.metric("País Top PIB", kpis['top_gdp_country'])
     c3.metric(f"Média PIB/Cap ({selected_continent})", f"${kpis['avg_gdp']:,.0f}")
     c4.metric("Maior CAGR", f"{kpis['top_cagr_country']} ({kpis['max_cagr_val']:.2%})")
+    if scenario is not None and selected_year == FORECAST_YEAR:
+        st.caption("🧪 Cenário ativo: valores de KPIs, ranking e globo com os ajustes de CAGR da barra lateral.")
+    elif scenario is not None:
+        st.caption(f"🧪 O cenário ativo vale para {FORECAST_YEAR}: KPIs e ranking de {selected_year} sem ajustes.")
+    PROFILE.mark("primeiro conteúdo (título + KPIs)")
 
     st.markdown("---")
 
-    tab1, tab2, tab3, tab4 = st.tabs(["Série Temporal", "Ranking & CAGR", "Visão Global (Mapa)", "Sobre o Modelo"])
+    tab1, tab2, tab3, tab4 = st.tabs(["Série Temporal", "Ranking & CAGR", "Visão Global (Mapa)", "Sobre o Modelo"],
+                                     key="active_tab", on_change="rerun")
     with tab1:
-        display_timeseries_tab(df_full, selected_continent)
+        if tab1.open:
+            display_timeseries_tab(selected_continent)
     with tab2:
-        display_ranking_tab(df_fc_2030, selected_continent)
+        if tab2.open:
+            display_ranking_tab(aggregates, selected_continent)
     with tab3:
-        st.subheader(f"Visão Global do PIB per Capita ({FORECAST_YEAR}) - Globo Interativo")
-        fig_globe = create_plotly_globe_map(df_fc_2030)
-        if fig_globe:
-            st.plotly_chart(fig_globe, use_container_width=True, config={'displayModeBar': False})
-        else:
-            st.warning(
-                "Não foi possível gerar o mapa globo. Verifique se os dados de previsão e os códigos ISO estão disponíveis.")
+        if tab3.open:
+            display_globe_tab(df_fc_2030, cube if scenario is None else None, selected_year)
     with tab4:
-        st.subheader("Sobre o Modelo e Confiabilidade")
-        mae, r2, mse = 178.14, 0.9885, 937337
-        st.markdown(f"- **Modelo:** LSTM (Keras), otimizado com Optuna.\n"
-                    f"- **Métricas (Teste):** MAE: ${mae:,.2f}, R²: {r2:.4f}, MSE: {mse:,.2f}\n"
-                    "> **Nota:** Projeções de longo prazo são inerentemente incertas e devem ser "
-                    "interpretadas como tendências e não como valores exatos.")
+        if tab4.open:
+            display_model_tab()
 
     st.markdown("---")
     st.subheader(f"Dados Detalhados (Previsão {FORECAST_YEAR})")
     if not df_filtered_fc.empty:
-        st.download_button(
-            "📥 Exportar Seleção para CSV",
-            df_filtered_fc.to_csv(index=False).encode("utf-8"),
-            f"forecast_{FORECAST_YEAR}_{selected_continent.lower().replace(' ', '_')}.csv",
-            "text/csv"
-        )
-        gb = GridOptionsBuilder.from_dataframe(df_filtered_fc)
-        gb.configure_default_column(filter=True, sortable=True, resizable=True, groupable=True)
-        gb.configure_column("GDP_per_capita", type=["numericColumn"],
-                            valueFormatter="'$' + value.toLocaleString(undefined, {minimumFractionDigits: 0, maximumFractionDigits: 0})")
-        gb.configure_column("CAGR", type=["numericColumn"],
-                            valueFormatter="value == null ? '' : (typeof value === 'number' ? (value * 100).toFixed(2) + '%' : '')")
-        gridOptions = gb.build()
-        AgGrid(df_filtered_fc, gridOptions=gridOptions, theme="streamlit-dark", fit_columns_on_grid_load=True,
-               allow_unsafe_jscode=True)
+        # Gerado só no clique (série completa da seleção, em CSV, Parquet ou Arrow)
+        render_export(st, store, selected_continent,
+                      f"forecast_{FORECAST_YEAR}_{selected_continent.lower().replace(' ', '_')}")
+        display_detail_grid(selected_continent)
     else:
         st.info("Sem dados detalhados para a seleção atual.")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
+    PROFILE.mark("fim da execução")
+    PROFILE.emit(st)
@@ -0,0 +1 @@
+# Pacote de benchmarks: gerador de dados sintéticos e suíte de medição do ETL e dos dashboards.
@@ -0,0 +1,223 @@
+# Arquivo: benchmarks/suite.py
+# Suíte de benchmarks do ETL e dos caminhos de dados dos dashboards.
+#
+# Para cada escala (1x, 10x, 100x... as entidades de hoje), gera as fontes CSV
+# sintéticas (benchmarks/synthetic_data.py) em data/cache/benchmarks/scale_N/ e mede:
+#   - preprocess_data: reconstrução completa (padrão e em streaming) e execução
+#     incremental sem mudanças;
+#   - load_snapshot: a carga do artefato pelos dois dashboards (substitui os antigos
+#     app.load_data() e dashboard_pib.load_data()) e a série temporal completa;
+#   - build_aggregates: KPIs e rankings de CAGR de todos os continentes (ETL);
+#   - calculate_kpis e rank_slice: a consulta por continente feita a cada rerun;
+#   - create_plotly_globe_map de app.py e de dashboard_pib.py;
+#   - YearCube: matriz ano x país e KPIs/rankings de todos os anos, e o globo
+#     animado (um quadro por ano) de app.py.
+# Cada caso roda até somar `--min-time` segundos (ou `--max-runs` execuções) e
+# registra mediana e mínimo. O resultado vai para benchmarks/results/ em JSON,
+# com o commit e o ambiente; `--compare` aponta regressões contra um JSON anterior.
+#
+# Uso: python -m benchmarks.suite --scales 1 10 100
+#      python -m benchmarks.suite --scales 1 --compare benchmarks/results/<anterior>.json
+#      (1000x gera vários GB de CSV: peça-o explicitamente com --scales 1000)
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from aggregates import ALL_CONTINENTS, aggregates_to_dict, build_aggregates, rank_slice  # noqa: E402
+from benchmarks.synthetic_data import generate  # noqa: E402
+from year_frames import YearCube, add_year_frames  # noqa: E402
+
+DATA_ROOT = ROOT / "data" / "cache" / "benchmarks"
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+DEFAULT_SCALES = (1, 10, 100)
+FORECAST_YEAR = 2030
+REGRESSION_THRESHOLD = 0.20  # variação entre execuções na mesma máquina fica em ~10%
+
+
+# ─── 1) MEDIÇÃO ──────────────────────────────────────────────────
+def measure(fn, min_time_s=1.0, max_runs=20):
+    """Executa `fn` até somar `min_time_s` (ao menos uma vez, no máximo `max_runs`); tempos em segundos."""
+    times = []
+    while not times or (sum(times) < min_time_s and len(times) < max_runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {"median_s": statistics.median(times), "min_s": min(times), "runs": len(times)}
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silencia os prints do ETL durante a medição."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def _import_apps():
+    """Importa os dois apps como módulos (o Streamlit roda em modo 'bare', sem servidor)."""
+    import app
+    import dashboard_pib
+    import streamlit.logger
+    # Sem servidor, cada chamada do Streamlit avisa "missing ScriptRunContext" (o nível é
+    # redefinido quando a configuração é lida, na importação dos apps)
+    streamlit.logger.set_log_level("error")
+    return app, dashboard_pib
+
+
+# ─── 2) CASOS ────────────────────────────────────────────────────
+def run_scale(scale, min_time_s=1.0, max_runs=20, seed=0):
+    """Gera (ou reaproveita) os dados da escala e mede todos os casos. Retorna a lista de resultados."""
+    from data_store import load_snapshot
+    from preprocess_data import preprocess_data
+
+    data_dir = DATA_ROOT / f"scale_{scale}"
+    spec = generate(data_dir, scale, seed)
+    rows = sum(spec["rows"].values())
+    app, dashboard_pib = _import_apps()
+    results = []
+
+    def record(case, fn, n_rows, runs=max_runs):
+        result = {"case": case, "scale": scale, "rows": int(n_rows), **measure(fn, min_time_s, runs)}
+        results.append(result)
+        print(f"  {case:<40} {result['median_s'] * 1000:>12,.2f} ms  ({result['runs']} execuções)", flush=True)
+
+    with quiet():
+        preprocess_data(data_dir=data_dir)  # garante o artefato antes das medições de leitura
+
+    def full_build():
+        with quiet():
+            preprocess_data(data_dir=data_dir)
+
+    def streaming_build():
+        with quiet():
+            preprocess_data(data_dir=data_dir, streaming=True)
+
+    def incremental_noop():
+        with quiet():
+            preprocess_data(incremental=True, data_dir=data_dir)
+
+    record("preprocess_data:full", full_build, rows, runs=3)
+    record("preprocess_data:streaming", streaming_build, rows, runs=3)
+    record("preprocess_data:incremental_noop", incremental_noop, rows)
+
+    store, reason = load_snapshot(FORECAST_YEAR, data_dir)
+    if reason is not None:
+        raise RuntimeError(f"Artefato sintético desatualizado após o ETL: {reason}")
+    df_fc = store.forecast()
+    record("load_snapshot", lambda: load_snapshot(FORECAST_YEAR, data_dir), len(df_fc))
+    record("load_snapshot+timeseries:Todos",
+           lambda: load_snapshot(FORECAST_YEAR, data_dir)[0].timeseries(ALL_CONTINENTS), len(store.timeseries()))
+
+    record("build_aggregates", lambda: build_aggregates(df_fc), len(df_fc))
+    aggregates = aggregates_to_dict(build_aggregates(df_fc))
+    continents = list(aggregates)
+    record("app.calculate_kpis:todos_continentes",
+           lambda: [app.calculate_kpis(aggregates, c) for c in continents], len(continents))
+    record("rank_slice:top_bottom_10",
+           lambda: [rank_slice(aggregates[c], 10, largest) for c in continents for largest in (True, False)],
+           len(continents))
+
+    record("app.create_plotly_globe_map", lambda: app.create_plotly_globe_map(df_fc), len(df_fc))
+    record("dashboard_pib.create_plotly_globe_map", lambda: dashboard_pib.create_plotly_globe_map(df_fc), len(df_fc))
+
+    cube = YearCube.from_store(store, FORECAST_YEAR)
+    n_cells = cube.gdp.size
+    record("YearCube:kpis_todos_os_anos",
+           lambda: YearCube.from_store(store, FORECAST_YEAR).aggregates(FORECAST_YEAR), n_cells)
+    record("app.globe_frames",
+           lambda: add_year_frames(app.create_plotly_globe_map(df_fc), cube, FORECAST_YEAR, np.log1p), n_cells)
+    return results
+
+
+# ─── 3) RESULTADOS E COMPARAÇÃO ──────────────────────────────────
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return out.stdout.strip() + ("-dirty" if dirty else "") if out.returncode == 0 else None
+    except OSError:
+        return None
+
+
+def save_results(results, out_dir=RESULTS_DIR):
+    """Grava os resultados com commit e ambiente em `out_dir`; retorna o caminho do JSON."""
+    import pandas as pd
+    commit = _git_commit()
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    payload = {
+        "commit": commit,
+        "timestamp": stamp,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "results": results,
+    }
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"{stamp}_{commit or 'sem-git'}.json"
+    path.write_text(json.dumps(payload, indent=1), encoding="utf-8")
+    return path
+
+
+def compare(base, new, threshold=REGRESSION_THRESHOLD):
+    """
+    Razão (novo / base) das medianas de cada (caso, escala) presente nos dois
+    resultados, marcando regressões e melhorias além de `threshold`.
+    """
+    base_by_key = {(r["case"], r["scale"]): r for r in base["results"]}
+    rows = []
+    for r in new["results"]:
+        old = base_by_key.get((r["case"], r["scale"]))
+        if old is None or not old["median_s"]:
+            continue
+        ratio = r["median_s"] / old["median_s"]
+        status = "REGRESSÃO" if ratio > 1 + threshold else "melhora" if ratio < 1 - threshold else ""
+        rows.append({"case": r["case"], "scale": r["scale"], "base_ms": old["median_s"] * 1000,
+                     "new_ms": r["median_s"] * 1000, "ratio": ratio, "status": status})
+    return rows
+
+
+def print_comparison(rows, base_commit, new_commit):
+    print(f"\nComparação: {base_commit} -> {new_commit}")
+    print(f"{'Caso':<40} {'Escala':>6} | {'Base (ms)':>12} | {'Novo (ms)':>12} | {'Razão':>6}")
+    print("-" * 90)
+    for row in rows:
+        print(f"{row['case']:<40} {row['scale']:>5}x | {row['base_ms']:>12,.2f} | {row['new_ms']:>12,.2f} | "
+              f"{row['ratio']:>6.2f} {row['status']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks do ETL e dos dashboards sobre dados sintéticos.")
+    parser.add_argument("--scales", type=int, nargs="+", default=list(DEFAULT_SCALES))
+    parser.add_argument("--min-time", type=float, default=1.0, help="Tempo mínimo somado por caso (s).")
+    parser.add_argument("--max-runs", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=str(RESULTS_DIR))
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparar.")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    all_results = []
+    for scale in args.scales:
+        print(f"\n=== Escala {scale}x ===", flush=True)
+        all_results.extend(run_scale(scale, args.min_time, args.max_runs, args.seed))
+    path = save_results(all_results, args.out)
+    print(f"\nResultados gravados em {path}")
+
+    if args.compare:
+        base = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        new = json.loads(path.read_text(encoding="utf-8"))
+        print_comparison(compare(base, new, args.threshold), base.get("commit"), new.get("commit"))
@@ -0,0 +1,163 @@
+# Arquivo: benchmarks/synthetic_data.py
+# Gerador das três fontes CSV do ETL (mesmos esquemas de data/) em escala.
+#
+# A escala multiplica o número de entidades (países) de hoje: 1x = 173 entidades,
+# cada uma com o histórico (anos de início, lacunas e linhas repetidas por ano no
+# mesmo perfil do gdp_per_capita.csv real, ~148 mil linhas) e a previsão de 2023 a
+# 2030. Os anos não escalam (o intervalo 1800–2030 é fixo), então 10x, 100x e 1000x
+# significam 10, 100 e 1000 vezes mais linhas. As entidades são escritas em lotes,
+# de modo que a memória não cresce com a escala; 1000x gera ~150 milhões de linhas
+# de histórico (vários GB de CSV) e deve ser pedido explicitamente.
+#
+# Uso: python -m benchmarks.synthetic_data --scale 10 --out data/cache/benchmarks/scale_10
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+GENERATOR_VERSION = 1
+BASE_ENTITIES = 173
+LAST_HISTORIC_YEAR = 2022
+FORECAST_YEARS = range(2023, 2031)
+ENTITIES_PER_CHUNK = 2_000
+SPEC_NAME = "synthetic.json"
+
+# Proporção de entidades por continente no gdp_dashboard_ready_data.csv real
+CONTINENT_WEIGHTS = {
+    "Africa": 52, "Asia": 46, "Europe": 41, "North America": 18, "South America": 10, "Oceania": 2,
+    "Americas": 1, "Asia/Africa": 1, "Americas/Oceania": 1, "World": 1,
+}
+HISTORIC_EXTRA_COLUMNS = (
+    "Value of global merchandise exports as a share of GDP",
+    "Government expenditure (% of GDP)",
+    "Trade as a Share of GDP",
+    "Inflation, consumer prices (annual %)",
+)
+# Poucas entidades do histórico real têm centenas de linhas por ano (dados repetidos)
+REPEATED_ENTITY_SHARE = 0.03
+REPEATS_PER_YEAR = (120, 800)
+
+
+# ─── 1) ENTIDADES ────────────────────────────────────────────────
+def _iso_code(i):
+    letters = []
+    for _ in range(3):
+        i, r = divmod(i, 26)
+        letters.append(chr(ord("A") + r))
+    return "".join(reversed(letters)) + (str(i) if i else "")
+
+
+def entity_table(first, count, rng):
+    """Nome, código ISO, continente, ano inicial, repetições por ano e nível de PIB de cada entidade."""
+    ids = np.arange(first, first + count)
+    continents = list(CONTINENT_WEIGHTS)
+    weights = np.array(list(CONTINENT_WEIGHTS.values()), dtype=float)
+    start = np.clip(rng.normal(1952, 41, count).round(), 1800, 2005).astype(int)
+    repeats = np.where(rng.random(count) < REPEATED_ENTITY_SHARE, rng.integers(*REPEATS_PER_YEAR, count), 1)
+    return pd.DataFrame({
+        "Entity": [f"Country {i:06d}" for i in ids],
+        "Code": [_iso_code(i) for i in ids],
+        "Continent": rng.choice(continents, count, p=weights / weights.sum()),
+        "start": start,
+        "repeats": repeats,
+        "level": rng.lognormal(8.5, 1.2, count),
+        "growth": rng.normal(0.015, 0.02, count),
+    })
+
+
+# ─── 2) LINHAS DE CADA FONTE ─────────────────────────────────────
+def historic_rows(entities, rng):
+    """Linhas do gdp_per_capita.csv: série anual (com lacunas) e repetições por ano."""
+    years_per_entity = LAST_HISTORIC_YEAR - entities["start"].to_numpy() + 1
+    idx = np.repeat(np.arange(len(entities)), years_per_entity)
+    offset = np.arange(len(idx)) - np.repeat(np.cumsum(years_per_entity) - years_per_entity, years_per_entity)
+    years = entities["start"].to_numpy()[idx] + offset
+    keep = rng.random(len(idx)) < 0.3 + 0.7 * (years >= 1950)  # antes de 1950 a série é esparsa
+    idx, years = idx[keep], years[keep]
+    reps = entities["repeats"].to_numpy()[idx]
+    idx, years = np.repeat(idx, reps), np.repeat(years, reps)
+
+    age = years - LAST_HISTORIC_YEAR
+    gdp = (entities["level"].to_numpy()[idx] * np.exp(entities["growth"].to_numpy()[idx] * age)
+           * rng.lognormal(0, 0.05, len(idx)))
+    df = pd.DataFrame({
+        "Entity": entities["Entity"].to_numpy()[idx],
+        "Code": entities["Code"].to_numpy()[idx],
+        "Year": years,
+        "GDP per capita": gdp,
+    })
+    for col in HISTORIC_EXTRA_COLUMNS:
+        df[col] = rng.normal(30, 15, len(entities))[idx]  # constante por entidade, como no real
+    return df
+
+
+def forecast_rows(entities, rng):
+    """Linhas do gdp_forecast_to_2030.csv: trajetória de 2023 a 2030 por entidade."""
+    n_years = len(FORECAST_YEARS)
+    idx = np.repeat(np.arange(len(entities)), n_years)
+    years = np.tile(np.array(FORECAST_YEARS), len(entities))
+    gdp = (entities["level"].to_numpy()[idx] * np.exp(entities["growth"].to_numpy()[idx] * (years - LAST_HISTORIC_YEAR))
+           * rng.lognormal(0, 0.03, len(idx)))
+    return pd.DataFrame({"Entity": entities["Entity"].to_numpy()[idx], "Year": years,
+                         "GDP per capita": gdp, "Type": "Forecast"})
+
+
+def ready_rows(entities, df_forecast):
+    """Linhas do gdp_dashboard_ready_data.csv: a previsão com ISO, continente e CAGR (vazio, como no real)."""
+    info = entities.set_index("Entity")
+    return pd.DataFrame({
+        "Entity": df_forecast["Entity"],
+        "Year": df_forecast["Year"],
+        "GDP_per_capita": df_forecast["GDP per capita"],
+        "Type": "Forecast",
+        "CAGR_Forecast": np.nan,
+        "ISO_Alpha3": df_forecast["Entity"].map(info["Code"]),
+        "Continent": df_forecast["Entity"].map(info["Continent"]),
+    })
+
+
+# ─── 3) ESCRITA ──────────────────────────────────────────────────
+def generate(out_dir, scale=1, seed=0, chunk_entities=ENTITIES_PER_CHUNK):
+    """
+    Escreve as três fontes em `out_dir` (nomes de preprocess_data.SOURCES), em lotes de
+    entidades. Reaproveita os arquivos se já foram gerados com os mesmos parâmetros.
+    Retorna a especificação gravada (parâmetros e número de linhas de cada fonte).
+    """
+    from preprocess_data import SOURCES
+    out_dir = Path(out_dir)
+    spec_path = out_dir / SPEC_NAME
+    params = {"generator_version": GENERATOR_VERSION, "scale": scale, "seed": seed}
+    if spec_path.exists():
+        spec = json.loads(spec_path.read_text(encoding="utf-8"))
+        if {k: spec.get(k) for k in params} == params and all((out_dir / n).exists() for n in SOURCES.values()):
+            return spec
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    spec_path.unlink(missing_ok=True)
+    rng = np.random.default_rng(seed)
+    n_entities = BASE_ENTITIES * scale
+    rows = {key: 0 for key in SOURCES}
+    start = time.perf_counter()
+    for first in range(0, n_entities, chunk_entities):
+        entities = entity_table(first, min(chunk_entities, n_entities - first), rng)
+        df_f = forecast_rows(entities, rng)
+        parts = {"historic": historic_rows(entities, rng), "forecast": df_f, "ready": ready_rows(entities, df_f)}
+        for key, df in parts.items():
+            df.to_csv(out_dir / SOURCES[key], mode="w" if first == 0 else "a", header=first == 0, index=False)
+            rows[key] += len(df)
+
+    spec = {**params, "entities": n_entities, "rows": rows, "seconds": round(time.perf_counter() - start, 2)}
+    spec_path.write_text(json.dumps(spec, indent=1), encoding="utf-8")
+    return spec
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera as fontes CSV do ETL com N vezes as entidades de hoje.")
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+    print(generate(args.out, args.scale, args.seed))
@@ -0,0 +1,450 @@
+# Arquivo: data_store.py
+# Armazém de dados somente leitura compartilhado por todas as sessões do Streamlit.
+#
+# Os dashboards constroem uma única instância por processo (via `st.cache_resource`)
+# e cada sessão recebe visões dela, sem cópias: os dados ficam ordenados por
+# continente, de modo que o recorte de um continente é uma faixa contígua de linhas
+# (`iloc[a:b]`, que sob Copy-on-Write do pandas não duplica memória). Quem precisar
+# alterar um recorte deve copiá-lo explicitamente; as visões devem ser tratadas como
+# imutáveis.
+#
+# `load_snapshot` confere antes a versão do esquema e o frescor do artefato do ETL;
+# desatualizado, ele continua sendo servido (última versão boa) enquanto um
+# `ArtifactBuilder` o reconstrói numa thread do processo.
+#
+# Executado como script, imprime um relatório de memória comparando bytes por
+# sessão no modelo antigo (cópias por rerun) e no armazém compartilhado.
+import argparse
+import pickle
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from aggregates import ALL_CONTINENTS
+from formatting import with_labels
+from tracing import span
+
+ROOT = Path(__file__).resolve().parent
+DATA_DIR = ROOT / "data"
+DATASET_DIR = DATA_DIR / "dashboard_dataset"
+DATA_FILE = DATA_DIR / "dashboard_data.parquet"
+FORECAST_COLUMNS = ('Country', 'Year', 'GDP_per_capita', 'Continent', 'Type', 'ISO_Alpha3', 'CAGR')
+TIMESERIES_COLUMNS = ('Country', 'Year', 'GDP_per_capita', 'Type')
+PATH_COLUMNS = ('Country', 'Year', 'GDP_per_capita')
+
+
+# ─── 1) LEITURA DO PARQUET COM FILTROS EMPURRADOS ────────────────
+def open_dataset(dataset_dir=DATASET_DIR, data_file=DATA_FILE):
+    """Abre o dataset particionado (ou, na falta dele, o Parquet único) sem ler os dados."""
+    import pyarrow.dataset as ds
+    if Path(dataset_dir).exists():
+        return ds.dataset(dataset_dir, format="parquet", partitioning="hive")
+    if Path(data_file).exists():
+        return ds.dataset(data_file, format="parquet")
+    return None
+
+
+def build_filter(types=None, continent=ALL_CONTINENTS, year=None, countries=None):
+    """Monta a expressão de filtro do pyarrow a partir das seleções do usuário."""
+    import pyarrow.dataset as ds
+    conditions = []
+    if types:
+        conditions.append(ds.field("Type").isin(list(types)))
+    if continent and continent != ALL_CONTINENTS:
+        conditions.append(ds.field("Continent") == continent)
+    if year is not None:
+        conditions.append(ds.field("Year") == year)
+    if countries:
+        conditions.append(ds.field("Country").isin(list(countries)))
+    expr = None
+    for cond in conditions:
+        expr = cond if expr is None else expr & cond
+    return expr
+
+
+def scan(dataset, columns, **filters):
+    """Lê do dataset apenas as linhas e colunas pedidas."""
+    table = dataset.to_table(columns=list(columns), filter=build_filter(**filters))
+    # split_blocks/self_destruct evitam a consolidação em blocos 2D e liberam o buffer Arrow
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def list_partition_values(dataset, column):
+    """Valores de uma coluna de partição, lidos dos caminhos (ou da coluna, no arquivo único)."""
+    import pyarrow.dataset as ds
+    values = set()
+    for fragment in dataset.get_fragments():
+        values.add(ds.get_partition_keys(fragment.partition_expression).get(column))
+    values.discard(None)
+    if not values:
+        values = set(dataset.to_table(columns=[column]).column(column).drop_null().to_pylist())
+    return sorted(values)
+
+
+# ─── 2) ARMAZÉM COMPARTILHADO ────────────────────────────────────
+def _runs(keys: pd.Series):
+    """Sequências de valores iguais consecutivos: lista de (chave, início, fim)."""
+    codes, uniques = pd.factorize(keys, sort=False)
+    if len(codes) == 0:
+        return []
+    starts = np.concatenate(([0], np.flatnonzero(codes[1:] != codes[:-1]) + 1))
+    stops = np.append(starts[1:], len(codes))
+    # Código -1 = chave ausente (NaN), que não vira filtro
+    return [(uniques[codes[start]], int(start), int(stop)) for start, stop in zip(starts, stops) if codes[start] >= 0]
+
+
+def _contiguous_ranges(keys: pd.Series) -> dict:
+    """{chave: (início, fim)} para uma coluna já ordenada."""
+    return {key: (start, stop) for key, start, stop in _runs(keys)}
+
+
+class CountryIndex:
+    """
+    Índice de uma série temporal cujas linhas de cada país estão em faixas contíguas,
+    ordenadas por Tipo/Ano: lista ordenada de países e país → faixas de linhas.
+    As opções do multiselect e os dados do gráfico saem daqui, sem varrer nem reordenar.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.frame = df
+        self._ranges = {}
+        for country, start, stop in _runs(df["Country"]):
+            self._ranges.setdefault(country, []).append((start, stop))
+        self.countries = sorted(self._ranges)
+
+    def rows(self, countries) -> pd.DataFrame:
+        """Linhas dos países pedidos, em ordem de País/Tipo/Ano."""
+        parts = []
+        for country in sorted(set(countries)):
+            slices = [self.frame.iloc[start:stop] for start, stop in self._ranges.get(country, ())]
+            if len(slices) > 1:  # país repartido (ex.: em mais de um continente)
+                slices = [pd.concat(slices).sort_values(['Type', 'Year'], kind="stable")]
+            parts.extend(slices)
+        if not parts:
+            return self.frame.iloc[0:0]
+        return parts[0] if len(parts) == 1 else pd.concat(parts)
+
+
+class DashboardStore:
+    """
+    Dados do dashboard carregados uma vez por processo e compartilhados entre sessões.
+
+    `forecast(continente)` devolve uma visão das linhas de previsão do ano-alvo,
+    com as colunas de rótulo de `formatting.with_labels`;
+    `timeseries(continente)` devolve histórico + previsão do continente, carregado
+    sob demanda e memorizado junto com o seu `CountryIndex` (`countries` e
+    `country_rows`). `forecast_path()` devolve as linhas de previsão de todos os anos
+    do horizonte (País/Ano/PIB), também sob demanda. Todos os retornos são visões
+    somente leitura.
+    """
+
+    def __init__(self, df_forecast, continents, timeseries_loader, path_loader=None, dataset=None):
+        # Rótulos formatados (mapa, tabela e CSV) calculados uma vez para todas as sessões
+        self._forecast = with_labels(df_forecast.sort_values("Continent", kind="stable").reset_index(drop=True))
+        self._forecast_ranges = _contiguous_ranges(self._forecast["Continent"])
+        self.continents = list(continents)
+        self._timeseries_loader = timeseries_loader
+        self._timeseries = {}
+        self._path_loader = path_loader
+        self._path = None
+        # Dataset do ETL por trás do armazém (None se montado de DataFrames): leituras em lotes, ex. a exportação
+        self.dataset = dataset
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_dataset(cls, dataset, forecast_year):
+        """Constrói o armazém a partir do Parquet do ETL; o histórico é lido por continente."""
+        df_forecast = scan(dataset, FORECAST_COLUMNS, types=("Forecast",), year=forecast_year)
+        continents = list_partition_values(dataset, "Continent")
+
+        def load_timeseries(continent):
+            return scan(dataset, TIMESERIES_COLUMNS, continent=continent).sort_values(
+                ['Country', 'Type', 'Year'], ignore_index=True)
+
+        def load_path():
+            return scan(dataset, PATH_COLUMNS, types=("Forecast",))
+
+        return cls(df_forecast, continents, load_timeseries, load_path, dataset=dataset)
+
+    @classmethod
+    def from_frames(cls, df_ts, df_forecast):
+        """Constrói o armazém a partir de DataFrames já carregados em memória."""
+        df_ts = df_ts.sort_values(['Continent', 'Country', 'Type', 'Year'], ignore_index=True)
+        ranges = _contiguous_ranges(df_ts["Continent"])
+        continents = sorted(set(ranges) | set(df_forecast["Continent"].dropna().unique()))
+
+        def load_timeseries(continent):
+            if continent == ALL_CONTINENTS:
+                return df_ts
+            start, stop = ranges.get(continent, (0, 0))
+            return df_ts.iloc[start:stop]
+
+        def load_path():
+            rows = pd.concat([df_ts.loc[df_ts["Type"] == "Forecast", list(PATH_COLUMNS)],
+                              df_forecast.reindex(columns=list(PATH_COLUMNS))], ignore_index=True)
+            return rows.drop_duplicates(["Country", "Year"], keep="last")
+
+        return cls(df_forecast, continents, load_timeseries, load_path)
+
+    def forecast(self, continent=ALL_CONTINENTS) -> pd.DataFrame:
+        if continent == ALL_CONTINENTS:
+            return self._forecast
+        start, stop = self._forecast_ranges.get(continent, (0, 0))
+        return self._forecast.iloc[start:stop]
+
+    def timeseries_index(self, continent=ALL_CONTINENTS) -> CountryIndex:
+        index = self._timeseries.get(continent)
+        if index is None:
+            with self._lock:
+                index = self._timeseries.get(continent)
+                if index is None:
+                    with span("dados: leitura da série temporal", continent=continent) as sp:
+                        index = self._timeseries[continent] = CountryIndex(self._timeseries_loader(continent))
+                        sp.rows = len(index.frame)
+        return index
+
+    def timeseries(self, continent=ALL_CONTINENTS) -> pd.DataFrame:
+        return self.timeseries_index(continent).frame
+
+    def countries(self, continent=ALL_CONTINENTS) -> list:
+        """Países com série temporal no continente, em ordem alfabética."""
+        return self.timeseries_index(continent).countries
+
+    def country_rows(self, continent, countries) -> pd.DataFrame:
+        """Série temporal dos países selecionados, já ordenada por País/Tipo/Ano."""
+        return self.timeseries_index(continent).rows(countries)
+
+    def forecast_path(self) -> pd.DataFrame:
+        """Previsão de todos os anos do horizonte (País/Ano/PIB), lida uma vez; sem carregador, só o ano-alvo."""
+        if self._path is None:
+            with self._lock:
+                if self._path is None:
+                    with span("dados: leitura da trajetória da previsão") as sp:
+                        if self._path_loader is None:
+                            self._path = self._forecast[list(PATH_COLUMNS)]
+                        else:
+                            self._path = self._path_loader()
+                        sp.rows = len(self._path)
+        return self._path
+
+    def nbytes(self) -> int:
+        """Memória ocupada pelos DataFrames do armazém (as visões não contam em dobro)."""
+        frames = [self._forecast] + [index.frame for index in self._timeseries.values()]
+        if self._path is not None:
+            frames.append(self._path)
+        return int(sum(df.memory_usage(deep=True).sum() for df in frames))
+
+
+# ─── 3) VERSÃO DO ARTEFATO E RECONSTRUÇÃO EM SEGUNDO PLANO ───────
+def artifact_status(data_dir=DATA_DIR):
+    """
+    Motivo de o artefato do ETL estar desatualizado, ou None se está em dia: Parquet
+    ausente, versão de esquema diferente da do ETL ou fonte CSV alterada desde o
+    manifesto (só tamanho e mtime, sem recalcular hashes).
+    """
+    from preprocess_data import (MANIFEST_NAME, OUTPUT_NAME, SCHEMA_VERSION, SOURCES, load_manifest,
+                                 read_schema_version)
+    data_dir = Path(data_dir)
+    data_file = data_dir / OUTPUT_NAME
+    if not data_file.exists():
+        return f"'{OUTPUT_NAME}' não encontrado"
+    try:
+        version = read_schema_version(data_file)
+    except Exception as e:
+        return f"'{OUTPUT_NAME}' ilegível ({e})"
+    if version != SCHEMA_VERSION:
+        return f"esquema na versão {version}, esperada {SCHEMA_VERSION}"
+    recorded = (load_manifest(data_dir / MANIFEST_NAME) or {}).get("sources", {})
+    for key, name in SOURCES.items():
+        path = data_dir / name
+        if not path.exists():
+            continue  # fonte ausente não tem como invalidar o artefato
+        stat, old = path.stat(), recorded.get(key) or {}
+        if (old.get("size"), old.get("mtime_ns")) != (stat.st_size, stat.st_mtime_ns):
+            return f"fonte '{name}' alterada"
+    return None
+
+
+def can_rebuild(data_dir=DATA_DIR):
+    """Há fontes para reconstruir o artefato (histórico e previsão são obrigatórios no ETL)?"""
+    from preprocess_data import SOURCES
+    return all((Path(data_dir) / SOURCES[key]).exists() for key in ("historic", "forecast"))
+
+
+def load_snapshot(forecast_year, data_dir=DATA_DIR):
+    """
+    (armazém ou None, motivo de estar desatualizado ou None). Em dia, o histórico é
+    lido sob demanda do dataset particionado. Desatualizado, a última versão boa (o
+    Parquet único) é lida inteira para a memória, para que a reconstrução possa
+    regravar os arquivos enquanto ela é servida.
+    """
+    from preprocess_data import DATASET_NAME, OUTPUT_NAME
+    data_dir = Path(data_dir)
+    reason = artifact_status(data_dir)
+    if reason is None:
+        dataset = open_dataset(data_dir / DATASET_NAME, data_dir / OUTPUT_NAME)
+        return DashboardStore.from_dataset(dataset, forecast_year), None
+    try:
+        df = pd.read_parquet(data_dir / OUTPUT_NAME, columns=list(FORECAST_COLUMNS))
+    except Exception:
+        return None, reason
+    df_forecast = df[(df['Type'] == 'Forecast') & (df['Year'] == forecast_year)]
+    return DashboardStore.from_frames(df.drop(columns=['CAGR']), df_forecast), reason
+
+
+class ArtifactBuilder:
+    """
+    Estado do artefato do ETL no processo e sua reconstrução
+    (`preprocess_data(incremental=True)`) numa thread. `refresh()` confere o artefato
+    a cada rerun; `generation` muda quando ele passa de em dia a desatualizado ou volta
+    a ficar em dia, e quando o Parquet ou o manifesto são regravados (pela thread ou por
+    um `preprocess_data.py` externo, mesmo que o artefato siga em dia): quem guarda o
+    armazém em cache deve usá-la como chave para recarregá-lo.
+    """
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = Path(data_dir)
+        self.generation = 0
+        self.reason = None
+        self.error = None
+        self.elapsed_s = None
+        self._state = None
+        self._attempted = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _signature(self, artifact_only=False):
+        """
+        Tamanho e mtime das fontes, do Parquet e do manifesto: muda quando alguém mexe nos
+        dados. Com `artifact_only`, só do Parquet e do manifesto (o que o ETL grava).
+        """
+        from preprocess_data import MANIFEST_NAME, OUTPUT_NAME, SOURCES
+        names = (OUTPUT_NAME, MANIFEST_NAME) if artifact_only else (*SOURCES.values(), OUTPUT_NAME, MANIFEST_NAME)
+        signature = []
+        for name in names:
+            path = self.data_dir / name
+            stat = path.stat() if path.exists() else None
+            signature.append((name, stat and stat.st_size, stat and stat.st_mtime_ns))
+        return tuple(signature)
+
+    def refresh(self):
+        """
+        Confere o artefato (tamanho e mtime, sem hashes) e retorna o motivo de estar
+        desatualizado, ou None; muda `generation` se o estado (em dia ou não, assinatura
+        do Parquet e do manifesto) mudou desde a última conferência.
+        """
+        reason = artifact_status(self.data_dir)
+        state = (reason is None, self._signature(artifact_only=True))
+        with self._lock:
+            if self._state is not None and state != self._state:
+                self.generation += 1
+            if reason is None:
+                self.error = None
+            self.reason, self._state = reason, state
+        return reason
+
+    def start(self):
+        """
+        Inicia a reconstrução se nenhuma está em curso e os dados mudaram desde a última
+        tentativa (uma reconstrução que falhou não é repetida a cada rerun); retorna True
+        se iniciou agora.
+        """
+        signature = self._signature()
+        with self._lock:
+            if self.running or signature == self._attempted:
+                return False
+            self._attempted = signature
+            self._thread = threading.Thread(target=self._run, name="artifact-rebuild", daemon=True)
+            self._thread.start()
+            return True
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        from preprocess_data import preprocess_data
+        start = time.perf_counter()
+        try:
+            preprocess_data(incremental=True, data_dir=self.data_dir)
+            # O ETL registra os erros no console; o que importa é o artefato ter ficado em dia
+            self.error = artifact_status(self.data_dir)
+        except Exception as e:
+            self.error = str(e)
+        self.elapsed_s = time.perf_counter() - start
+        # Os arquivos que a própria tentativa regravou não contam como mudança para uma nova
+        self._attempted = self._signature()
+
+
+# ─── 4) RELATÓRIO DE MEMÓRIA ─────────────────────────────────────
+def _allocated_bytes():
+    import pyarrow as pa
+    return tracemalloc.get_traced_memory()[0] + pa.total_allocated_bytes()
+
+
+def _session_before(df_full, forecast_year):
+    """O que cada rerun mantinha antes: a cópia desserializada do `st.cache_data` e as `.copy()` por aba."""
+    df = pickle.loads(pickle.dumps(df_full))
+    df_fc = df[(df['Type'] == 'Forecast') & (df['Year'] == forecast_year)].copy()
+    return [df, df_fc, df.copy(), df_fc.copy(), df_fc.copy()]
+
+
+def _session_after(store):
+    """O que cada rerun mantém agora: visões do armazém compartilhado."""
+    return [store.forecast(), store.timeseries(), store.forecast(store.continents[0]) if store.continents else None]
+
+
+def memory_report(df_full, forecast_year=2030, sessions=(1, 10, 50)):
+    """
+    Mede a memória alocada por N sessões simultâneas nos dois modelos.
+    Retorna uma lista de dicts com bytes totais e por sessão (antes/depois).
+    """
+    rows = []
+    tracemalloc.start()
+    try:
+        for n in sessions:
+            base = _allocated_bytes()
+            held = [_session_before(df_full, forecast_year) for _ in range(n)]
+            before = _allocated_bytes() - base
+            del held
+
+            base = _allocated_bytes()
+            df_ts = df_full.reindex(columns=list(TIMESERIES_COLUMNS) + ['Continent'])
+            df_fc = df_full[(df_full['Type'] == 'Forecast') & (df_full['Year'] == forecast_year)]
+            store = DashboardStore.from_frames(df_ts, df_fc)
+            shared = _allocated_bytes() - base
+            held = [_session_after(store) for _ in range(n)]
+            after = _allocated_bytes() - base - shared
+            del held, store, df_ts, df_fc
+
+            rows.append({"sessions": n, "before_total": before, "before_per_session": before // n,
+                         "shared_store": shared, "after_sessions_total": after, "after_per_session": after // n})
+    finally:
+        tracemalloc.stop()
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Relatório de memória por sessão do armazém compartilhado.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--year", type=int, default=2030)
+    args = parser.parse_args()
+
+    dataset = open_dataset()
+    if dataset is None:
+        raise SystemExit("Dados não encontrados. Execute o script `preprocess_data.py` primeiro.")
+    df_full = dataset.to_table().to_pandas()
+
+    print(f"{'Sessões':>8} | {'Antes (total)':>14} | {'Antes/sessão':>13} | {'Armazém':>10} | {'Depois/sessão':>13}")
+    print("-" * 72)
+    for row in memory_report(df_full, args.year, args.sessions):
+        print(f"{row['sessions']:>8} | {row['before_total']:>14,} | {row['before_per_session']:>13,} | "
+              f"{row['shared_store']:>10,} | {row['after_per_session']:>13,}")
@@ -0,0 +1,208 @@
+# Arquivo: detail_grid.py
+# Tabela "Dados Detalhados" paginada no servidor.
+#
+# Em vez de enviar o recorte inteiro à AgGrid e deixar ordenação/filtro/agrupamento
+# no navegador, o app manda só a página visível: a busca por país, a ordenação e a
+# paginação são resolvidas aqui, sobre o DataFrame compartilhado do armazém. A
+# ordem de cada (recorte, coluna, sentido) é calculada uma vez e memorizada, então
+# trocar de página é um fatiamento de posições. As opções da AgGrid são montadas
+# uma vez por conjunto de colunas e reaproveitadas.
+# O payload para o navegador e o tempo de renderização dependem do tamanho da
+# página, não do número de linhas.
+#
+# Executado como script, compara o payload e o tempo de preparo (tabela inteira x
+# uma página) para tamanhos crescentes de dados sintéticos.
+import argparse
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from formatting import CAGR_GRID_FORMATTER, GDP_GRID_FORMATTER, LABEL_COLUMNS, with_labels
+from tracing import span
+
+PAGE_SIZES = (25, 50, 100)
+DEFAULT_PAGE_SIZE = 50
+SEARCH_COLUMN = "Country"
+MAX_CACHED_ORDERS = 64
+
+
+# ─── 1) CONSULTA PAGINADA ────────────────────────────────────────
+class PagedFrame:
+    """
+    Páginas ordenadas/filtradas de DataFrames compartilhados. Com `cache_key` (ex.:
+    o continente do recorte do armazém, que não muda durante a vida do processo), as
+    posições ordenadas por (cache_key, coluna, sentido) são memorizadas.
+    """
+
+    def __init__(self, max_entries=MAX_CACHED_ORDERS):
+        self.max_entries = max_entries
+        self._orders = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _order(self, df, sort_by, ascending, cache_key):
+        key = (cache_key, len(df), sort_by, ascending)
+        if cache_key is not None:
+            with self._lock:
+                order = self._orders.get(key)
+                if order is not None:
+                    self._orders.move_to_end(key)
+                    return order
+        if sort_by is None or sort_by not in df.columns:
+            order = np.arange(len(df))
+        else:
+            # Posições (não rótulos do índice); ausentes no fim e empates na ordem original
+            order = (df[sort_by].reset_index(drop=True)
+                     .sort_values(ascending=ascending, kind="stable", na_position="last").index.to_numpy())
+        if cache_key is None:
+            return order
+        with self._lock:
+            self._orders[key] = order
+            while len(self._orders) > self.max_entries:
+                self._orders.popitem(last=False)
+        return order
+
+    def positions(self, df, sort_by=None, ascending=True, search="", cache_key=None):
+        """Posições das linhas que passam na busca, na ordem pedida (sem fatiar a página)."""
+        order = self._order(df, sort_by, ascending, cache_key)
+        search = (search or "").strip()
+        if search and SEARCH_COLUMN in df.columns:
+            match = df[SEARCH_COLUMN].astype("string").str.contains(search, case=False, regex=False,
+                                                                     na=False).to_numpy()
+            order = order[match[order]]
+        return order
+
+    def page(self, df, page=1, page_size=DEFAULT_PAGE_SIZE, sort_by=None, ascending=True, search="",
+             cache_key=None, positions=None):
+        """
+        (linhas da página, total de linhas após a busca, número de páginas). `page`
+        começa em 1 e é limitado ao intervalo válido. `positions` (de `positions()`)
+        evita refazer a ordenação e a busca.
+        """
+        order = self.positions(df, sort_by, ascending, search, cache_key) if positions is None else positions
+        total = len(order)
+        n_pages = page_count(total, page_size)
+        page = min(max(1, int(page)), n_pages)
+        start = (page - 1) * page_size
+        return df.iloc[order[start:start + page_size]], total, n_pages
+
+
+def page_count(total, page_size):
+    """Número de páginas (ao menos 1) para `total` linhas."""
+    return max(1, -(-total // page_size))
+
+
+# ─── 2) OPÇÕES DA AGGRID ─────────────────────────────────────────
+_options_cache = {}
+_options_lock = threading.Lock()
+
+
+def grid_options(columns, page_size):
+    """
+    Opções da AgGrid para as colunas dadas, montadas uma vez. Ordenação, filtro e
+    agrupamento do cliente ficam desligados: eles agiriam só sobre a página.
+    """
+    key = (tuple(columns), page_size)
+    with _options_lock:
+        options = _options_cache.get(key)
+    if options is None:
+        from st_aggrid import GridOptionsBuilder
+        gb = GridOptionsBuilder.from_dataframe(pd.DataFrame(columns=list(columns)))
+        gb.configure_default_column(filter=False, sortable=False, resizable=True, groupable=False)
+        # Exibe os rótulos já formatados (os mesmos do mapa e do CSV)
+        if "GDP_per_capita" in columns:
+            gb.configure_column("GDP_per_capita", type=["numericColumn"], valueFormatter=GDP_GRID_FORMATTER)
+        if "CAGR" in columns:
+            gb.configure_column("CAGR", type=["numericColumn"], valueFormatter=CAGR_GRID_FORMATTER)
+        for col in LABEL_COLUMNS:
+            if col in columns:
+                gb.configure_column(col, hide=True)
+        options = gb.build()
+        with _options_lock:
+            _options_cache[key] = options
+    # A AgGrid pode anotar o dicionário recebido; cada chamada leva a sua cópia
+    return copy.deepcopy(options)
+
+
+def sortable_columns(df):
+    """Colunas visíveis oferecidas para ordenação (sem as colunas de rótulo)."""
+    return [col for col in df.columns if col not in LABEL_COLUMNS]
+
+
+def render_detail_grid(st, df, paged, cache_key=None, key="detail_grid", theme="streamlit-dark"):
+    """Controles de busca/ordenação/paginação (Streamlit) e a página atual na AgGrid."""
+    from st_aggrid import AgGrid
+    columns = sortable_columns(df)
+    c_search, c_sort, c_dir, c_size = st.columns([3, 2, 1, 1])
+    search = c_search.text_input("Buscar país:", key=f"{key}_search")
+    sort_by = c_sort.selectbox("Ordenar por:", columns, index=0, key=f"{key}_sort")
+    ascending = c_dir.selectbox("Sentido:", ["Crescente", "Decrescente"], key=f"{key}_dir") == "Crescente"
+    page_size = c_size.selectbox("Linhas:", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE),
+                                 key=f"{key}_size")
+
+    # Ordem e busca uma vez por rerun: o número de páginas sai daqui, sem fatiar a página
+    with span("tabela: ordenação e busca", rows=len(df)):
+        positions = paged.positions(df, sort_by, ascending, search, cache_key)
+    n_pages = page_count(len(positions), page_size)
+    # A chave inclui o número de páginas: uma nova busca/tamanho volta para a página 1
+    page = st.number_input(f"Página (de {n_pages}):", min_value=1, max_value=n_pages, value=1, step=1,
+                           key=f"{key}_page_{n_pages}") if n_pages > 1 else 1
+    with span("tabela: paginação", rows=len(df)):
+        rows, total, n_pages = paged.page(df, page, page_size, positions=positions)
+    st.caption(f"{total:,} linhas • página {min(page, n_pages)} de {n_pages}")
+    if rows.empty:
+        st.info("Nenhuma linha para a busca atual.")
+        return
+    with span("tabela: envio da página", rows=len(rows)):
+        AgGrid(rows, gridOptions=grid_options(df.columns, page_size), theme=theme, fit_columns_on_grid_load=True,
+               allow_unsafe_jscode=True, height=min(600, 40 + 28 * len(rows)), key=key,
+               update_mode="NO_UPDATE", update_on=[])
+
+
+# ─── 3) BENCHMARK ────────────────────────────────────────────────
+def _synthetic_forecast(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "Country": [f"País {i:06d}" for i in range(n_rows)],
+        "Year": 2030,
+        "GDP_per_capita": rng.lognormal(9, 1.2, n_rows),
+        "Continent": rng.choice(["Africa", "Asia", "Europe", "North America", "Oceania", "South America"], n_rows),
+        "Type": "Forecast",
+        "ISO_Alpha3": "XXX",
+        "CAGR": rng.normal(0.02, 0.02, n_rows),
+    })
+    return with_labels(df)
+
+
+def benchmark(sizes=(1_000, 10_000, 100_000), page_size=DEFAULT_PAGE_SIZE):
+    """Payload (bytes de JSON) e tempo de preparo: tabela inteira x uma página ordenada."""
+    rows = []
+    for n in sizes:
+        df = _synthetic_forecast(n)
+        start = time.perf_counter()
+        full_payload = len(df.to_json(orient="records"))
+        full_s = time.perf_counter() - start
+
+        paged = PagedFrame()
+        paged.page(df, 1, page_size, "CAGR", False, cache_key=n)  # primeira ordenação (memorizada)
+        middle = max(1, n // page_size // 2)
+        start = time.perf_counter()
+        page_df, _, n_pages = paged.page(df, middle, page_size, "CAGR", False, cache_key=n)
+        page_payload = len(page_df.to_json(orient="records"))
+        page_s = time.perf_counter() - start
+        rows.append({"rows": n, "full_payload_bytes": full_payload, "full_ms": round(full_s * 1000, 2),
+                     "page_payload_bytes": page_payload, "page_ms": round(page_s * 1000, 2),
+                     "page": middle, "pages": n_pages})
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Payload da tabela detalhada: inteira x paginada no servidor.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    args = parser.parse_args()
+    for row in benchmark(args.sizes, args.page_size):
+        print(row)
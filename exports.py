@@ -0,0 +1,238 @@
+# Arquivo: exports.py
+# Exportação da seleção do dashboard (CSV, Parquet ou Arrow IPC), gerada só quando
+# o usuário clica em baixar.
+#
+# O botão de download recebe uma função em vez dos bytes: nada é convertido nos
+# reruns em que ninguém exporta. Ao clicar, a série temporal completa (histórico +
+# previsão) dos países da seleção é escrita num arquivo em data/cache/exports/.
+# Com o armazém sobre o dataset do ETL, os lotes de até `CHUNK_ROWS` linhas vêm
+# direto do Scanner do pyarrow (filtro de continente e países empurrado para o
+# Parquet) para o escritor CSV/Parquet/IPC, em ordem de partição (Tipo/Continente,
+# e País/Ano dentro de cada uma): o processo nunca monta o recorte inteiro. O
+# arquivo é nomeado pelo hash do filtro e dos arquivos do dataset (tamanho e mtime);
+# um segundo pedido igual (de qualquer sessão) o reaproveita. O `st.download_button`
+# ainda recebe os bytes do arquivo pronto (não aceita um fluxo).
+#
+# Executado como script, compara o custo por rerun do `to_csv` antecipado com o
+# custo zero do botão preguiçoso e mede a geração de cada formato.
+import argparse
+import os
+import tempfile
+import threading
+import time
+import weakref
+from pathlib import Path
+
+import pandas as pd
+
+from data_store import TIMESERIES_COLUMNS, build_filter
+from figure_cache import content_hash
+from tracing import span
+
+ROOT = Path(__file__).resolve().parent
+EXPORT_DIR = ROOT / "data" / "cache" / "exports"
+CHUNK_ROWS = 50_000
+MAX_CACHED_FILES = 32
+FORMATS = {
+    "CSV": (".csv", "text/csv"),
+    "Parquet": (".parquet", "application/vnd.apache.parquet"),
+    "Arrow IPC": (".arrow", "application/vnd.apache.arrow.file"),
+}
+PER_COUNTRY_COLUMNS = ("Continent", "ISO_Alpha3", "CAGR")
+
+_write_lock = threading.Lock()
+# Arquivo já gerado por armazém e (continente, formato, arquivos do dataset): um
+# segundo clique nem recalcula o hash. Os dados em memória do armazém não mudam, mas
+# o dataset por trás dele pode ser regravado pelo ETL com o processo no ar, então a
+# assinatura dos arquivos é conferida a cada clique
+_known_paths = weakref.WeakKeyDictionary()
+
+
+# ─── 1) DADOS EXPORTADOS ─────────────────────────────────────────
+def _per_country(store, continent):
+    """Uma linha por país do recorte de previsão com as colunas repetidas na exportação."""
+    df_fc = store.forecast(continent)
+    columns = ["Country"] + [col for col in PER_COUNTRY_COLUMNS if col in df_fc.columns]
+    return df_fc.dropna(subset=["Country"]).drop_duplicates("Country")[columns]
+
+
+def export_frame(store, continent):
+    """
+    Série temporal completa dos países da seleção (a mesma do recorte de previsão),
+    com continente, ISO e CAGR previsto repetidos em cada linha. Monta tudo em
+    memória: usada pelo armazém sem dataset e pelo benchmark.
+    """
+    per_country = _per_country(store, continent).set_index("Country")
+    rows = store.country_rows(continent, per_country.index.tolist())
+    out = rows.reset_index(drop=True)
+    for col in per_country.columns:
+        out[col] = out["Country"].map(per_country[col])
+    return out
+
+
+def export_batches(store, continent, chunk_rows=CHUNK_ROWS):
+    """
+    (esquema, iterador de RecordBatch) com as linhas de `export_frame`. Com o dataset
+    do ETL, cada lote do Scanner recebe as colunas por país por índice (`index_in` +
+    `take`) e segue para o escritor; sem dataset, fatia a tabela do DataFrame.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if store.dataset is None:
+        table = pa.Table.from_pandas(export_frame(store, continent), preserve_index=False)
+        return table.schema, iter(table.to_batches(max_chunksize=chunk_rows))
+
+    lookup = pa.Table.from_pandas(_per_country(store, continent), preserve_index=False)
+    extra = [name for name in lookup.column_names if name != "Country"]
+    schema = pa.schema([store.dataset.schema.field(name) for name in TIMESERIES_COLUMNS]
+                       + [lookup.schema.field(name) for name in extra])
+    countries = lookup.column("Country").cast(schema.field("Country").type)
+    scanner = store.dataset.scanner(columns=list(TIMESERIES_COLUMNS), batch_size=chunk_rows,
+                                    filter=build_filter(continent=continent, countries=countries.to_pylist()))
+
+    def batches():
+        for batch in scanner.to_batches():
+            if batch.num_rows == 0:
+                continue
+            positions = pc.index_in(batch.column("Country"), value_set=countries)
+            columns = [batch.column(name) for name in TIMESERIES_COLUMNS]
+            columns += [lookup.column(name).take(positions).combine_chunks() for name in extra]
+            yield pa.RecordBatch.from_arrays(columns, schema=schema)
+
+    return schema, batches()
+
+
+def _artifact_signature(dataset):
+    """Arquivos do dataset com tamanho e mtime: muda quando o ETL regrava os dados."""
+    signature = []
+    for path in dataset.files:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:  # partição removida por uma reconstrução
+            signature.append((path, None, None))
+            continue
+        signature.append((path, stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+
+# ─── 2) ESCRITA EM LOTES ─────────────────────────────────────────
+def write_export(batches, schema, fmt, path):
+    """Escreve os lotes em `path` no formato pedido, um por vez; retorna o número de linhas."""
+    import pyarrow as pa
+    n_rows = 0
+    if fmt == "CSV":
+        import pyarrow.csv as pacsv
+        writer = pacsv.CSVWriter(str(path), schema)
+    elif fmt == "Parquet":
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(str(path), schema, compression="zstd")
+    elif fmt == "Arrow IPC":
+        writer = pa.ipc.new_file(str(path), schema)
+    else:
+        raise ValueError(f"Formato de exportação desconhecido: {fmt}")
+    with writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            n_rows += batch.num_rows
+    return n_rows
+
+
+def _evict(directory, keep=MAX_CACHED_FILES):
+    files = sorted(directory.glob("export_*"), key=lambda f: f.stat().st_mtime, reverse=True)
+    for old in files[keep:]:
+        old.unlink(missing_ok=True)
+
+
+def cached_export(store, continent, fmt, directory=EXPORT_DIR):
+    """
+    Caminho do arquivo exportado para (continente, formato), gerando-o se preciso.
+    O nome leva o hash do filtro e dos dados (os arquivos do dataset ou, sem ele, o
+    conteúdo exportado), então dados novos geram um arquivo novo.
+    """
+    directory = Path(directory)
+    signature = _artifact_signature(store.dataset) if store.dataset is not None else None
+    known = _known_paths.setdefault(store, {})
+    path = known.get((continent, fmt, directory, signature))
+    if path is not None and path.exists():
+        os.utime(path)  # recém-usado: fica fora do descarte
+        return path
+
+    with span("exportação: geração", format=fmt) as sp:
+        if signature is not None:
+            key = content_hash("export", continent, fmt, signature)
+        else:
+            key = content_hash("export", continent, fmt, export_frame(store, continent))
+        path = directory / f"export_{key}{FORMATS[fmt][0]}"
+        if path.exists():
+            os.utime(path)
+            known[(continent, fmt, directory, signature)] = path
+            return path
+        with _write_lock:
+            if not path.exists():
+                directory.mkdir(parents=True, exist_ok=True)
+                # Escreve num temporário e renomeia: outra sessão nunca lê um arquivo pela metade
+                fd, tmp = tempfile.mkstemp(dir=directory, suffix=".part")
+                os.close(fd)
+                try:
+                    schema, batches = export_batches(store, continent)
+                    sp.rows = write_export(batches, schema, fmt, tmp)
+                    os.replace(tmp, path)
+                finally:
+                    if os.path.exists(tmp):
+                        os.unlink(tmp)
+                _evict(directory)
+    known[(continent, fmt, directory, signature)] = path
+    return path
+
+
+def render_export(st, store, continent, file_stem, key="export"):
+    """Seletor de formato e botão de download preguiçoso (os dados só são gerados no clique)."""
+    col_fmt, col_btn = st.columns([1, 3])
+    fmt = col_fmt.selectbox("Formato:", list(FORMATS), key=f"{key}_format", label_visibility="collapsed")
+    extension, mime = FORMATS[fmt]
+
+    def data():
+        # O download_button precisa dos bytes: só o arquivo pronto é lido, nunca o recorte em pandas/Arrow
+        return cached_export(store, continent, fmt).read_bytes()
+
+    col_btn.download_button(f"📥 Exportar Série Completa da Seleção ({fmt})", data=data,
+                            file_name=f"{file_stem}{extension}", mime=mime, on_click="ignore", key=f"{key}_button")
+
+
+# ─── 3) BENCHMARK ────────────────────────────────────────────────
+def benchmark(store, continent, reruns=20, directory=None):
+    """Custo por rerun do to_csv antecipado x tempo de geração (no clique) de cada formato."""
+    df_fc = store.forecast(continent)
+    start = time.perf_counter()
+    for _ in range(reruns):
+        df_fc.to_csv(index=False).encode("utf-8")
+    eager_ms = (time.perf_counter() - start) * 1000 / reruns
+
+    result = {"continent": continent, "eager_to_csv_ms_per_rerun": round(eager_ms, 2), "lazy_ms_per_rerun": 0.0}
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = directory or tmp
+        for fmt in FORMATS:
+            start = time.perf_counter()
+            path = cached_export(store, continent, fmt, directory)
+            first = time.perf_counter() - start
+            start = time.perf_counter()
+            cached_export(store, continent, fmt, directory)
+            again = time.perf_counter() - start
+            result[fmt] = {"rows": len(export_frame(store, continent)), "bytes": path.stat().st_size,
+                           "first_click_ms": round(first * 1000, 1), "cached_click_ms": round(again * 1000, 2)}
+    return result
+
+
+if __name__ == "__main__":
+    from aggregates import ALL_CONTINENTS
+    from data_store import DashboardStore, open_dataset
+
+    parser = argparse.ArgumentParser(description="Custo da exportação antecipada x preguiçosa.")
+    parser.add_argument("--continent", default=ALL_CONTINENTS)
+    parser.add_argument("--year", type=int, default=2030)
+    args = parser.parse_args()
+    dataset = open_dataset()
+    if dataset is None:
+        raise SystemExit("Dados não encontrados. Execute o script `preprocess_data.py` primeiro.")
+    print(benchmark(DashboardStore.from_dataset(dataset, args.year), args.continent))
@@ -0,0 +1,82 @@
+# Arquivo: figure_cache.py
+# Cache de figuras Plotly compartilhado pelo processo.
+#
+# A chave é um hash do conteúdo dos dados de entrada e dos parâmetros do gráfico
+# (continente, n, países selecionados...), e o valor é o JSON da figura já
+# serializado. Um rerun causado por outro widget reaproveita o JSON em vez de
+# reconstruir e revalidar a figura; a reidratação pula a validação do Plotly,
+# que já foi feita quando a figura foi construída.
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+DEFAULT_MAX_ENTRIES = 64
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def content_hash(*parts) -> str:
+    """Hash estável de DataFrames/Series (pelo conteúdo) e de parâmetros simples (pelo repr)."""
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, (pd.DataFrame, pd.Series)):
+            h.update(repr(list(part.columns) if isinstance(part, pd.DataFrame) else part.name).encode())
+            h.update(pd.util.hash_pandas_object(part, index=False).to_numpy().tobytes())
+        else:
+            h.update(repr(part).encode())
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class FigureCache:
+    """LRU de JSON de figuras, limitado em número de entradas e em bytes."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_json(self, key, build):
+        """JSON da figura para `key`; chama `build()` (que devolve uma figura ou None) na falta."""
+        with self._lock:
+            fig_json = self._entries.get(key)
+            if fig_json is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return fig_json
+            self.misses += 1
+
+        fig = build()
+        if fig is None:
+            return None
+        fig_json = fig.to_json(validate=False)
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = fig_json
+                self._bytes += len(fig_json)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+        return fig_json
+
+    def get_figure(self, key, build):
+        """Como `get_json`, mas devolve a figura reidratada (pronta para `st.plotly_chart`)."""
+        fig_json = self.get_json(key, build)
+        return None if fig_json is None else figure_from_json(fig_json)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+
+def figure_from_json(fig_json: str):
+    """Reconstrói a figura sem revalidar (o JSON saiu de uma figura já validada)."""
+    import plotly.graph_objects as go
+    return go.Figure(json.loads(fig_json), _validate=False)
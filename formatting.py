@@ -0,0 +1,134 @@
+# Arquivo: formatting.py
+# Formatação vetorizada dos rótulos exibidos no mapa, na tabela AgGrid e na
+# exportação CSV. Tudo é feito com aritmética NumPy e operações de string do
+# Arrow (pyarrow.compute), sem `.apply` por linha, e reproduz exatamente o texto de
+# f"{x:.2%}" e f"${x:,.0f}" (salvo empates exatos de arredondamento na 2ª casa do %).
+#
+# Executado como script, roda um micro-benchmark contra a versão com `.apply`.
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+NA_LABEL = "N/A"
+CAGR_LABEL = "CAGR_label"
+GDP_LABEL = "GDP_label"
+LABEL_COLUMNS = (GDP_LABEL, CAGR_LABEL)
+
+# Formatadores JS da AgGrid: exibem os rótulos já calculados em Python, de modo que
+# a tabela mostra o mesmo texto do mapa e do CSV (a ordenação continua numérica).
+GDP_GRID_FORMATTER = f"data.{GDP_LABEL}"
+CAGR_GRID_FORMATTER = f"data.{CAGR_LABEL}"
+
+
+def _as_float(values) -> np.ndarray:
+    return pd.Series(values).to_numpy(dtype="float64", na_value=np.nan)
+
+
+def _digits(units: np.ndarray):
+    return pc.cast(pa.array(units, type=pa.int64()), pa.string())
+
+
+def _to_series(text, missing: np.ndarray, values, na: str) -> pd.Series:
+    text = pc.if_else(pa.array(missing), na, text)
+    index = values.index if isinstance(values, pd.Series) else None
+    return pd.Series(pd.array(text, dtype="str"), index=index)
+
+
+def percent_labels(values, decimals: int = 2, na: str = NA_LABEL) -> pd.Series:
+    """Equivalente vetorizado de `f"{x:.{decimals}%}"` (ausentes viram `na`)."""
+    x = _as_float(values)
+    missing = np.isnan(x)
+    scaled = np.where(missing, 0.0, x) * 100
+    units = np.rint(np.abs(scaled) * 10 ** decimals).astype(np.int64)
+    sign = pc.if_else(pa.array(np.signbit(scaled)), "-", "")
+    parts = [sign, _digits(units // 10 ** decimals)]
+    if decimals > 0:
+        parts += [".", pc.utf8_lpad(_digits(units % 10 ** decimals), decimals, "0")]
+    text = pc.binary_join_element_wise(*parts, "%", "")
+    return _to_series(text, missing, values, na)
+
+
+def thousands(units: np.ndarray):
+    """Inteiros não negativos com separador de milhar (1234567 -> '1,234,567'), como array Arrow."""
+    units = np.asarray(units, dtype=np.int64)
+    text = _digits(units % 1000)
+    rest = units // 1000
+    groups = 1
+    while rest.any():
+        more = pa.array(rest > 0)
+        padded = pc.utf8_lpad(text, 4 * groups - 1, "0")
+        text = pc.if_else(more, pc.binary_join_element_wise(_digits(rest % 1000), padded, ","), text)
+        rest = rest // 1000
+        groups += 1
+    return text
+
+
+def currency_labels(values, na: str = NA_LABEL) -> pd.Series:
+    """Equivalente vetorizado de `f"${x:,.0f}"` (ausentes viram `na`)."""
+    x = _as_float(values)
+    missing = np.isnan(x)
+    rounded = np.rint(np.where(missing, 0.0, x))
+    sign = pc.if_else(pa.array(np.signbit(rounded)), "$-", "$")
+    text = pc.binary_join_element_wise(sign, thousands(np.abs(rounded).astype(np.int64)), "")
+    return _to_series(text, missing, values, na)
+
+
+def with_labels(df: pd.DataFrame) -> pd.DataFrame:
+    """Acrescenta as colunas de rótulo de PIB e CAGR (calculadas uma vez por carga)."""
+    labels = {}
+    if 'GDP_per_capita' in df.columns:
+        labels[GDP_LABEL] = currency_labels(df['GDP_per_capita'])
+    if 'CAGR' in df.columns:
+        labels[CAGR_LABEL] = percent_labels(df['CAGR'])
+    return df.assign(**labels)
+
+
+# ─── MICRO-BENCHMARK ─────────────────────────────────────────────
+def _apply_percent(s):
+    return s.apply(lambda x: f"{x:.2%}" if pd.notna(x) else NA_LABEL)
+
+
+def _apply_currency(s):
+    return s.apply(lambda x: f"${x:,.0f}" if pd.notna(x) else NA_LABEL)
+
+
+def benchmark(sizes=(1_000, 10_000, 100_000, 1_000_000), repeat=3, seed=0):
+    """Tempo (ms) das versões vetorizada e `.apply`, e número de rótulos divergentes."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for n in sizes:
+        cagr = pd.Series(rng.normal(0.02, 0.03, n))
+        gdp = pd.Series(rng.lognormal(9, 1.5, n))
+        cagr[rng.random(n) < 0.05] = np.nan
+        timings = {}
+        for name, func, data in (("percent_vec", percent_labels, cagr), ("percent_apply", _apply_percent, cagr),
+                                 ("currency_vec", currency_labels, gdp), ("currency_apply", _apply_currency, gdp)):
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                result = func(data)
+                best = min(best, time.perf_counter() - start)
+            timings[name] = (best * 1000, result)
+        rows.append({
+            "n": n,
+            **{f"{name}_ms": round(ms, 2) for name, (ms, _) in timings.items()},
+            "percent_mismatch": int((timings["percent_vec"][1] != timings["percent_apply"][1]).sum()),
+            "currency_mismatch": int((timings["currency_vec"][1] != timings["currency_apply"][1]).sum()),
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmark da formatação vetorizada de rótulos.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+    print(f"{'Regiões':>10} | {'% vet.':>9} | {'% apply':>9} | {'$ vet.':>9} | {'$ apply':>9} | {'Diverg.':>7}")
+    print("-" * 68)
+    for row in benchmark(args.sizes):
+        print(f"{row['n']:>10,} | {row['percent_vec_ms']:>9.1f} | {row['percent_apply_ms']:>9.1f} | "
+              f"{row['currency_vec_ms']:>9.1f} | {row['currency_apply_ms']:>9.1f} | "
+              f"{row['percent_mismatch'] + row['currency_mismatch']:>7}")
@@ -0,0 +1,215 @@
+# Arquivo: geometry_cache.py
+# Geometrias dos países para o globo, pré-simplificadas em níveis de detalhe.
+#
+# Passo offline (rodado pelo preprocess_data.py, ou `python geometry_cache.py --build`):
+# lê o shapefile Natural Earth 1:110m (data/ne_110m_admin_0_countries.zip) com
+# geopandas, simplifica a cobertura inteira de uma vez (shapely.coverage_simplify
+# mantém idênticas as fronteiras compartilhadas entre vizinhos), arredonda as
+# coordenadas e grava um GeoJSON por nível em data/cache/geometry/, com o código
+# ISO Alpha-3 como `id` de cada feature. Fontes extras (agregados próprios,
+# subdivisões) entram com `--extra arquivo:coluna_id`, acrescentando ou
+# substituindo ids. O Plotly só aceita GeoJSON em `go.Choropleth`, por isso não
+# há TopoJSON: o ganho das fronteiras compartilhadas vem da simplificação.
+#
+# Em execução só se usa json: cada nível é lido uma vez por processo e o globo
+# recebe apenas as features dos países exibidos, no nível escolhido pelo número de
+# regiões e pelo zoom (`pick_level`). Sem o cache (ou sem geopandas no passo
+# offline), o globo volta à busca por ISO embutida do Plotly.
+#
+# Executado como script, constrói o cache e compara tamanho do payload e tempo de
+# construção da figura do globo em cada nível.
+import argparse
+import functools
+import json
+import os
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+DATA_DIR = ROOT / "data"
+SHAPEFILE_NAME = "ne_110m_admin_0_countries.zip"
+CACHE_SUBDIR = Path("cache") / "geometry"
+MANIFEST_NAME = "geometry.manifest.json"
+GEOMETRY_VERSION = 1
+
+# Nível -> (tolerância da simplificação em graus, grade de arredondamento em graus)
+LEVELS = {
+    "alto": (0.0, 0.01),
+    "medio": (0.3, 0.01),
+    "baixo": (1.0, 0.05),
+}
+# Regiões "efetivas" (regiões / zoom²) até as quais cada nível ainda é usado
+LEVEL_LIMITS = (("alto", 25), ("medio", 80))
+
+
+# ─── 1) PASSO OFFLINE: SHAPEFILE -> GEOJSON POR NÍVEL ────────────
+def _feature_ids(gdf):
+    """ISO Alpha-3 de cada país; o Natural Earth marca alguns com '-99' (França, Noruega, Kosovo...)."""
+    iso = gdf["ISO_A3"].where(gdf["ISO_A3"] != "-99", gdf["ISO_A3_EH"])
+    return iso.where(iso != "-99", gdf["ADM0_A3"])
+
+
+def read_sources(shapefile, extras=()):
+    """
+    GeoDataFrame (WGS84) com colunas `id`, `name` e `geometry`: os países do
+    shapefile mais as fontes extras [(caminho, coluna_id)], que prevalecem por id.
+    """
+    import geopandas as gpd
+    import pandas as pd
+
+    gdf = gpd.read_file(f"zip://{shapefile}" if str(shapefile).endswith(".zip") else shapefile)
+    frames = [gpd.GeoDataFrame({"id": _feature_ids(gdf), "name": gdf["NAME"]}, geometry=gdf.geometry.values,
+                               crs=gdf.crs)]
+    for path, id_column in extras:
+        extra = gpd.read_file(path).to_crs(gdf.crs)
+        name = extra["name"] if "name" in extra.columns else extra[id_column]
+        frames.append(gpd.GeoDataFrame({"id": extra[id_column].astype(str), "name": name},
+                                       geometry=extra.geometry.values, crs=gdf.crs))
+    merged = pd.concat(frames, ignore_index=True).drop_duplicates("id", keep="last")
+    return gpd.GeoDataFrame(merged, geometry="geometry", crs=gdf.crs).to_crs(4326)
+
+
+def simplify_level(geoms, tolerance, grid):
+    """Simplifica a cobertura inteira (fronteiras comuns iguais), arredonda na grade e orienta os anéis."""
+    import numpy as np
+    import shapely
+
+    if tolerance:
+        try:
+            geoms = shapely.coverage_simplify(geoms, tolerance)
+        except Exception:
+            # Fontes extras podem se sobrepor aos países: a cobertura deixa de ser válida
+            geoms = shapely.simplify(geoms, tolerance, preserve_topology=True)
+    geoms = shapely.set_precision(geoms, grid)
+    # Anel externo no sentido horário, como o d3-geo do Plotly espera (o GeoJSON da RFC 7946 usa o anti-horário)
+    geoms = shapely.orient_polygons(geoms, exterior_cw=True)
+    decimals = max(0, int(round(-np.log10(grid))) + 1)
+    # Após a grade, o arredondamento só encurta a representação (0.35 em vez de 0.35000000000000003)
+    return shapely.transform(geoms, lambda coords: np.round(coords, decimals))
+
+
+def build_geometry_cache(shapefile, out_dir, extras=()):
+    """Grava um GeoJSON por nível em `out_dir`; retorna {nível: bytes}."""
+    from shapely.geometry import mapping
+
+    gdf = read_sources(shapefile, extras)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    sizes = {}
+    for level, (tolerance, grid) in LEVELS.items():
+        geoms = simplify_level(gdf.geometry.values, tolerance, grid)
+        features = [{"type": "Feature", "id": fid, "properties": {"name": name}, "geometry": mapping(geom)}
+                    for fid, name, geom in zip(gdf["id"], gdf["name"], geoms) if not geom.is_empty]
+        payload = json.dumps({"type": "FeatureCollection", "features": features}, separators=(",", ":"))
+        path = out_dir / f"countries_{level}.geojson"
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(payload, encoding="utf-8")
+        os.replace(tmp_path, path)
+        sizes[level] = len(payload)
+    return sizes
+
+
+def _source_state(paths):
+    return {str(p): [p.stat().st_size, p.stat().st_mtime_ns] for p in paths}
+
+
+def ensure_geometry_cache(data_dir=DATA_DIR, extras=()):
+    """
+    Reconstrói o cache se o shapefile (ou uma fonte extra) mudou. Retorna o
+    diretório do cache, ou None sem shapefile ou sem geopandas.
+    """
+    data_dir = Path(data_dir)
+    shapefile = data_dir / SHAPEFILE_NAME
+    if not shapefile.exists():
+        return None
+    out_dir = data_dir / CACHE_SUBDIR
+    manifest_path = out_dir / MANIFEST_NAME
+    state = {"version": GEOMETRY_VERSION, "levels": {k: list(v) for k, v in LEVELS.items()},
+             "sources": _source_state([shapefile] + [Path(p) for p, _ in extras])}
+    try:
+        if json.loads(manifest_path.read_text(encoding="utf-8")) == state:
+            return out_dir
+    except (OSError, ValueError):
+        pass
+
+    try:
+        sizes = build_geometry_cache(shapefile, out_dir, extras)
+    except ImportError:
+        print("AVISO: geopandas não instalado; o globo usará as geometrias embutidas do Plotly.")
+        return None
+    manifest_path.write_text(json.dumps(state, indent=1), encoding="utf-8")
+    print("Geometrias do globo gravadas: " + ", ".join(f"{k} {v / 1024:.0f} KB" for k, v in sizes.items()))
+    load_level.cache_clear()
+    return out_dir
+
+
+# ─── 2) EXECUÇÃO: NÍVEL DE DETALHE E RECORTE ─────────────────────
+def pick_level(n_regions, zoom=1.0):
+    """Nível de detalhe pelo número de regiões exibidas e pelo zoom (escala da projeção)."""
+    effective = n_regions / max(zoom, 1e-3) ** 2
+    for level, limit in LEVEL_LIMITS:
+        if effective <= limit:
+            return level
+    return "baixo"
+
+
+@functools.lru_cache(maxsize=None)
+def load_level(level, data_dir=DATA_DIR):
+    """{id: feature} de um nível, lido uma vez por processo; None se o cache não existe."""
+    path = Path(data_dir) / CACHE_SUBDIR / f"countries_{level}.geojson"
+    try:
+        collection = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return {feature["id"]: feature for feature in collection["features"]}
+
+
+def choropleth_geometry(ids, zoom=1.0, data_dir=DATA_DIR):
+    """
+    Argumentos de `go.Choropleth` com o GeoJSON só das regiões de `ids`, no nível
+    escolhido por `pick_level`. Sem cache, devolve {} (busca por ISO do Plotly).
+    """
+    ids = list(dict.fromkeys(ids))
+    features = load_level(pick_level(len(ids), zoom), data_dir)
+    if features is None:
+        return {}
+    subset = [features[i] for i in ids if i in features]
+    return {"geojson": {"type": "FeatureCollection", "features": subset}, "featureidkey": "id"}
+
+
+# ─── 3) BENCHMARK ────────────────────────────────────────────────
+def benchmark(df_map, repeats=5):
+    """Bytes do JSON e tempo de construção do globo: busca embutida x cada nível, para todas as regiões."""
+    import plotly.graph_objects as go
+
+    ids = df_map["ISO_Alpha3"].dropna().tolist()
+    cases = {"embutido": {}}
+    for level in LEVELS:
+        features = load_level(level)
+        subset = [features[i] for i in ids if i in features]
+        cases[level] = {"geojson": {"type": "FeatureCollection", "features": subset}, "featureidkey": "id"}
+    result = {}
+    for name, geometry in cases.items():
+        start = time.perf_counter()
+        for _ in range(repeats):
+            fig_json = go.Figure(go.Choropleth(locations=ids, z=df_map["GDP_per_capita"], **geometry)).to_json()
+        result[name] = {"json_kb": round(len(fig_json) / 1024, 1),
+                        "build_ms": round((time.perf_counter() - start) * 1000 / repeats, 1)}
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cache de geometrias do globo em níveis de detalhe.")
+    parser.add_argument("--build", action="store_true", help="Só (re)constrói o cache, se necessário.")
+    parser.add_argument("--extra", action="append", default=[], metavar="ARQUIVO:COLUNA_ID",
+                        help="Fonte extra de geometrias (GeoJSON, shapefile...) e a coluna com o id.")
+    parser.add_argument("--year", type=int, default=2030)
+    args = parser.parse_args()
+    extras = [tuple(spec.rsplit(":", 1)) for spec in args.extra]
+    if ensure_geometry_cache(DATA_DIR, extras) is None:
+        raise SystemExit(f"Não foi possível construir o cache (falta '{SHAPEFILE_NAME}' ou o geopandas).")
+    if not args.build:
+        from data_store import DashboardStore, open_dataset
+        dataset = open_dataset()
+        if dataset is None:
+            raise SystemExit("Dados não encontrados. Execute o script `preprocess_data.py` primeiro.")
+        print(json.dumps(benchmark(DashboardStore.from_dataset(dataset, args.year).forecast()), indent=1))
@@ -0,0 +1 @@
+# Pacote de modelagem: código reutilizável extraído do Project_one.ipynb.
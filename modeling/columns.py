@@ -0,0 +1,37 @@
+# Arquivo: modeling/columns.py
+# Nomes de colunas do pipeline de modelagem (os mesmos da classe ColNames do Project_one.ipynb).
+
+
+class ColNames:
+    ENTITY = 'Entity'
+    YEAR = 'Year'
+    CODE = 'Code'
+    GDP_PER_CAPITA = 'GDP per capita'
+    GDP_PER_CAPITA_LOG = 'GDP_per_capita_log'
+    INFLATION_ORIGINAL = '"Inflation, consumer prices (annual %)"'
+    INFLATION_CLEANED = 'Inflation, consumer prices (annual %)'
+    VALUE_GLOBAL_MERCHANDISE_EXPORTS = 'Value of global merchandise exports as a share of GDP'
+    GOVERNMENT_EXPENDITURE = 'Government expenditure (% of GDP)'
+    TRADE_AS_SHARE_OF_GDP = 'Trade as a Share of GDP'
+    ENTITY_ENCODED = 'Entity_Encoded'
+    GDP_PER_CAPITA_LAG1_ORIG = 'GDP_per_capita_lag1_orig'
+    INFLATION_LAG1 = 'Inflation_lag1'
+    TRADE_AS_SHARE_GDP_LAG1 = 'Trade_as_share_GDP_lag1'
+    GDP_GROWTH_RATE = 'GDP_growth_rate'
+    GDP_PER_CAPITA_MA3 = 'GDP_per_capita_MA3'
+    GDP_PER_CAPITA_VOLATILITY3 = 'GDP_per_capita_volatility3'
+    INFLATION_VOLATILITY3 = 'Inflation_volatility3'
+    INFLATION_WINSORIZED = 'Inflation_winsorized'
+    GDP_GROWTH_RATE_WINSORIZED = 'GDP_growth_rate_winsorized'
+    GOV_EXPENDITURE_WINSORIZED = 'Gov_expenditure_winsorized'
+    GDP_VOLATILITY_WINSORIZED = 'GDP_volatility_winsorized'
+    INFLATION_VOLATILITY_WINSORIZED = 'Inflation_volatility_winsorized'
+    INFLATION_LAG1_WINSORIZED = 'Inflation_lag1_winsorized'
+    TRADE_AS_SHARE_GDP_LAG1_WINSORIZED = 'Trade_as_share_GDP_lag1_winsorized'
+    GDP_PER_CAPITA_LAG1_ORIG_WINSORIZED = 'GDP_per_capita_lag1_orig_winsorized'
+    YEAR_SIN = 'Year_sin'
+    YEAR_COS = 'Year_cos'
+    GDP_PER_CAPITA_LOG_LAG1 = 'GDP_per_capita_log_lag1'
+    INTERACTION_LAGGDP_INFLATION = 'Interaction_LagGDP_Inflation'
+    Y_TRUE_ACTUAL_PIB = 'y_true_actual_pib'
+    Y_PRED_ACTUAL_PIB = 'y_pred_actual_pib'
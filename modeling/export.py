@@ -0,0 +1,197 @@
+# Arquivo: modeling/export.py
+# Exportação do LSTM (PyTorch) para inferência em CPU: TorchScript, ONNX e as
+# variantes int8 com quantização dinâmica (pesos do LSTM e da camada linear em
+# int8, ativações quantizadas em tempo de execução).
+#
+# O notebook (célula PyTorch do Project_one.ipynb) chama `export_lstm()` depois
+# da avaliação final: os artefatos vão para models/export/ e o relatório de
+# paridade compara o MAE de cada variante no conjunto de teste com o do modelo
+# em modo eager (e com o MAE de referência exibido no dashboard).
+#
+# Uso: python -m modeling.export --state models/best_lstm_model.pth
+#      (exporta e mede latência/vazão para lotes de 1 a 1024; sem o conjunto de
+#       teste, a paridade é medida sobre entradas sintéticas)
+import argparse
+import copy
+import logging
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from modeling.forecasting import _inverse_transform, torch_predictor
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_STATE = ROOT / "models" / "best_lstm_model.pth"
+DEFAULT_EXPORT_DIR = ROOT / "models" / "export"
+DASHBOARD_MAE = 178.14  # MAE de teste exibido em app.py / dashboard_pib.py
+BATCH_SIZES = (1, 4, 16, 64, 256, 1024)
+
+
+# ─── 1) EXPORTAÇÃO ───────────────────────────────────────────────
+def _example_inputs(model, batch_size, sequence_length):
+    import torch
+    return (torch.zeros(batch_size, sequence_length, model.num_numerical_features),
+            torch.zeros(batch_size, dtype=torch.int64))
+
+
+def quantize_int8(model):
+    """Quantização dinâmica int8 de nn.LSTM e nn.Linear (o embedding fica em float)."""
+    import torch
+    from torch import nn
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # avisos de depreciação da API de quantização
+        return torch.ao.quantization.quantize_dynamic(model, {nn.LSTM, nn.Linear}, dtype=torch.qint8)
+
+
+def export_torchscript(model, path, sequence_length):
+    """Grafo TorchScript (trace) salvo em `path`; devolve o módulo carregável."""
+    import torch
+    with warnings.catch_warnings(), torch.no_grad():
+        # A checagem de dimensão do forward vira constante no trace (é o esperado)
+        warnings.simplefilter("ignore")
+        traced = torch.jit.trace(model, _example_inputs(model, 8, sequence_length))
+        torch.jit.save(traced, str(path))
+    return traced
+
+
+def export_onnx(model, path, sequence_length, quantized_path=None):
+    """
+    Grafo ONNX com eixo de lote dinâmico e, se `quantized_path` for dado, a versão
+    com pesos int8 (onnxruntime.quantization). Requer os pacotes onnx/onnxruntime.
+    """
+    import torch
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        # Exemplo com lote 1: o LSTM sem h0/c0 explícitos só generaliza o lote assim
+        torch.onnx.export(model, _example_inputs(model, 1, sequence_length), str(path), dynamo=False,
+                          input_names=["x_numerical", "x_entity"], output_names=["y"],
+                          dynamic_axes={"x_numerical": {0: "batch"}, "x_entity": {0: "batch"}, "y": {0: "batch"}})
+    if quantized_path is not None:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(str(path), str(quantized_path), weight_type=QuantType.QInt8)
+
+
+def onnx_predictor(path, threads=None):
+    """predict_fn (mesma interface de modeling/forecasting.py) sobre uma sessão do onnxruntime."""
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    if threads:
+        options.intra_op_num_threads = threads
+    session = ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+
+    def predict(x_numerical, x_entity):
+        feeds = {"x_numerical": np.ascontiguousarray(x_numerical, dtype=np.float32),
+                 "x_entity": np.ascontiguousarray(x_entity, dtype=np.int64).reshape(-1)}
+        return session.run(None, feeds)[0].reshape(-1)
+    return predict
+
+
+def export_lstm(model, sequence_length, out_dir=DEFAULT_EXPORT_DIR, onnx=True):
+    """
+    Gera todas as variantes em `out_dir` e devolve {nome: predict_fn}, começando pelo
+    modelo eager. Sem onnx/onnxruntime instalados, as variantes ONNX são puladas.
+    """
+    import torch
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    model = copy.deepcopy(model).cpu().eval()  # não move o modelo do notebook para a CPU
+    quantized = quantize_int8(model)
+
+    predictors = {"eager": torch_predictor(model), "eager_int8": torch_predictor(quantized)}
+    predictors["torchscript"] = torch_predictor(
+        export_torchscript(model, out_dir / "lstm_torchscript.pt", sequence_length))
+    predictors["torchscript_int8"] = torch_predictor(
+        export_torchscript(quantized, out_dir / "lstm_torchscript_int8.pt", sequence_length))
+    if onnx:
+        try:
+            export_onnx(model, out_dir / "lstm.onnx", sequence_length, out_dir / "lstm_int8.onnx")
+            predictors["onnx"] = onnx_predictor(out_dir / "lstm.onnx", torch.get_num_threads())
+            predictors["onnx_int8"] = onnx_predictor(out_dir / "lstm_int8.onnx", torch.get_num_threads())
+        except (ImportError, torch.onnx.OnnxExporterError) as e:
+            logger.warning(f"Exportação ONNX pulada (instale onnx e onnxruntime): {e}")
+    logger.info(f"Variantes exportadas em {out_dir}: {', '.join(predictors)}")
+    return predictors
+
+
+# ─── 2) PARIDADE ─────────────────────────────────────────────────
+def _predict_all(predict_fn, X_numerical, X_entity, batch_size=1024):
+    X_entity = np.asarray(X_entity, dtype=np.int64).reshape(-1, 1)
+    return np.concatenate([predict_fn(np.asarray(X_numerical[i:i + batch_size], dtype=np.float32),
+                                      X_entity[i:i + batch_size])
+                           for i in range(0, len(X_entity), batch_size)])
+
+
+def parity_report(predictors, X_numerical, X_entity, y_scaled=None, target_scaler=None,
+                  reference="eager", reference_mae=DASHBOARD_MAE):
+    """
+    Compara as variantes com `reference` sobre as mesmas sequências. Com `y_scaled` e
+    `target_scaler`, calcula o MAE na escala original do PIB per capita (como
+    evaluate_model_lstm) e a diferença para o eager e para o MAE do dashboard.
+    """
+    preds = {name: _predict_all(fn, X_numerical, X_entity) for name, fn in predictors.items()}
+    base = preds[reference]
+    rows = []
+    for name, pred in preds.items():
+        row = {"variant": name, "max_abs_diff_scaled": float(np.abs(pred - base).max())}
+        if y_scaled is not None and target_scaler is not None:
+            actual = np.expm1(_inverse_transform(target_scaler, np.asarray(y_scaled, dtype="float64").reshape(-1)))
+            predicted = np.expm1(_inverse_transform(target_scaler, pred.astype("float64")))
+            row["mae_pib"] = float(np.abs(actual - predicted).mean())
+        rows.append(row)
+    report = pd.DataFrame(rows).set_index("variant")
+    if "mae_pib" in report:
+        report["mae_delta_vs_eager"] = report["mae_pib"] - report.at[reference, "mae_pib"]
+        report[f"mae_delta_vs_{reference_mae}"] = report["mae_pib"] - reference_mae
+    return report
+
+
+# ─── 3) LATÊNCIA E VAZÃO ─────────────────────────────────────────
+def benchmark_latency(predictors, num_numerical_features, num_entities, sequence_length,
+                      batch_sizes=BATCH_SIZES, min_time_s=0.5, seed=0):
+    """Mediana de latência por chamada (ms) e amostras/s de cada variante por tamanho de lote."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for batch_size in batch_sizes:
+        x_numerical = rng.normal(size=(batch_size, sequence_length, num_numerical_features)).astype(np.float32)
+        x_entity = rng.integers(0, num_entities, size=(batch_size, 1))
+        for name, predict_fn in predictors.items():
+            predict_fn(x_numerical, x_entity)  # aquecimento
+            times, total = [], 0.0
+            while total < min_time_s or len(times) < 5:
+                start = time.perf_counter()
+                predict_fn(x_numerical, x_entity)
+                times.append(time.perf_counter() - start)
+                total += times[-1]
+            latency = float(np.median(times))
+            rows.append({"variant": name, "batch_size": batch_size, "latency_ms": round(latency * 1000, 3),
+                         "samples_per_s": round(batch_size / latency, 1)})
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Exporta o LSTM (TorchScript/ONNX, fp32 e int8) e mede latência.")
+    parser.add_argument("--state", default=str(DEFAULT_STATE))
+    parser.add_argument("--out", default=str(DEFAULT_EXPORT_DIR))
+    parser.add_argument("--sequence-length", type=int, default=10)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=list(BATCH_SIZES))
+    parser.add_argument("--no-onnx", action="store_true")
+    args = parser.parse_args()
+
+    from modeling.torch_models import load_lstm_model
+    lstm = load_lstm_model(args.state)
+    variants = export_lstm(lstm, args.sequence_length, args.out, onnx=not args.no_onnx)
+    n_entities = lstm.entity_embedding.num_embeddings
+    rng = np.random.default_rng(1)
+    X_num = rng.normal(size=(2048, args.sequence_length, lstm.num_numerical_features)).astype(np.float32)
+    X_ent = rng.integers(0, n_entities, size=2048)
+    print(parity_report(variants, X_num, X_ent).to_string())
+    latency = benchmark_latency(variants, lstm.num_numerical_features, n_entities, args.sequence_length,
+                                args.batch_sizes)
+    print(latency.pivot(index="batch_size", columns="variant", values="latency_ms").to_string())
+    print(latency.pivot(index="batch_size", columns="variant", values="samples_per_s").to_string())
@@ -0,0 +1,368 @@
+# Arquivo: modeling/feature_store.py
+# Armazém de features já calculadas para o pipeline de modelagem.
+#
+# `initial_feature_engineering()` (lags, pct_change, média/volatilidade móveis de 3
+# anos por entidade, winsorização, sen/cos do ano) só depende do `df_raw` saído de
+# `preprocess_data()` e da configuração, mas era recalculada em cada célula do
+# Project_one.ipynb e o cache em pickle era invalidado à mão. Aqui o resultado é
+# gravado uma vez por chave (hash do conteúdo de `df_raw` + configuração + versão)
+# em `<raiz>/<chave>/`:
+#   - window.parquet      etapa por entidade (lags/rolling), base do modo incremental;
+#   - lstm.parquet/ml.parquet  os DataFrames devolvidos ao notebook;
+#   - lstm.npy/ml.npy     matrizes float64 (features, alvo, ano), lidas com mmap;
+#   - entity_codes.npy    código da entidade de cada linha das matrizes;
+#   - meta.json           listas de features, colunas das matrizes, entidades, pai.
+# A gravação é feita num diretório temporário renomeado no fim, de modo que
+# processos concorrentes (ex.: trials do Optuna) nunca leem um resultado parcial.
+#
+# Anos novos acrescentados a um conjunto já gravado (`append`) recalculam a etapa por
+# entidade só nas janelas finais (as últimas ROLLING_WINDOW - 1 linhas de cada
+# entidade + as linhas novas); as etapas globais (winsorização, medianas, sen/cos do
+# ano) dependem da coluna inteira e são refeitas, mas são vetorizadas.
+#
+# Executado como script, mede construção, leitura com mmap e acréscimo incremental.
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from modeling.columns import ColNames
+
+logger = logging.getLogger(__name__)
+
+# Incrementar quando as regras de engenharia de features mudarem (invalida as chaves antigas)
+FEATURE_VERSION = 2
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_ROOT = ROOT / "data" / "cache" / "features"
+DEFAULT_CONFIG = {"rolling_window": 3, "winsor_limits": (0.01, 0.01)}
+
+WINSORIZE_MAP = {
+    ColNames.INFLATION_CLEANED: ColNames.INFLATION_WINSORIZED,
+    ColNames.GDP_GROWTH_RATE: ColNames.GDP_GROWTH_RATE_WINSORIZED,
+    ColNames.GOVERNMENT_EXPENDITURE: ColNames.GOV_EXPENDITURE_WINSORIZED,
+    ColNames.GDP_PER_CAPITA_VOLATILITY3: ColNames.GDP_VOLATILITY_WINSORIZED,
+    ColNames.INFLATION_VOLATILITY3: ColNames.INFLATION_VOLATILITY_WINSORIZED,
+    ColNames.INFLATION_LAG1: ColNames.INFLATION_LAG1_WINSORIZED,
+    ColNames.TRADE_AS_SHARE_GDP_LAG1: ColNames.TRADE_AS_SHARE_GDP_LAG1_WINSORIZED,
+    ColNames.GDP_PER_CAPITA_LAG1_ORIG: ColNames.GDP_PER_CAPITA_LAG1_ORIG_WINSORIZED,
+}
+BASE_LSTM_FEATURES = [
+    ColNames.INFLATION_WINSORIZED, ColNames.INFLATION_LAG1_WINSORIZED,
+    ColNames.TRADE_AS_SHARE_GDP_LAG1_WINSORIZED, ColNames.GDP_GROWTH_RATE_WINSORIZED,
+    ColNames.GDP_VOLATILITY_WINSORIZED, ColNames.INFLATION_VOLATILITY_WINSORIZED,
+    ColNames.GOV_EXPENDITURE_WINSORIZED, ColNames.YEAR_SIN, ColNames.YEAR_COS,
+]
+ML_FEATURES = [
+    ColNames.GDP_PER_CAPITA_LAG1_ORIG_WINSORIZED, ColNames.INFLATION_WINSORIZED, ColNames.INFLATION_LAG1_WINSORIZED,
+    ColNames.TRADE_AS_SHARE_GDP_LAG1_WINSORIZED, ColNames.GDP_GROWTH_RATE_WINSORIZED,
+    ColNames.GDP_VOLATILITY_WINSORIZED, ColNames.INFLATION_VOLATILITY_WINSORIZED,
+    ColNames.GOV_EXPENDITURE_WINSORIZED, ColNames.YEAR,
+    ColNames.VALUE_GLOBAL_MERCHANDISE_EXPORTS,
+    ColNames.TRADE_AS_SHARE_OF_GDP,
+]
+CRITICAL_LAG_COLUMNS = [ColNames.GDP_PER_CAPITA_LAG1_ORIG, ColNames.INFLATION_LAG1,
+                        ColNames.TRADE_AS_SHARE_GDP_LAG1, ColNames.GDP_GROWTH_RATE]
+
+
+# ─── 1) ETAPA POR ENTIDADE (LAGS E JANELAS MÓVEIS) ───────────────
+def _sort_raw(df):
+    # Ordenação estável: há linhas repetidas de Entidade/Ano, que mantêm a ordem original
+    return df.sort_values(by=[ColNames.ENTITY, ColNames.YEAR], kind="stable").reset_index(drop=True)
+
+
+def entity_window_features(df, window=DEFAULT_CONFIG["rolling_window"]):
+    """
+    Lags de 1 ano, crescimento (%) e média/volatilidade móveis por entidade, com os
+    `groupby().shift(1)`, `pct_change()` e `rolling(window, min_periods=1)` do notebook.
+
+    `df` deve estar ordenado por Entidade/Ano (índice 0..n-1). O valor de cada linha só
+    depende das `window - 1` linhas anteriores da mesma entidade, o que permite o
+    recálculo incremental sobre um recorte pequeno (ver `FeatureStore.append`).
+    """
+    df = df.copy()
+    entity = df[ColNames.ENTITY]
+
+    def by_entity(name):
+        return pd.to_numeric(df[name], errors='coerce').groupby(entity, sort=False)
+
+    lag_sources = {ColNames.GDP_PER_CAPITA: ColNames.GDP_PER_CAPITA_LAG1_ORIG,
+                   ColNames.INFLATION_CLEANED: ColNames.INFLATION_LAG1,
+                   ColNames.TRADE_AS_SHARE_OF_GDP: ColNames.TRADE_AS_SHARE_GDP_LAG1}
+    for source, target in lag_sources.items():
+        df[target] = by_entity(source).shift(1) if source in df.columns else np.nan
+
+    if ColNames.GDP_PER_CAPITA in df.columns:
+        df[ColNames.GDP_GROWTH_RATE] = by_entity(ColNames.GDP_PER_CAPITA).pct_change() * 100
+        rolling = by_entity(ColNames.GDP_PER_CAPITA).rolling(window=window, min_periods=1)
+        df[ColNames.GDP_PER_CAPITA_MA3] = rolling.mean().reset_index(level=0, drop=True)
+        df[ColNames.GDP_PER_CAPITA_VOLATILITY3] = rolling.std().reset_index(level=0, drop=True)
+    else:
+        df[ColNames.GDP_GROWTH_RATE] = np.nan
+        df[ColNames.GDP_PER_CAPITA_MA3] = np.nan
+        df[ColNames.GDP_PER_CAPITA_VOLATILITY3] = np.nan
+    if ColNames.INFLATION_CLEANED in df.columns:
+        df[ColNames.INFLATION_VOLATILITY3] = by_entity(ColNames.INFLATION_CLEANED).rolling(
+            window=window, min_periods=1).std().reset_index(level=0, drop=True)
+    else:
+        df[ColNames.INFLATION_VOLATILITY3] = np.nan
+    return df
+
+
+# ─── 2) ETAPA GLOBAL (LIMPEZA, WINSORIZAÇÃO, SEN/COS DO ANO) ─────
+def finalize_features(df, winsor_limits=DEFAULT_CONFIG["winsor_limits"]):
+    """
+    Etapas que dependem da coluna inteira, sobre a saída de `entity_window_features`.
+
+    Devolve a mesma tupla de `initial_feature_engineering()` do notebook:
+    (df_cleaned, base_lstm_numerical_features, target_col_log, df_for_ml, ml_numerical_features).
+    """
+    from scipy.stats.mstats import winsorize
+
+    df = df.replace([np.inf, -np.inf], np.nan)
+    critical = [col for col in CRITICAL_LAG_COLUMNS if col in df.columns]
+    if critical:
+        df = df.dropna(subset=critical).reset_index(drop=True)
+        logger.info(f"Shape após dropna em lags/pct_change iniciais: {df.shape}")
+    for vol_col in [ColNames.GDP_PER_CAPITA_VOLATILITY3, ColNames.INFLATION_VOLATILITY3]:
+        if vol_col in df.columns:
+            df[vol_col] = df[vol_col].fillna(0)
+    if ColNames.GDP_PER_CAPITA in df.columns:
+        df[ColNames.GDP_PER_CAPITA_LOG] = np.log1p(df[ColNames.GDP_PER_CAPITA].clip(lower=0))
+    else:
+        df[ColNames.GDP_PER_CAPITA_LOG] = np.nan
+
+    for original_col, new_col_name in WINSORIZE_MAP.items():
+        if original_col in df.columns and df[original_col].notna().any():
+            non_nan_data = df[original_col].dropna()
+            if len(non_nan_data) > (1 / winsor_limits[0]) and len(non_nan_data) > (1 / winsor_limits[1]):
+                winsorized_data = np.asarray(winsorize(non_nan_data.to_numpy(), limits=winsor_limits))
+            else:
+                winsorized_data = non_nan_data.to_numpy()
+            values = np.full(len(df), np.nan)
+            values[df.index.get_indexer(non_nan_data.index)] = winsorized_data
+            median_val = np.nanmedian(values)
+            df[new_col_name] = np.where(np.isnan(values), median_val if not pd.isna(median_val) else 0, values)
+        else:
+            df[new_col_name] = 0
+
+    year_max_val = df[ColNames.YEAR].max() if ColNames.YEAR in df.columns and not df[ColNames.YEAR].empty else None
+    if pd.notna(year_max_val) and year_max_val > 0:
+        df[ColNames.YEAR_SIN] = np.sin(2 * np.pi * df[ColNames.YEAR] / year_max_val)
+        df[ColNames.YEAR_COS] = np.cos(2 * np.pi * df[ColNames.YEAR] / year_max_val)
+    else:
+        df[ColNames.YEAR_SIN] = 0
+        df[ColNames.YEAR_COS] = 0
+
+    target_col_log = ColNames.GDP_PER_CAPITA_LOG
+    base_lstm_numerical_features = [f for f in BASE_LSTM_FEATURES if f in df.columns]
+    ml_numerical_features = [f for f in ML_FEATURES if f in df.columns]
+    if df[target_col_log].isnull().all():
+        logger.error(f"Coluna alvo '{target_col_log}' está ausente ou toda NaN após engenharia inicial.")
+        return None, [], "", None, []
+    df_cleaned = df.dropna(subset=[target_col_log]).copy()
+    df_for_ml = df.dropna(subset=[target_col_log] + ml_numerical_features).reset_index(drop=True)
+    return df_cleaned, base_lstm_numerical_features, target_col_log, df_for_ml, ml_numerical_features
+
+
+def initial_feature_engineering(df_processed, config=None):
+    """Engenharia de features completa (sem cache), com a assinatura da função do notebook."""
+    if df_processed is None:
+        return None, None, None, None, None
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    window_df = entity_window_features(_sort_raw(df_processed), config["rolling_window"])
+    return finalize_features(window_df, tuple(config["winsor_limits"]))
+
+
+# ─── 3) ARMAZÉM EM DISCO ─────────────────────────────────────────
+class FeatureSet:
+    """Um resultado gravado: DataFrames em Parquet e matrizes .npy lidas com memory-mapping."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.key = self.directory.name
+        self.meta = json.loads((self.directory / "meta.json").read_text(encoding="utf-8"))
+
+    def frames(self):
+        """Tupla de `initial_feature_engineering()`: (df_cleaned, base_lstm, alvo, df_for_ml, ml)."""
+        df_cleaned = pd.read_parquet(self.directory / "lstm.parquet", memory_map=True)
+        df_for_ml = pd.read_parquet(self.directory / "ml.parquet", memory_map=True)
+        return (df_cleaned, list(self.meta["base_lstm_features"]), self.meta["target"],
+                df_for_ml, list(self.meta["ml_features"]))
+
+    def matrix(self, name="lstm", mmap_mode="r"):
+        """
+        Matriz float64 (linhas, colunas) de `name` ('lstm' ou 'ml'), mapeada em memória.
+        As colunas estão em `meta[f'{name}_columns']` (features, alvo e ano).
+        """
+        return np.load(self.directory / f"{name}.npy", mmap_mode=mmap_mode)
+
+    def entity_codes(self, name="lstm", mmap_mode="r"):
+        """Código (posição em `meta['entities']`) da entidade de cada linha da matriz."""
+        return np.load(self.directory / f"{name}_entity_codes.npy", mmap_mode=mmap_mode)
+
+    def window_frame(self):
+        return pd.read_parquet(self.directory / "window.parquet")
+
+
+def _hash_frame(df, config):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((FEATURE_VERSION, sorted(config.items()), list(df.columns))).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+class FeatureStore:
+    """
+    Cache de `initial_feature_engineering()` em disco, por hash do conteúdo de `df_raw`.
+
+    `build(df_raw)` devolve o `FeatureSet` da chave (calculando e gravando na falta);
+    `append(key, new_rows)` acrescenta anos novos recalculando só as janelas finais.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT, config=None):
+        self.root = Path(root)
+        self.config = {**DEFAULT_CONFIG, **(config or {})}
+        self.config["winsor_limits"] = tuple(self.config["winsor_limits"])
+
+    def key(self, df_raw):
+        return _hash_frame(_sort_raw(df_raw), self.config)
+
+    def load(self, key):
+        directory = self.root / key
+        return FeatureSet(directory) if (directory / "meta.json").exists() else None
+
+    def build(self, df_raw, force=False):
+        raw = _sort_raw(df_raw)
+        key = _hash_frame(raw, self.config)
+        cached = None if force else self.load(key)
+        if cached is not None:
+            logger.info(f"Features carregadas do armazém: {cached.directory}")
+            return cached
+        logger.info("Executando a engenharia de features (chave %s)...", key)
+        window_df = entity_window_features(raw, self.config["rolling_window"])
+        return self._save(key, list(df_raw.columns), window_df)
+
+    def append(self, key, new_rows):
+        """
+        Acrescenta linhas de anos posteriores aos já gravados em `key` e devolve o novo
+        `FeatureSet`. A etapa por entidade é recalculada só sobre as últimas
+        `rolling_window - 1` linhas de cada entidade afetada + as linhas novas; se
+        alguma linha nova não for posterior ao último ano da entidade, recalcula tudo.
+        """
+        base = self.load(key)
+        if base is None:
+            raise KeyError(f"Chave de features não encontrada no armazém: {key}")
+        raw_columns = base.meta["raw_columns"]
+        window_df = base.window_frame()
+        new_rows = _sort_raw(new_rows[raw_columns])
+
+        last_year = window_df.groupby(ColNames.ENTITY, sort=False)[ColNames.YEAR].max()
+        previous = new_rows[ColNames.ENTITY].map(last_year)
+        if (previous.notna() & (new_rows[ColNames.YEAR] <= previous)).any():
+            logger.info("Linhas novas não são anos posteriores aos gravados; recalculando todas as features.")
+            return self.build(pd.concat([window_df[raw_columns], new_rows], ignore_index=True))
+
+        context_rows = self.config["rolling_window"] - 1
+        touched = window_df[ColNames.ENTITY].isin(new_rows[ColNames.ENTITY].unique())
+        context = window_df.loc[touched, raw_columns].groupby(ColNames.ENTITY, sort=False).tail(context_rows)
+        chunk = _sort_raw(pd.concat([context.assign(_new=False), new_rows.assign(_new=True)], ignore_index=True))
+        chunk = entity_window_features(chunk, self.config["rolling_window"])
+        appended = chunk[chunk.pop("_new").to_numpy()]
+
+        window_df = _sort_raw(pd.concat([window_df, appended], ignore_index=True))
+        new_key = _hash_frame(window_df[raw_columns], self.config)
+        cached = self.load(new_key)
+        if cached is not None:
+            return cached
+        logger.info(f"Acréscimo incremental: {len(appended)} linhas novas em {appended[ColNames.ENTITY].nunique()} "
+                    f"entidades (janelas recalculadas sobre {len(chunk)} linhas).")
+        return self._save(new_key, raw_columns, window_df, parent=key)
+
+    def _save(self, key, raw_columns, window_df, parent=None):
+        df_cleaned, base_lstm, target, df_for_ml, ml_features = finalize_features(
+            window_df, self.config["winsor_limits"])
+        if df_cleaned is None:
+            raise ValueError("A engenharia de features não produziu a coluna alvo.")
+        entities = sorted(window_df[ColNames.ENTITY].dropna().unique())
+        meta = {
+            "version": FEATURE_VERSION, "key": key, "parent": parent,
+            "config": {**self.config, "winsor_limits": list(self.config["winsor_limits"])},
+            "raw_columns": raw_columns, "target": target,
+            "base_lstm_features": base_lstm, "ml_features": ml_features,
+            "entities": entities, "rows": {"lstm": len(df_cleaned), "ml": len(df_for_ml)},
+        }
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(prefix=f".{key}-", dir=self.root))
+        try:
+            window_df.to_parquet(tmp / "window.parquet", index=False)
+            for name, frame, features in (("lstm", df_cleaned, base_lstm), ("ml", df_for_ml, ml_features)):
+                frame.to_parquet(tmp / f"{name}.parquet")
+                columns = list(dict.fromkeys(features + [target, ColNames.YEAR]))
+                meta[f"{name}_columns"] = columns
+                np.save(tmp / f"{name}.npy", frame[columns].to_numpy(dtype=np.float64, na_value=np.nan))
+                codes = pd.Categorical(frame[ColNames.ENTITY], categories=entities).codes.astype(np.int32)
+                np.save(tmp / f"{name}_entity_codes.npy", codes)
+            (tmp / "meta.json").write_text(json.dumps(meta, indent=2, ensure_ascii=False), encoding="utf-8")
+            try:
+                os.replace(tmp, self.root / key)
+            except OSError:
+                # Outro processo gravou a mesma chave primeiro: o conteúdo é o mesmo
+                shutil.rmtree(tmp, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        logger.info(f"Features gravadas no armazém: {self.root / key}")
+        return FeatureSet(self.root / key)
+
+
+# ─── 4) BENCHMARK ────────────────────────────────────────────────
+def benchmark(df_raw, root, holdout_years=1):
+    """Tempos de cálculo/gravação, leitura com mmap e acréscimo do(s) último(s) ano(s)."""
+    store = FeatureStore(root)
+    raw = _sort_raw(df_raw)
+    timings = {}
+
+    start = time.perf_counter()
+    entity_window_features(raw)
+    timings["window_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    full = store.build(raw, force=True)
+    timings["cold_build_s"] = time.perf_counter() - start
+    start = time.perf_counter()
+    matrix = store.build(raw).matrix("lstm")
+    float(matrix[:, 0].sum())  # toca a coluna para medir leitura real
+    timings["warm_mmap_s"] = time.perf_counter() - start
+
+    cutoff = raw[ColNames.YEAR].max() - holdout_years
+    old_rows, new_rows = raw[raw[ColNames.YEAR] <= cutoff], raw[raw[ColNames.YEAR] > cutoff]
+    base = store.build(old_rows)
+    start = time.perf_counter()
+    appended = store.append(base.key, new_rows)
+    timings["append_s"] = time.perf_counter() - start
+
+    return {**{k: round(v, 3) for k, v in timings.items()},
+            "rows": len(raw), "new_rows": len(new_rows),
+            "append_same_key": appended.key == full.key,
+            "append_max_abs_diff": float(np.nanmax(np.abs(appended.matrix("lstm") - full.matrix("lstm"))))
+            if appended.matrix("lstm").shape == full.matrix("lstm").shape else float("inf")}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do armazém de features.")
+    parser.add_argument("--raw", default=str(ROOT / "data" / "cache" / "df_raw_processed.parquet"),
+                        help="df_raw já pré-processado (saída de preprocess_data()).")
+    parser.add_argument("--root", default=None, help="Diretório do armazém (padrão: temporário).")
+    args = parser.parse_args()
+    df_raw = pd.read_parquet(args.raw)
+    root = args.root or tempfile.mkdtemp(prefix="feature_store_")
+    print(benchmark(df_raw, root))
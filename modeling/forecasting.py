@@ -0,0 +1,271 @@
+# Arquivo: modeling/forecasting.py
+# Previsão de longo prazo em lote para todas as entidades.
+#
+# Substitui o `forecast_gdp_iterative()` do Project_one.ipynb, que filtrava o
+# histórico e chamava o modelo uma vez por entidade e por ano. Aqui todas as
+# entidades avançam juntas: a cada passo do horizonte há uma única chamada ao
+# modelo com um tensor (entidades, SEQUENCE_LENGTH, features), e a projeção das
+# features exógenas (tendência linear dos últimos 5 anos) é feita com somas por
+# grupo, sem um LinearRegression por entidade/feature.
+#
+# A saída segue o esquema de `data/gdp_forecast_to_2030.csv`:
+# Entity, Year, GDP per capita, Type ('Historical'/'Forecast').
+import argparse
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from modeling.columns import ColNames
+
+logger = logging.getLogger(__name__)
+
+N_YEARS_FOR_TREND = 5
+SCALER_PREFIX = "lstm"
+OUTPUT_COLUMNS = [ColNames.ENTITY, ColNames.YEAR, ColNames.GDP_PER_CAPITA, 'Type']
+
+
+# ─── 1) ADAPTADORES DE MODELO ────────────────────────────────────
+# Um "predict_fn" recebe (x_numerical float32 [B, L, F], x_entity int64 [B, 1]) e
+# devolve as previsões do alvo normalizado, shape [B].
+def keras_predictor(model, batch_size=4096):
+    """Adapta o modelo Keras (entradas 'numerical_input'/'entity_input')."""
+    def predict(x_numerical, x_entity):
+        inputs = {'numerical_input': x_numerical, 'entity_input': x_entity}
+        if len(x_numerical) <= batch_size:
+            # Chamada direta: evita o custo fixo de model.predict() a cada passo
+            return np.asarray(model(inputs, training=False)).reshape(-1)
+        return model.predict(inputs, batch_size=batch_size, verbose=0).reshape(-1)
+    return predict
+
+
+def torch_predictor(model, device="cpu"):
+    """Adapta o LSTMForecastModel do PyTorch (forward(x_numerical, x_entity_code))."""
+    import torch
+    model.eval()
+
+    def predict(x_numerical, x_entity):
+        with torch.no_grad():
+            y = model(torch.from_numpy(x_numerical).to(device), torch.from_numpy(x_entity.reshape(-1)).to(device))
+        return y.reshape(-1).cpu().numpy()
+    return predict
+
+
+# ─── 2) OPERAÇÕES VETORIZADAS ────────────────────────────────────
+def _transform(scaler, values):
+    """StandardScaler.transform em arrays de qualquer forma (vetorizado quando possível)."""
+    mean, scale = getattr(scaler, "mean_", None), getattr(scaler, "scale_", None)
+    if scale is not None or mean is not None:
+        out = values - (mean[0] if mean is not None else 0.0)
+        return out / (scale[0] if scale is not None else 1.0)
+    return scaler.transform(values.reshape(-1, 1)).reshape(values.shape)
+
+
+def _inverse_transform(scaler, values):
+    mean, scale = getattr(scaler, "mean_", None), getattr(scaler, "scale_", None)
+    if scale is not None or mean is not None:
+        return values * (scale[0] if scale is not None else 1.0) + (mean[0] if mean is not None else 0.0)
+    return scaler.inverse_transform(values.reshape(-1, 1)).reshape(values.shape)
+
+
+def project_exogenous_batch(history, features, entities, future_years, n_trend=N_YEARS_FOR_TREND):
+    """
+    Projeta as features exógenas de todas as entidades de uma vez.
+
+    Mesma regra do `project_exogenous_features()` do notebook: reta de mínimos
+    quadrados sobre os últimos `n_trend` anos com dado; com menos de 2 pontos,
+    repete o último valor (ou 0). `future_years` é [E, H]; devolve {feature: [E, H]}.
+    """
+    projected = {}
+    for feature in features:
+        if feature not in history.columns:
+            logger.warning(f"Feature exógena '{feature}' não encontrada no histórico. Preenchendo com 0 para o futuro.")
+            projected[feature] = np.zeros(future_years.shape)
+            continue
+        points = history[[ColNames.ENTITY_ENCODED, ColNames.YEAR, feature]].dropna()
+        points = points.groupby(ColNames.ENTITY_ENCODED, sort=False).tail(n_trend)
+        x = points[ColNames.YEAR].to_numpy(dtype="float64")
+        y = points[feature].to_numpy(dtype="float64")
+        sums = pd.DataFrame({"e": points[ColNames.ENTITY_ENCODED].to_numpy(), "n": 1.0, "x": x, "y": y,
+                             "xx": x * x, "xy": x * y}).groupby("e", sort=False)
+        agg = sums[["n", "x", "y", "xx", "xy"]].sum().reindex(entities)
+        last = sums["y"].last().reindex(entities).fillna(0.0).to_numpy()
+
+        n, sx, sy, sxx, sxy = (agg[col].fillna(0.0).to_numpy() for col in ("n", "x", "y", "xx", "xy"))
+        denom = n * sxx - sx * sx
+        trend = (n >= 2) & (denom != 0)
+        slope = np.divide(n * sxy - sx * sy, denom, out=np.zeros_like(denom), where=trend)
+        intercept = np.divide(sy - slope * sx, n, out=np.zeros_like(n), where=trend)
+        projected[feature] = np.where(trend[:, None], intercept[:, None] + slope[:, None] * future_years,
+                                      last[:, None])
+    return projected
+
+
+# ─── 3) PREVISÃO EM LOTE ─────────────────────────────────────────
+def forecast_all_entities(predict_fn, history_df, model_features, target_col, sequence_length, until_year,
+                          exog_features, scalers, lag_col=ColNames.GDP_PER_CAPITA_LOG_LAG1,
+                          interaction_col=ColNames.INTERACTION_LAGGDP_INFLATION, history_is_scaled=True):
+    """
+    Previsão iterativa até `until_year` para todas as entidades de `history_df`.
+
+    `history_df` é o histórico já processado (features do modelo normalizadas e o
+    alvo em log normalizado), com Entity, Entity_Encoded e Year. `exog_features`
+    são as features projetadas por tendência (sem lag/interação/seno/cosseno do
+    ano). Com `history_is_scaled=True` as exógenas são projetadas já na escala do
+    modelo e só o seno/cosseno do ano passam pelos scalers `lstm_*`.
+    Retorna um DataFrame no esquema do CSV de previsão.
+    """
+    df = history_df.sort_values([ColNames.ENTITY_ENCODED, ColNames.YEAR], kind="stable").reset_index(drop=True)
+    codes = df[ColNames.ENTITY_ENCODED].to_numpy()
+    if len(codes) == 0:
+        return pd.DataFrame(columns=OUTPUT_COLUMNS)
+
+    starts = np.concatenate(([0], np.flatnonzero(codes[1:] != codes[:-1]) + 1))
+    stops = np.append(starts[1:], len(codes))
+    long_enough = (stops - starts) >= sequence_length
+    for start in starts[~long_enough]:
+        logger.warning(f"Histórico insuficiente para {df.at[start, ColNames.ENTITY]}. Pulando previsão de longo prazo.")
+    starts, stops = starts[long_enough], stops[long_enough]
+    entities = codes[starts]
+    names = df[ColNames.ENTITY].to_numpy()[starts]
+    years = df[ColNames.YEAR].to_numpy(dtype="int64")
+    last_years = years[stops - 1]
+    n_steps = np.clip(until_year - last_years, 0, None)
+    horizon = int(n_steps.max()) if len(n_steps) else 0
+
+    # Janela inicial [E, L, F] e último valor do alvo por entidade
+    values = df[list(model_features)].to_numpy(dtype=np.float32)
+    target = df[target_col].to_numpy(dtype="float64")
+    window = values[stops[:, None] - sequence_length + np.arange(sequence_length)]
+    last_target = target[stops - 1].astype(np.float32)
+
+    # Linhas futuras [E, H, F]: exógenas projetadas + seno/cosseno do ano; lag e interação entram a cada passo
+    future_years = last_years[:, None] + np.arange(1, horizon + 1)
+    projected = project_exogenous_batch(df, exog_features, entities, future_years)
+    max_hist_year = last_years[:, None].astype("float64")
+    projected[ColNames.YEAR_SIN] = np.sin(2 * np.pi * future_years / max_hist_year)
+    projected[ColNames.YEAR_COS] = np.cos(2 * np.pi * future_years / max_hist_year)
+    position = {name: i for i, name in enumerate(model_features)}
+    rows = np.zeros((len(entities), horizon, len(model_features)), dtype=np.float32)
+    for col, proj in projected.items():
+        scaler = scalers.get(f"{SCALER_PREFIX}_{col}")
+        if scaler is not None and (col in (ColNames.YEAR_SIN, ColNames.YEAR_COS) or not history_is_scaled):
+            proj = _transform(scaler, proj)
+        if col in position:
+            rows[:, :, position[col]] = proj
+    inflation = rows[:, :, position[ColNames.INFLATION_WINSORIZED]] if ColNames.INFLATION_WINSORIZED in position \
+        else np.zeros(rows.shape[:2], dtype=np.float32)
+
+    predictions = np.full((len(entities), horizon), np.nan, dtype=np.float32)
+    entity_input = entities.astype(np.int64).reshape(-1, 1)
+    for step in range(horizon):
+        active = np.flatnonzero(n_steps > step)
+        pred = np.asarray(predict_fn(window[active], entity_input[active]), dtype=np.float32).reshape(-1)
+        predictions[active, step] = pred
+
+        new_rows = rows[active, step]
+        if lag_col in position:
+            new_rows[:, position[lag_col]] = last_target[active]
+        if interaction_col in position:
+            new_rows[:, position[interaction_col]] = last_target[active] * inflation[active, step]
+        if target_col in position:
+            new_rows[:, position[target_col]] = pred
+        last_target[active] = pred
+        window[active] = np.concatenate([window[active, 1:], new_rows[:, None, :]], axis=1)
+
+    return _to_output(df, starts, stops, names, future_years, predictions, n_steps, target, scalers[target_col])
+
+
+def _to_output(df, starts, stops, names, future_years, predictions, n_steps, target, target_scaler):
+    """Histórico + previsões desnormalizados (expm1 do log) no esquema do CSV."""
+    lengths = stops - starts
+    hist_index = np.concatenate([np.arange(a, b) for a, b in zip(starts, stops)]) if len(starts) else np.array([], int)
+    hist = pd.DataFrame({
+        ColNames.ENTITY: np.repeat(names, lengths),
+        ColNames.YEAR: df[ColNames.YEAR].to_numpy()[hist_index],
+        ColNames.GDP_PER_CAPITA: np.expm1(_inverse_transform(target_scaler, target[hist_index])),
+        'Type': 'Historical',
+        '_order': np.repeat(np.arange(len(names)), lengths),
+    })
+    mask = np.arange(future_years.shape[1])[None, :] < n_steps[:, None]
+    fc = pd.DataFrame({
+        ColNames.ENTITY: np.repeat(names, n_steps),
+        ColNames.YEAR: future_years[mask],
+        ColNames.GDP_PER_CAPITA: np.expm1(_inverse_transform(target_scaler, predictions[mask].astype("float64"))),
+        'Type': 'Forecast',
+        '_order': np.repeat(np.arange(len(names)), n_steps),
+    })
+    out = pd.concat([hist, fc], ignore_index=True).sort_values('_order', kind="stable")
+    return out[OUTPUT_COLUMNS].reset_index(drop=True)
+
+
+def write_forecast_csv(df_forecast, path):
+    """Grava as previsões no formato de `data/gdp_forecast_to_2030.csv`."""
+    df_forecast[OUTPUT_COLUMNS].to_csv(path, index=False)
+    logger.info(f"Previsões de longo prazo salvas em: {path}")
+
+
+# ─── 4) BENCHMARK (MODELO SINTÉTICO) ─────────────────────────────
+def _synthetic_problem(n_entities, n_years=40, n_exog=7, seed=0):
+    from types import SimpleNamespace
+    rng = np.random.default_rng(seed)
+    exog = [f"exog_{i}" for i in range(n_exog)]
+    features = exog + [ColNames.YEAR_SIN, ColNames.YEAR_COS, ColNames.GDP_PER_CAPITA_LOG_LAG1,
+                       ColNames.INTERACTION_LAGGDP_INFLATION]
+    features[0] = ColNames.INFLATION_WINSORIZED
+    exog[0] = ColNames.INFLATION_WINSORIZED
+    last_years = 2022 - rng.integers(0, 3, n_entities)
+    frames = []
+    for e in range(n_entities):
+        yrs = np.arange(last_years[e] - n_years + 1, last_years[e] + 1)
+        frame = pd.DataFrame(rng.normal(size=(len(yrs), len(features))), columns=features)
+        frame[ColNames.ENTITY], frame[ColNames.ENTITY_ENCODED], frame[ColNames.YEAR] = f"E{e}", e, yrs
+        frame[ColNames.GDP_PER_CAPITA_LOG] = rng.normal(size=len(yrs))
+        frames.append(frame)
+    scaler = SimpleNamespace(mean_=np.array([9.0]), scale_=np.array([1.2]))
+    weights = rng.normal(scale=0.1, size=len(features)).astype(np.float32)
+
+    def predict_fn(x_numerical, x_entity):
+        return x_numerical[:, -1, :] @ weights + 0.01 * x_entity[:, 0]
+
+    return pd.concat(frames, ignore_index=True), features, exog, predict_fn, {ColNames.GDP_PER_CAPITA_LOG: scaler}
+
+
+def benchmark(n_entities=200, sequence_length=10, until_year=2030, per_call_ms=0.0):
+    """Compara uma chamada por entidade (como o loop do notebook) com a previsão em lote."""
+    history, features, exog, predict_fn, scalers = _synthetic_problem(n_entities)
+    calls = {"n": 0}
+
+    def counted(x_numerical, x_entity):
+        calls["n"] += 1
+        if per_call_ms:
+            time.sleep(per_call_ms / 1000)  # custo fixo por chamada do framework
+        return predict_fn(x_numerical, x_entity)
+
+    kwargs = dict(model_features=features, target_col=ColNames.GDP_PER_CAPITA_LOG, sequence_length=sequence_length,
+                  until_year=until_year, exog_features=exog, scalers=scalers)
+    start = time.perf_counter()
+    per_entity = pd.concat([forecast_all_entities(counted, group, **kwargs)
+                            for _, group in history.groupby(ColNames.ENTITY_ENCODED)], ignore_index=True)
+    loop_s, loop_calls = time.perf_counter() - start, calls["n"]
+
+    calls["n"] = 0
+    start = time.perf_counter()
+    batched = forecast_all_entities(counted, history, **kwargs)
+    batch_s, batch_calls = time.perf_counter() - start, calls["n"]
+
+    # Diferença relativa: só arredondamento float32 do produto matricial em lotes de tamanhos diferentes
+    ref = per_entity[ColNames.GDP_PER_CAPITA].to_numpy()
+    diff = np.abs(ref - batched[ColNames.GDP_PER_CAPITA].to_numpy()) / np.abs(ref)
+    return {"entities": n_entities, "per_entity_s": round(loop_s, 3), "per_entity_calls": loop_calls,
+            "batched_s": round(batch_s, 3), "batched_calls": batch_calls, "max_rel_diff": float(diff.max())}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark da previsão em lote (modelo sintético).")
+    parser.add_argument("--entities", type=int, default=200)
+    parser.add_argument("--per-call-ms", type=float, default=0.0,
+                        help="Custo fixo simulado por chamada ao modelo (ex.: overhead do Keras).")
+    args = parser.parse_args()
+    print(benchmark(args.entities, per_call_ms=args.per_call_ms))
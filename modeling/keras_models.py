@@ -0,0 +1,36 @@
+# Arquivo: modeling/keras_models.py
+# Arquitetura LSTM (Keras) com embedding de entidade, a mesma do Project_one.ipynb.
+# Fica num módulo importável para que os processos do `modeling.tuning` (iniciados
+# com "spawn") possam construir o modelo sem depender do estado do notebook.
+from tensorflow import keras
+from tensorflow.keras import layers, regularizers
+
+
+def create_lstm_model_keras(num_numerical_features, num_entities, embedding_dim, hidden_units, num_layers, dropout_prob,
+                            sequence_length, l2_reg):
+    numerical_input = layers.Input(shape=(sequence_length, num_numerical_features), name='numerical_input')
+    entity_input = layers.Input(shape=(1,), name='entity_input')
+    entity_embedding_layer = layers.Embedding(
+        input_dim=num_entities, output_dim=embedding_dim, name='entity_embedding',
+        embeddings_regularizer=regularizers.l2(l2_reg) if l2_reg > 0 else None
+    )(entity_input)
+    entity_embedding_flattened = layers.Flatten()(entity_embedding_layer)
+    entity_embedding_repeated = layers.RepeatVector(sequence_length)(entity_embedding_flattened)
+    concatenated_features = layers.Concatenate(axis=-1, name='concatenate_features')(
+        [numerical_input, entity_embedding_repeated])
+    lstm_out = concatenated_features
+    for i in range(num_layers):
+        return_sequences_flag = True if i < num_layers - 1 else False
+        lstm_layer_instance = layers.LSTM(
+            hidden_units, return_sequences=return_sequences_flag, name=f'lstm_layer_{i + 1}',
+            kernel_regularizer=regularizers.l2(l2_reg) if l2_reg > 0 else None,
+            recurrent_regularizer=regularizers.l2(l2_reg) if l2_reg > 0 else None
+        )
+        lstm_out = lstm_layer_instance(lstm_out)
+        if i < num_layers - 1:
+            lstm_out = layers.Dropout(dropout_prob, name=f'lstm_dropout_{i + 1}')(lstm_out)
+    final_dropout = layers.Dropout(dropout_prob, name='final_dropout')(lstm_out)
+    output = layers.Dense(1, name='output_layer', kernel_regularizer=regularizers.l2(l2_reg) if l2_reg > 0 else None)(
+        final_dropout)
+    model = keras.Model(inputs=[numerical_input, entity_input], outputs=output, name='lstm_forecast_model_keras')
+    return model
@@ -0,0 +1,95 @@
+# Arquivo: modeling/load_test.py
+# Gerador de carga para o servidor de inferência (modeling/serving.py).
+#
+# Dispara requisições POST /forecast a partir de N threads, cada uma com a sua
+# conexão HTTP persistente, com países e horizontes sorteados entre os que o
+# servidor conhece (GET /countries). Ao final mostra vazão e latência p50/p95/p99,
+# além das estatísticas de lote do servidor (GET /stats).
+#
+# Uso: python -m modeling.load_test --url http://127.0.0.1:8000 --concurrency 32 --requests 2000
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+
+def _connection(url):
+    parsed = urlparse(url)
+    return http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=60)
+
+
+def _get(url, path):
+    conn = _connection(url)
+    try:
+        conn.request("GET", path)
+        return json.loads(conn.getresponse().read())
+    finally:
+        conn.close()
+
+
+def run_load(url, n_requests=2000, concurrency=32, countries_per_request=3, max_horizon=8, seed=0):
+    """Executa a carga e devolve um dict com vazão, percentis de latência (ms) e erros."""
+    countries = _get(url, "/countries")["countries"]
+    rng = np.random.default_rng(seed)
+    bodies = [json.dumps({"countries": list(rng.choice(countries, size=min(countries_per_request, len(countries)),
+                                                       replace=False)),
+                          "horizon": int(rng.integers(1, max_horizon + 1))}).encode()
+              for _ in range(n_requests)]
+    latencies = np.full(n_requests, np.nan)
+    errors = []
+    counter = iter(range(n_requests))
+    lock = threading.Lock()
+
+    def worker():
+        conn = _connection(url)
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            start = time.perf_counter()
+            try:
+                conn.request("POST", "/forecast", body=bodies[i], headers={"Content-Type": "application/json"})
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors.append(response.status)
+                    continue
+            except (OSError, http.client.HTTPException) as e:
+                errors.append(type(e).__name__)
+                conn.close()
+                conn = _connection(url)
+                continue
+            latencies[i] = (time.perf_counter() - start) * 1000
+        conn.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    ok = latencies[~np.isnan(latencies)]
+    p50, p95, p99 = np.percentile(ok, [50, 95, 99]) if len(ok) else (np.nan,) * 3
+    return {"requests": n_requests, "concurrency": concurrency, "errors": len(errors),
+            "elapsed_s": round(elapsed, 2), "requests_per_s": round(len(ok) / elapsed, 1),
+            "p50_ms": round(float(p50), 1), "p95_ms": round(float(p95), 1), "p99_ms": round(float(p99), 1),
+            "max_ms": round(float(ok.max()), 1) if len(ok) else float("nan"),
+            "server": _get(url, "/stats")}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga do servidor de previsões.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--countries", type=int, default=3, help="Países por requisição.")
+    parser.add_argument("--max-horizon", type=int, default=8)
+    args = parser.parse_args()
+    print(json.dumps(run_load(args.url, args.requests, args.concurrency, args.countries, args.max_horizon), indent=2))
@@ -0,0 +1,274 @@
+# Arquivo: modeling/sequences.py
+# Construção vetorizada das janelas (sequências) de treino das LSTMs.
+#
+# Substitui o corpo de `create_sequences_from_df()` (PyTorch) e de
+# `create_sequences_from_df_keras()` (Keras) do Project_one.ipynb, que filtravam o
+# DataFrame uma vez por entidade e copiavam cada janela para uma lista. Aqui o
+# DataFrame é ordenado uma única vez por entidade (ordenação estável, mantendo a
+# ordem das linhas dentro de cada entidade), as linhas válidas viram uma matriz
+# contígua (linhas, features) e cada grupo é descrito por um offset. As janelas são
+# visões de `numpy.lib.stride_tricks.sliding_window_view` sobre essa matriz: a
+# janela i é `windows[starts[i]]`, sem cópia. Janelas que cruzariam a fronteira
+# entre duas entidades simplesmente não aparecem em `starts`.
+#
+# A mesma `SequenceSet` atende os dois caminhos:
+#   - PyTorch: `TimeSeriesDataset(seqs.X, seqs.y, seqs.entity)` indexa `seqs.X[idx]`,
+#     que devolve a visão da janela;
+#   - Keras: `tf_dataset(seqs.X, ...)` monta o tf.data.Dataset a partir dos
+#     índices de início e reúne as janelas do lote com `tf.gather`.
+# Para conjuntos grandes, `save()`/`load(mmap_mode='r')` guardam a matriz de linhas
+# em .npy e a reabrem mapeada em memória; as janelas continuam sendo visões.
+#
+# Executado como script, compara tempo, memória e resultado com o loop do notebook.
+import argparse
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+_ARRAYS = ("values", "targets", "entities", "starts")
+
+
+# ─── 1) JANELAS COMO VISÕES ──────────────────────────────────────
+class SequenceWindows:
+    """
+    Janelas (N, L, F) sobre a matriz de linhas `values` (M, F), sem materializá-las.
+
+    Expõe `shape`, `ndim`, `dtype` e `len()` como um array; `X[i]` é uma visão
+    (L, F) da janela i. Índices fatiados/vetoriais e `np.asarray(X)` materializam
+    só as janelas pedidas, numa única cópia.
+    """
+
+    def __init__(self, values, starts, length):
+        self.values = values
+        self.starts = starts
+        self.length = length
+        n_features = values.shape[1]
+        if len(values) >= length:
+            # (M-L+1, F, L) -> (M-L+1, L, F): continua sendo uma visão de `values`
+            self._view = sliding_window_view(values, length, axis=0).transpose(0, 2, 1)
+        else:
+            self._view = np.empty((0, length, n_features), dtype=values.dtype)
+        self.shape = (len(starts), length, n_features)
+        self.ndim = 3
+        self.dtype = values.dtype
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, idx):
+        # Índice inteiro: visão da janela; fatia/vetor: cópia só das janelas pedidas
+        return self._view[self.starts[idx]]
+
+    def __array__(self, dtype=None, copy=None):
+        out = self._view[self.starts]
+        return out if dtype is None else out.astype(dtype, copy=False)
+
+    @property
+    def nbytes(self):
+        """Memória realmente ocupada (a matriz de linhas), não a das N janelas."""
+        return self.values.nbytes + self.starts.nbytes
+
+
+class SequenceSet:
+    """
+    Resultado de `build_sequences`: janelas, alvo e entidade de cada sequência.
+
+    `X` é um `SequenceWindows` (N, L, F); `y` é (N, 1) float32 com o alvo na
+    posição i+L; `entity` é (N,) com o código da entidade (`entity_col`).
+    """
+
+    def __init__(self, values, targets, entities, starts, length):
+        self.values = values
+        self.targets = targets
+        self.entities = entities
+        self.starts = starts
+        self.length = length
+        self.X = SequenceWindows(values, starts, length)
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def y(self):
+        return self.targets[self.starts + self.length].reshape(-1, 1)
+
+    @property
+    def entity(self):
+        return self.entities[self.starts]
+
+    def to_numpy(self):
+        """(X, y, entity) materializados, com os mesmos shapes da função do notebook."""
+        return np.asarray(self.X), self.y, self.entity
+
+    def save(self, directory):
+        """Grava as matrizes em .npy (uma por array) para reabrir com `load(mmap_mode='r')`."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(directory / f"{name}.npy", getattr(self, name))
+        (directory / "length.txt").write_text(str(self.length))
+        return directory
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        directory = Path(directory)
+        arrays = [np.load(directory / f"{name}.npy", mmap_mode=mmap_mode) for name in _ARRAYS]
+        return cls(*arrays, int((directory / "length.txt").read_text()))
+
+
+# ─── 2) CONSTRUÇÃO ───────────────────────────────────────────────
+def _empty(n_features, length, entity_dtype=np.int64):
+    return SequenceSet(np.empty((0, n_features), dtype=np.float32), np.empty(0, dtype=np.float32),
+                       np.empty(0, dtype=entity_dtype), np.empty(0, dtype=np.int64), length)
+
+
+def build_sequences(df, numerical_features, target_col, entity_col_encoded, sequence_length,
+                    require_all_features=False):
+    """
+    Janelas de `sequence_length` linhas por entidade, com o alvo da linha seguinte.
+
+    Mesmas regras das funções do notebook: as features são convertidas com
+    `pd.to_numeric(errors='coerce')`, linhas com NaN em features/alvo são
+    descartadas, entidades com menos de `sequence_length + 1` linhas válidas não
+    geram janelas, e a saída segue a ordem de aparição das entidades e das linhas.
+    Com `require_all_features=True` (regra do caminho PyTorch), a ausência de uma
+    feature no DataFrame, ou uma feature toda nula numa entidade, descarta a entidade.
+    """
+    features = list(numerical_features)
+    length = sequence_length
+    if require_all_features and any(f not in df.columns for f in features):
+        return _empty(len(features), length)
+    features = [f for f in features if f in df.columns]
+
+    codes, _ = pd.factorize(df[entity_col_encoded], sort=False)
+    entity_values = df[entity_col_encoded].to_numpy()
+    values = np.column_stack([pd.to_numeric(df[f], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+                              for f in features]) if features else np.empty((len(df), 0))
+    targets = pd.to_numeric(df[target_col], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+
+    valid = (codes >= 0) & ~np.isnan(targets) & ~np.isnan(values).any(axis=1)
+    if require_all_features and features:
+        # Feature toda nula (antes da conversão) numa entidade descarta a entidade inteira
+        has_data = df[features].notna().to_numpy()
+        n_codes = codes.max() + 1 if len(codes) else 0
+        counts = np.stack([np.bincount(codes[codes >= 0], weights=has_data[codes >= 0, j], minlength=n_codes)
+                           for j in range(len(features))], axis=1)
+        complete = (counts > 0).all(axis=1)
+        valid &= complete[np.maximum(codes, 0)]
+
+    # Ordenação única: estável, então as entidades ficam na ordem de aparição
+    rows = np.flatnonzero(valid)
+    rows = rows[np.argsort(codes[rows], kind="stable")]
+    if len(rows) == 0:
+        return _empty(len(features), length, entity_values.dtype if len(df) else np.int64)
+    group_codes = codes[rows]
+
+    # Offsets de cada grupo e índices de início das janelas que cabem inteiras no grupo
+    boundaries = np.concatenate(([0], np.flatnonzero(group_codes[1:] != group_codes[:-1]) + 1, [len(rows)]))
+    offsets, sizes = boundaries[:-1], np.diff(boundaries)
+    n_windows = np.maximum(sizes - length, 0)
+    first_window = np.cumsum(n_windows) - n_windows
+    starts = np.arange(n_windows.sum(), dtype=np.int64) + np.repeat(offsets - first_window, n_windows)
+
+    return SequenceSet(np.ascontiguousarray(values[rows], dtype=np.float32), targets[rows].astype(np.float32),
+                       entity_values[rows], starts, length)
+
+
+# ─── 3) TF.DATA ──────────────────────────────────────────────────
+def tf_dataset(X_numerical_seq, X_entity_seq, y_target_seq, batch_size, shuffle=False, drop_remainder=False, seed=None):
+    """
+    tf.data.Dataset com as entradas 'numerical_input'/'entity_input' do modelo Keras.
+
+    Com um `SequenceWindows`, o dataset percorre só os índices de início e reúne as
+    janelas de cada lote com `tf.gather` sobre a matriz de linhas (M, F), em vez de
+    carregar as N × L × F posições de uma vez. Arrays comuns seguem o caminho antigo.
+    """
+    import tensorflow as tf
+    entity = np.asarray(X_entity_seq, dtype=np.int64).reshape(-1, 1)
+    y = np.asarray(y_target_seq, dtype=np.float32).reshape(-1, 1)
+
+    if isinstance(X_numerical_seq, SequenceWindows):
+        values = tf.constant(np.asarray(X_numerical_seq.values))
+        offsets = tf.range(X_numerical_seq.length, dtype=tf.int64)
+        dataset = tf.data.Dataset.from_tensor_slices((X_numerical_seq.starts.astype(np.int64), entity, y))
+    else:
+        dataset = tf.data.Dataset.from_tensor_slices((
+            {'numerical_input': X_numerical_seq, 'entity_input': entity}, y))
+
+    if shuffle:
+        dataset = dataset.shuffle(buffer_size=len(y), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size, drop_remainder=drop_remainder)
+    if isinstance(X_numerical_seq, SequenceWindows):
+        def gather_windows(starts, entity_batch, y_batch):
+            windows = tf.gather(values, starts[:, None] + offsets)
+            return {'numerical_input': windows, 'entity_input': entity_batch}, y_batch
+        dataset = dataset.map(gather_windows, num_parallel_calls=tf.data.AUTOTUNE)
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+# ─── 4) BENCHMARK (DADOS SINTÉTICOS) ─────────────────────────────
+def _loop_sequences(df, numerical_features, target_col, entity_col_encoded, sequence_length):
+    """Referência: o loop por entidade/janela de `create_sequences_from_df_keras()`."""
+    X_seq, y_seq, e_seq = [], [], []
+    for entity_code in df[entity_col_encoded].unique():
+        temp = df[df[entity_col_encoded] == entity_code][numerical_features + [target_col]].copy()
+        for col in numerical_features:
+            temp[col] = pd.to_numeric(temp[col], errors='coerce')
+        temp = temp.dropna(subset=numerical_features + [target_col])
+        if len(temp) < sequence_length + 1:
+            continue
+        X_np = temp[numerical_features].astype(np.float32).values
+        y_np = temp[target_col].astype(np.float32).values
+        for i in range(len(temp) - sequence_length):
+            X_seq.append(X_np[i: i + sequence_length])
+            y_seq.append(y_np[i + sequence_length])
+            e_seq.append(entity_code)
+    return np.array(X_seq, dtype=np.float32), np.array(y_seq, dtype=np.float32).reshape(-1, 1), np.array(e_seq)
+
+
+def _synthetic_frame(n_entities, n_years=60, n_features=12, nan_rate=0.02, seed=0):
+    rng = np.random.default_rng(seed)
+    n = n_entities * n_years
+    features = [f"feat_{j}" for j in range(n_features)]
+    data = rng.normal(size=(n, n_features)).astype(np.float32)
+    data[rng.random((n, n_features)) < nan_rate] = np.nan
+    df = pd.DataFrame(data, columns=features)
+    df["Entity_Encoded"] = np.repeat(rng.permutation(n_entities), n_years)
+    df["target"] = rng.normal(size=n)
+    # Linhas das entidades intercaladas: o loop precisa filtrar, o construtor ordena uma vez
+    return df.sample(frac=1.0, random_state=seed, ignore_index=True), features
+
+
+def _measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def benchmark(n_entities=200, sequence_length=10):
+    """Tempo, pico de memória e igualdade entre o loop do notebook e o construtor vetorizado."""
+    df, features = _synthetic_frame(n_entities)
+    (X_ref, y_ref, e_ref), loop_s, loop_peak = _measure(
+        lambda: _loop_sequences(df, features, "target", "Entity_Encoded", sequence_length))
+    seqs, vec_s, vec_peak = _measure(lambda: build_sequences(df, features, "target", "Entity_Encoded", sequence_length))
+    X, y, e = seqs.to_numpy()
+    return {"windows": len(seqs), "loop_s": round(loop_s, 3), "loop_peak_mb": round(loop_peak / 2 ** 20, 1),
+            "vectorized_s": round(vec_s, 3), "vectorized_peak_mb": round(vec_peak / 2 ** 20, 1),
+            "windows_mb": round(seqs.X.nbytes / 2 ** 20, 1), "materialized_mb": round(X.nbytes / 2 ** 20, 1),
+            "identical": bool(np.array_equal(X, X_ref) and np.array_equal(y, y_ref) and np.array_equal(e, e_ref))}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do construtor vetorizado de sequências.")
+    parser.add_argument("--entities", type=int, default=200)
+    parser.add_argument("--sequence-length", type=int, default=10)
+    args = parser.parse_args()
+    print(benchmark(args.entities, args.sequence_length))
@@ -0,0 +1,329 @@
+# Arquivo: modeling/serving.py
+# Servidor local de inferência (ASGI) para o LSTM treinado, com micro-lotes.
+#
+# O modelo e o "pacote de serviço" (histórico recente já normalizado, scalers e
+# listas de features, gravados pelo Project_one.ipynb com `save_serving_bundle`)
+# são carregados uma vez. Requisições concorrentes entram numa fila; um único
+# laço de inferência junta o que chegou até `max_batch_size` países ou até
+# `max_wait_ms` depois da primeira requisição e roda uma só previsão em lote
+# (`forecast_all_entities`, uma chamada ao modelo por ano do horizonte) para todos.
+# Com uma inferência por vez e lotes limitados, a latência fica previsível: no pior
+# caso, uma requisição espera o lote em andamento mais o seu próprio.
+#
+# Rotas:
+#   POST /forecast  {"countries": ["Brazil", "China"], "horizons": [1, 5, 8]}
+#                   (ou "horizon": 8 = todos os anos de 1 a 8 à frente)
+#   GET  /health    estado e tamanho do pacote
+#   GET  /stats     lotes, tamanho médio de lote e latência de inferência
+#
+# Uso: python -m modeling.serving --model models/best_lstm_model.keras
+#      python -m modeling.serving --synthetic   (modelo sintético, sem TensorFlow)
+# Carga: python -m modeling.load_test --url http://127.0.0.1:8000
+import argparse
+import asyncio
+import json
+import logging
+import pickle
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from modeling.columns import ColNames
+from modeling.forecasting import N_YEARS_FOR_TREND, forecast_all_entities, keras_predictor
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_MODEL = ROOT / "models" / "best_lstm_model.keras"
+DEFAULT_BUNDLE = ROOT / "models" / "serving_bundle"
+DEFAULT_MAX_BATCH_SIZE = 256
+DEFAULT_MAX_WAIT_MS = 10.0
+MAX_HORIZON = 50
+
+
+# ─── 1) PACOTE DE SERVIÇO ────────────────────────────────────────
+def save_serving_bundle(directory, history_df, model_features, target_col, sequence_length, exog_features, scalers):
+    """
+    Grava o que o servidor precisa além do modelo: as últimas linhas de cada entidade
+    (o suficiente para a janela do LSTM e para a tendência das exógenas), já no
+    formato de `forecast_all_entities`, e os scalers/listas de features.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    keep = max(sequence_length, N_YEARS_FOR_TREND)
+    columns = list(dict.fromkeys([ColNames.ENTITY, ColNames.ENTITY_ENCODED, ColNames.YEAR, target_col]
+                                 + list(model_features) + list(exog_features)))
+    recent = (history_df.sort_values([ColNames.ENTITY_ENCODED, ColNames.YEAR], kind="stable")
+              .groupby(ColNames.ENTITY_ENCODED, sort=False).tail(keep)[columns].reset_index(drop=True))
+    recent.to_parquet(directory / "history.parquet", index=False)
+    with open(directory / "bundle.pkl", "wb") as f:
+        pickle.dump({"model_features": list(model_features), "target_col": target_col,
+                     "sequence_length": sequence_length, "exog_features": list(exog_features),
+                     "scalers": scalers}, f)
+    logger.info(f"Pacote de serviço salvo em: {directory} ({len(recent)} linhas, "
+                f"{recent[ColNames.ENTITY].nunique()} entidades)")
+    return directory
+
+
+class ForecastService:
+    """Previsões por país e horizonte sobre o pacote de serviço, em lote."""
+
+    def __init__(self, predict_fn, history_df, model_features, target_col, sequence_length, exog_features, scalers):
+        self.predict_fn = predict_fn
+        self.model_features = list(model_features)
+        self.target_col = target_col
+        self.sequence_length = sequence_length
+        self.exog_features = list(exog_features)
+        self.scalers = scalers
+        self.history = history_df.sort_values([ColNames.ENTITY, ColNames.YEAR], kind="stable").reset_index(drop=True)
+        names = self.history[ColNames.ENTITY].to_numpy()
+        starts = np.concatenate(([0], np.flatnonzero(names[1:] != names[:-1]) + 1)) if len(names) else np.array([], int)
+        stops = np.append(starts[1:], len(names))
+        self._ranges = {names[a]: (int(a), int(b)) for a, b in zip(starts, stops)}
+        years = self.history[ColNames.YEAR].to_numpy(dtype="int64")
+        self.last_year = {name: int(years[b - 1]) for name, (a, b) in self._ranges.items()}
+
+    @classmethod
+    def from_bundle(cls, predict_fn, directory=DEFAULT_BUNDLE):
+        directory = Path(directory)
+        with open(directory / "bundle.pkl", "rb") as f:
+            meta = pickle.load(f)
+        return cls(predict_fn, pd.read_parquet(directory / "history.parquet"), **meta)
+
+    @property
+    def countries(self):
+        return sorted(self._ranges)
+
+    def forecast(self, requests):
+        """
+        `requests`: lista de (países, horizontes). Devolve, na mesma ordem, um dict por
+        requisição com as previsões e os países desconhecidos. Todos os países do lote
+        são previstos juntos, até o maior ano pedido.
+        """
+        wanted = {}
+        for countries, horizons in requests:
+            for country in countries:
+                if country in self._ranges:
+                    target = self.last_year[country] + max(horizons)
+                    wanted[country] = max(wanted.get(country, target), target)
+        forecasts = {}
+        if wanted:
+            history = pd.concat([self.history.iloc[slice(*self._ranges[c])] for c in sorted(wanted)],
+                                ignore_index=True)
+            out = forecast_all_entities(self.predict_fn, history, self.model_features, self.target_col,
+                                        self.sequence_length, max(wanted.values()), self.exog_features, self.scalers)
+            out = out[out['Type'] == 'Forecast']
+            for country, group in out.groupby(ColNames.ENTITY, sort=False):
+                forecasts[country] = dict(zip(group[ColNames.YEAR].astype(int), group[ColNames.GDP_PER_CAPITA]))
+
+        results = []
+        for countries, horizons in requests:
+            rows, unknown = [], []
+            for country in countries:
+                if country not in self._ranges:
+                    unknown.append(country)
+                    continue
+                by_year = forecasts.get(country, {})
+                for h in horizons:
+                    year = self.last_year[country] + h
+                    value = by_year.get(year)
+                    rows.append({"country": country, "horizon": h, "year": year,
+                                 "gdp_per_capita": None if value is None or np.isnan(value) else float(value)})
+            results.append({"forecasts": rows, "unknown": unknown})
+        return results
+
+
+# ─── 2) MICRO-LOTES ──────────────────────────────────────────────
+class MicroBatcher:
+    """
+    Junta requisições concorrentes em lotes: fecha o lote ao somar `max_batch_size`
+    países ou `max_wait_ms` depois da primeira requisição, o que vier antes. Os
+    lotes rodam um por vez, numa thread, sem bloquear o laço de eventos.
+    """
+
+    def __init__(self, service, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.service = service
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = None
+        self._task = None
+        self.batches = 0
+        self.requests = 0
+        self.inference_s = 0.0
+        self.max_inference_s = 0.0
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, countries, horizons):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(((countries, horizons), future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            size = len(batch[0][0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                size += len(item[0][0])
+
+            start = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(None, self.service.forecast, [req for req, _ in batch])
+            except Exception as e:  # falha do lote: todas as requisições dele recebem o erro
+                logger.exception("Falha na inferência do lote")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            elapsed = time.perf_counter() - start
+            self.batches += 1
+            self.requests += len(batch)
+            self.inference_s += elapsed
+            self.max_inference_s = max(self.max_inference_s, elapsed)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self):
+        return {"batches": self.batches, "requests": self.requests,
+                "mean_requests_per_batch": round(self.requests / self.batches, 2) if self.batches else 0.0,
+                "mean_inference_ms": round(1000 * self.inference_s / self.batches, 2) if self.batches else 0.0,
+                "max_inference_ms": round(1000 * self.max_inference_s, 2),
+                "max_batch_size": self.max_batch_size, "max_wait_ms": self.max_wait * 1000}
+
+
+# ─── 3) APLICAÇÃO ASGI ───────────────────────────────────────────
+def _parse_request(body):
+    """(países, horizontes) a partir do JSON; ValueError com a mensagem para o cliente."""
+    try:
+        payload = json.loads(body or b"{}")
+    except json.JSONDecodeError:
+        raise ValueError("Corpo da requisição não é um JSON válido.")
+    if not isinstance(payload, dict):
+        raise ValueError("O corpo da requisição deve ser um objeto JSON.")
+    countries = payload.get("countries")
+    if isinstance(countries, str):
+        countries = [countries]
+    if not isinstance(countries, list) or not countries or not all(isinstance(c, str) for c in countries):
+        raise ValueError("Informe 'countries' como uma lista de nomes de países.")
+    horizons = payload.get("horizons")
+    if horizons is None:
+        horizon = payload.get("horizon", 1)
+        horizons = list(range(1, int(horizon) + 1)) if isinstance(horizon, int) else None
+    if (not isinstance(horizons, list) or not horizons
+            or not all(isinstance(h, int) and 1 <= h <= MAX_HORIZON for h in horizons)):
+        raise ValueError(f"Informe 'horizons' (ou 'horizon') com inteiros entre 1 e {MAX_HORIZON}.")
+    return list(dict.fromkeys(countries)), sorted(set(horizons))
+
+
+def create_app(service, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+    """Aplicação ASGI mínima (sem framework) para rodar com uvicorn ou outro servidor ASGI."""
+    batcher = MicroBatcher(service, max_batch_size, max_wait_ms)
+
+    async def send_json(send, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def read_body(receive):
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    batcher.start()
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await batcher.stop()
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        method, path = scope["method"], scope["path"]
+        if method == "GET" and path == "/health":
+            await send_json(send, 200, {"status": "ok", "countries": len(service.countries)})
+        elif method == "GET" and path == "/stats":
+            await send_json(send, 200, batcher.stats())
+        elif method == "GET" and path == "/countries":
+            await send_json(send, 200, {"countries": service.countries})
+        elif method == "POST" and path == "/forecast":
+            try:
+                countries, horizons = _parse_request(await read_body(receive))
+            except ValueError as e:
+                await send_json(send, 400, {"error": str(e)})
+                return
+            try:
+                result = await batcher.submit(countries, horizons)
+            except Exception as e:
+                await send_json(send, 500, {"error": f"Falha na inferência: {e}"})
+                return
+            await send_json(send, 200, result)
+        else:
+            await send_json(send, 404, {"error": f"Rota não encontrada: {method} {path}"})
+
+    app.batcher = batcher
+    return app
+
+
+# ─── 4) EXECUÇÃO ─────────────────────────────────────────────────
+def load_keras_service(model_path=DEFAULT_MODEL, bundle_dir=DEFAULT_BUNDLE):
+    from tensorflow import keras
+    model = keras.models.load_model(model_path)
+    return ForecastService.from_bundle(keras_predictor(model), bundle_dir)
+
+
+def synthetic_service(n_entities=200):
+    """Serviço com o modelo sintético do benchmark de `modeling.forecasting` (sem TensorFlow)."""
+    from modeling.forecasting import _synthetic_problem
+    history, features, exog, predict_fn, scalers = _synthetic_problem(n_entities)
+    return ForecastService(predict_fn, history, features, ColNames.GDP_PER_CAPITA_LOG, 10, exog, scalers)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Servidor local de previsões do LSTM com micro-lotes.")
+    parser.add_argument("--model", default=str(DEFAULT_MODEL))
+    parser.add_argument("--bundle", default=str(DEFAULT_BUNDLE))
+    parser.add_argument("--synthetic", action="store_true", help="Usa um modelo sintético (testes de carga).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    import uvicorn
+    service = synthetic_service() if args.synthetic else load_keras_service(args.model, args.bundle)
+    logger.info(f"Modelo carregado: {len(service.countries)} países disponíveis.")
+    uvicorn.run(create_app(service, args.max_batch_size, args.max_wait_ms), host=args.host, port=args.port,
+                log_level="warning")
@@ -0,0 +1,47 @@
+# Arquivo: modeling/torch_models.py
+# Arquitetura LSTM (PyTorch) com embedding de entidade, a mesma do Project_one.ipynb.
+# Fica num módulo importável para que a exportação (modeling/export.py) consiga
+# reconstruir o modelo a partir de models/best_lstm_model.pth sem o notebook.
+import torch
+import torch.nn as nn
+
+
+class LSTMForecastModel(nn.Module):
+    def __init__(self, num_numerical_features, num_entities, embedding_dim, hidden_units, num_layers, dropout_prob=0.2):
+        super(LSTMForecastModel, self).__init__()
+        self.num_numerical_features = num_numerical_features
+        self.embedding_dim = embedding_dim
+        self.entity_embedding = nn.Embedding(num_embeddings=num_entities, embedding_dim=embedding_dim)
+        self.lstm_input_size = num_numerical_features + embedding_dim
+        self.lstm = nn.LSTM( input_size=self.lstm_input_size, hidden_size=hidden_units,
+                             num_layers=num_layers, batch_first=True, dropout=dropout_prob if num_layers > 1 else 0)
+        self.dropout = nn.Dropout(dropout_prob)
+        self.linear = nn.Linear(in_features=hidden_units, out_features=1)
+    def forward(self, x_numerical, x_entity_code_for_seq):
+        entity_embeddings_batch = self.entity_embedding(x_entity_code_for_seq)
+        seq_len = x_numerical.size(1)
+        entity_embeddings_repeated = entity_embeddings_batch.unsqueeze(1).repeat(1, seq_len, 1)
+        combined_features = torch.cat((x_numerical, entity_embeddings_repeated), dim=2)
+        if combined_features.shape[-1] != self.lstm.input_size:
+            raise RuntimeError(f"Discrepância de dimensão de entrada no LSTM! Esperado: {self.lstm.input_size}, Recebido: {combined_features.shape[-1]}. NumFeat (modelo): {self.num_numerical_features}, EmbDim (modelo): {self.embedding_dim}, x_numerical shape: {x_numerical.shape}")
+        lstm_out, _ = self.lstm(combined_features)
+        last_time_step_out = lstm_out[:, -1, :]
+        dropped_out = self.dropout(last_time_step_out)
+        y_pred = self.linear(dropped_out)
+        return y_pred
+
+
+def load_lstm_model(path, map_location="cpu"):
+    """
+    Reconstrói o LSTMForecastModel a partir de um state_dict salvo pelo notebook.
+    As dimensões (features, entidades, embedding, unidades, camadas) saem dos
+    próprios pesos; o dropout não importa em modo de avaliação.
+    """
+    state = torch.load(path, map_location=map_location, weights_only=True)
+    num_entities, embedding_dim = state['entity_embedding.weight'].shape
+    hidden_units = state['lstm.weight_hh_l0'].shape[1]
+    num_layers = sum(1 for key in state if key.startswith('lstm.weight_ih_l'))
+    num_numerical_features = state['lstm.weight_ih_l0'].shape[1] - embedding_dim
+    model = LSTMForecastModel(num_numerical_features, num_entities, embedding_dim, hidden_units, num_layers, 0.0)
+    model.load_state_dict(state)
+    return model.eval()
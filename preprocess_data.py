@@ -1,168 +1,969 @@
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from pathlib import Path
+from urllib.parse import quote
 import time
 
+from aggregates import build_aggregates
+from geometry_cache import ensure_geometry_cache
+
 
 # Este script realiza o pré-processamento dos dados (ETL).
 # Ele deve ser executado uma única vez ou sempre que os dados brutos forem atualizados.
 # Ele lê os múltiplos arquivos CSV, limpa, transforma, combina os dados e salva
 # um único arquivo Parquet otimizado para ser consumido pelo dashboard Streamlit.
-
-def preprocess_data():
+# Além dele, grava um dataset Parquet particionado no estilo Hive (Type/Continent),
+# ordenado por País e Ano, para que o dashboard leia apenas as partições, colunas
+# e row groups necessários para cada filtro. Também grava uma pequena tabela de
+# agregados (KPIs e rankings de CAGR por continente) consultada pelos dashboards.
+#
+# Com `--incremental`, o script compara a impressão digital (tamanho, mtime e
+# SHA-256) de cada fonte com o manifesto salvo ao lado do Parquet e refaz apenas
+# as etapas e os países afetados. Sem mudanças nas fontes, a execução é um no-op.
+#
+# O shapefile de países (data/ne_110m_admin_0_countries.zip) vira GeoJSON
+# pré-simplificado em níveis de detalhe para o globo (ver geometry_cache.py).
+#
+# O Parquet único leva no rodapé a versão do esquema (`SCHEMA_VERSION`), conferida
+# pelos dashboards antes de servi-lo (ver `data_store.artifact_status`).
+#
+# Com `--streaming`, a reconstrução lê as fontes em lotes com o leitor CSV do
+# pyarrow e um esquema declarado (só as colunas usadas), limpa e mapeia cada lote
+# e grava o Parquet único e as partições à medida que avança: o pico de memória
+# depende do tamanho do lote (`--block-mb`), não do tamanho do histórico (ver seção 5).
+
+ROOT = Path(__file__).resolve().parent
+DATA_DIR = ROOT / "data"
+OUTPUT_NAME = "dashboard_data.parquet"
+MANIFEST_NAME = "dashboard_data.manifest.json"
+DATASET_NAME = "dashboard_dataset"
+AGGREGATES_NAME = "dashboard_aggregates.parquet"
+FORECAST_YEAR = 2030
+MANIFEST_VERSION = 1
+# Versão do layout do artefato. 2: inclui a trajetória da previsão antes do ano-alvo
+# (linhas 'Forecast' com CAGR nulo), usada nas séries temporais dos dashboards.
+SCHEMA_VERSION = 2
+SCHEMA_METADATA_KEY = b"dashboard_schema_version"
+
+# Colunas de partição (diretórios Hive) e tamanho dos row groups dentro de cada arquivo.
+# Row groups pequenos e ordenados por País/Ano dão estatísticas min/max seletivas.
+PARTITION_COLS = ['Type', 'Continent']
+ROW_GROUP_SIZE = 16_384
+
+# Fontes do ETL: chave lógica -> nome do arquivo em `data/`
+SOURCES = {
+    "ready": "gdp_dashboard_ready_data.csv",
+    "historic": "gdp_per_capita.csv",
+    "forecast": "gdp_forecast_to_2030.csv",
+}
+
+COLS_FINAL = ['Country', 'Year', 'GDP_per_capita', 'Continent', 'Type', 'ISO_Alpha3', 'CAGR']
+HISTORIC_DIGEST_COLS = ['Country', 'Year', 'GDP_per_capita']
+
+# Esquema declarado das fontes: só estas colunas são lidas e convertidas (os dumps de
+# indicadores do Banco Mundial trazem dezenas de colunas que o ETL ignora).
+SOURCE_COLUMNS = {
+    "Entity": pa.string(),
+    "Year": pa.int32(),
+    "GDP per capita": pa.float64(),
+}
+READY_COLUMNS = {
+    "Entity": pa.string(),
+    "Year": pa.int32(),
+    "CAGR_Forecast": pa.float64(),
+    "ISO_Alpha3": pa.string(),
+    "Continent": pa.string(),
+}
+# Marcadores de valor ausente: os do pandas e o '..' usado nos dumps do Banco Mundial
+NULL_MARKERS = ["", "..", "NA", "N/A", "#N/A", "NaN", "nan", "NULL", "null"]
+
+
+# ─── 1) IMPRESSÕES DIGITAIS E MANIFESTO ──────────────────────────
+def file_digest(path, chunk_size=1 << 20):
+    """Calcula o SHA-256 do conteúdo de um arquivo lendo-o em blocos."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint_sources(data_dir, previous=None):
     """
-    Função principal de ETL para preparar os dados do dashboard.
+    Retorna {fonte: {size, mtime_ns, sha256}} para cada arquivo de SOURCES.
+    O SHA-256 só é recalculado quando tamanho ou mtime diferem do manifesto anterior.
     """
-    start_time = time.time()
-    ROOT = Path(__file__).resolve().parent
-    DATA_DIR = ROOT / "data"
+    previous = previous or {}
+    fingerprints = {}
+    for key, name in SOURCES.items():
+        path = data_dir / name
+        if not path.exists():
+            fingerprints[key] = None
+            continue
+        stat = path.stat()
+        old = previous.get(key)
+        if old and old.get("size") == stat.st_size and old.get("mtime_ns") == stat.st_mtime_ns:
+            sha = old["sha256"]
+        else:
+            sha = file_digest(path)
+        fingerprints[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha}
+    return fingerprints
+
+
+def load_manifest(path):
+    """Lê o manifesto do ETL; retorna None se ausente, corrompido ou de outra versão (do manifesto ou do esquema)."""
+    if not path.exists():
+        return None
+    try:
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("schema_version") != SCHEMA_VERSION:
+        return None
+    return manifest
 
-    print("Iniciando o pré-processamento de dados...")
 
-    # --- ETAPA 1: Ler os dados "prontos" para extrair mapeamentos ---
-    # Este arquivo funciona como uma fonte de verdade para os mapeamentos de
-    # continente, CAGR pré-calculado e códigos ISO.
+def save_manifest(path, manifest):
+    manifest["version"] = MANIFEST_VERSION
+    manifest["schema_version"] = SCHEMA_VERSION
+    path.write_text(json.dumps(manifest, ensure_ascii=False, indent=1, sort_keys=True), encoding="utf-8")
 
-    country_to_continent_map, country_to_cagr_map, country_to_iso_map = {}, {}, {}
-    df_ready_path = DATA_DIR / "gdp_dashboard_ready_data.csv"
 
-    try:
-        print(f"Lendo '{df_ready_path.name}' para criar os mapeamentos...")
-        df_ready = pd.read_csv(df_ready_path).rename(columns={"Entity": "Country"})
+def country_hash_sums(df, cols):
+    """Soma (mod 2**64) do hash das linhas de `df` por país; somas de lotes diferentes podem ser acumuladas."""
+    if df.empty:
+        return {}
+    # Normaliza os tipos para que o mesmo conteúdo gere o mesmo hash vindo do CSV ou do Parquet
+    normalized = pd.DataFrame({
+        col: df[col].astype('float64') if pd.api.types.is_numeric_dtype(df[col]) else df[col].astype(str)
+        for col in cols
+    })
+    row_hashes = pd.util.hash_pandas_object(normalized, index=False)
+    return {country: int(value) for country, value in row_hashes.groupby(df['Country'].to_numpy()).sum().items()}
 
-        # Mapeamento: País -> Continente
-        country_to_continent_map = df_ready[['Country', 'Continent']].drop_duplicates('Country').set_index('Country')[
-            'Continent'].to_dict()
 
-        # Mapeamento: País -> CAGR (taxa de crescimento anual composta)
-        df_ready_2030_cagr = df_ready[df_ready['Year'] == 2030]
-        country_to_cagr_map = df_ready_2030_cagr.set_index('Country')['CAGR_Forecast'].to_dict()
+def country_digests(df, cols):
+    """Hash por país das linhas de `df` (independente da ordem das linhas)."""
+    return {country: format(value, "016x") for country, value in country_hash_sums(df, cols).items()}
+
+
+def _changed_keys(new, old):
+    """Chaves novas, removidas ou com valor diferente entre dois dicionários."""
+    return {k for k in set(new) | set(old) if new.get(k) != old.get(k)}
+
+
+# ─── 2) ETAPAS DO ETL ────────────────────────────────────────────
+def build_mappings(df_ready):
+    """Cria os mapeamentos País -> Continente, CAGR e ISO a partir do arquivo 'pronto'."""
+    # Mapeamento: País -> Continente
+    country_to_continent_map = df_ready[['Country', 'Continent']].drop_duplicates('Country').set_index('Country')[
+        'Continent'].to_dict()
+
+    # Mapeamento: País -> CAGR (taxa de crescimento anual composta)
+    df_ready_2030_cagr = df_ready[df_ready['Year'] == 2030]
+    country_to_cagr_map = df_ready_2030_cagr.set_index('Country')['CAGR_Forecast'].to_dict()
+
+    # Mapeamento: País -> Código ISO Alpha 3
+    country_to_iso_map = \
+    df_ready[['Country', 'ISO_Alpha3']].dropna().drop_duplicates('Country').set_index('Country')[
+        'ISO_Alpha3'].to_dict()
+    maps = {"continent": country_to_continent_map, "cagr": country_to_cagr_map, "iso": country_to_iso_map}
+    # Entradas nulas equivalem a chaves ausentes em `.map` e não sobrevivem bem ao JSON do manifesto
+    return {name: {k: v for k, v in mapping.items() if pd.notna(k) and pd.notna(v)} for name, mapping in maps.items()}
 
-        # Mapeamento: País -> Código ISO Alpha 3
-        country_to_iso_map = \
-        df_ready[['Country', 'ISO_Alpha3']].dropna().drop_duplicates('Country').set_index('Country')[
-            'ISO_Alpha3'].to_dict()
-        print("Mapeamentos criados com sucesso.")
 
+def _convert_options(columns):
+    import pyarrow.csv as pacsv
+    return pacsv.ConvertOptions(column_types=columns, include_columns=list(columns),
+                                null_values=NULL_MARKERS, strings_can_be_null=True)
+
+
+def read_source(path, columns=SOURCE_COLUMNS):
+    """
+    Lê uma fonte CSV inteira com o parser multithread do Arrow, só as colunas
+    declaradas. Se algum valor não casar com o tipo declarado, relê com o parser do
+    pandas e deixa a conversão tolerante das etapas transformar o valor em NaN.
+    """
+    import pyarrow.csv as pacsv
+    try:
+        return pacsv.read_csv(path, read_options=pacsv.ReadOptions(use_threads=True),
+                              convert_options=_convert_options(columns)).to_pandas()
+    except pa.ArrowInvalid as e:
+        print(f"AVISO: '{Path(path).name}' fora do esquema declarado ({e}). Relendo com o pandas...")
+        return pd.read_csv(path, usecols=list(columns))
+
+
+def read_mappings(df_ready_path):
+    """Etapa 1: lê o arquivo 'pronto'. Em caso de falha, os mapeamentos ficam vazios."""
+    try:
+        print(f"Lendo '{df_ready_path.name}' para criar os mapeamentos...")
+        df_ready = read_source(df_ready_path, READY_COLUMNS).rename(columns={"Entity": "Country"})
+        maps = build_mappings(df_ready)
+        print("Mapeamentos criados com sucesso.")
+        return maps
     except FileNotFoundError:
         print(f"AVISO: Arquivo '{df_ready_path.name}' não encontrado. Mapeamentos estarão vazios.")
     except Exception as e:
         print(f"Erro ao processar '{df_ready_path.name}': {e}")
+    return {"continent": {}, "cagr": {}, "iso": {}}
 
-    # --- ETAPA 2: Processar dados históricos (`df_h`) ---
-    try:
-        df_h_path = DATA_DIR / "gdp_per_capita.csv"
-        print(f"Lendo e processando dados históricos de '{df_h_path.name}'...")
-        df_h = pd.read_csv(df_h_path)
-        df_h = df_h.rename(columns={"Entity": "Country", "GDP per capita": "GDP_per_capita"})
-        df_h = df_h[['Country', 'Year', 'GDP_per_capita']].copy()
 
-        df_h['Type'] = "Historic"
-        df_h['Continent'] = df_h["Country"].map(country_to_continent_map).fillna("Desconhecido")
-        df_h['ISO_Alpha3'] = df_h["Country"].map(country_to_iso_map)  # Mapeia ISO para dados históricos
+def apply_mappings(df, maps, iso_replacements=None):
+    """Preenche Continente e ISO_Alpha3 de `df` a partir dos mapeamentos."""
+    df['Continent'] = df["Country"].map(maps["continent"]).fillna("Desconhecido")
+    countries_for_iso = df['Country'].replace(iso_replacements) if iso_replacements else df['Country']
+    df['ISO_Alpha3'] = countries_for_iso.map(maps["iso"])
+    return df
 
-        df_h["Year"] = pd.to_numeric(df_h["Year"], errors='coerce')
-        df_h["GDP_per_capita"] = pd.to_numeric(df_h["GDP_per_capita"], errors='coerce')
 
-    except FileNotFoundError:
-        print(f"ERRO CRÍTICO: Arquivo de dados históricos '{df_h_path.name}' não encontrado. Abortando.")
-        return
-    except Exception as e:
-        print(f"Erro ao processar '{df_h_path.name}': {e}")
-        return
+def process_historic(df_h, maps):
+    """Etapa 2: normaliza os dados históricos brutos."""
+    df_h = df_h.rename(columns={"Entity": "Country", "GDP per capita": "GDP_per_capita"})
+    df_h = df_h[['Country', 'Year', 'GDP_per_capita']].copy()
 
-    # --- ETAPA 3: Processar dados de previsão (`df_f`) ---
-    try:
-        df_f_path = DATA_DIR / "gdp_forecast_to_2030.csv"
-        print(f"Lendo e processando dados de previsão de '{df_f_path.name}'...")
-        df_f_raw = pd.read_csv(df_f_path)
-        df_f = df_f_raw.rename(columns={"Entity": "Country", "GDP per capita": "GDP_per_capita"})
+    df_h['Type'] = "Historic"
+    df_h = apply_mappings(df_h, maps)  # Mapeia continente e ISO para dados históricos
 
-        # Filtra para o ano de 2030 e remove duplicatas
-        df_f = df_f[df_f['Year'] == 2030].drop_duplicates(subset=['Country', 'Year'], keep='last').copy()
+    df_h["Year"] = pd.to_numeric(df_h["Year"], errors='coerce')
+    df_h["GDP_per_capita"] = pd.to_numeric(df_h["GDP_per_capita"], errors='coerce')
+    return df_h
 
-        df_f['Type'] = "Forecast"
-        df_f['Continent'] = df_f["Country"].map(country_to_continent_map).fillna("Desconhecido")
 
-        # Mapeamento especial de ISO para 'Eswatini', que pode estar como 'Swaziland' nos dados de mapeamento
-        country_name_replacements = {"Eswatini": "Swaziland"}
-        df_f['Country_for_ISO_map'] = df_f['Country'].replace(country_name_replacements)
-        df_f["ISO_Alpha3"] = df_f["Country_for_ISO_map"].map(country_to_iso_map)
-        df_f = df_f.drop(columns=['Country_for_ISO_map'])
+def process_forecast(df_f_raw, maps):
+    """Etapa 3: seleciona 2030 nos dados de previsão e aplica os mapeamentos (sem CAGR)."""
+    df_f = df_f_raw.rename(columns={"Entity": "Country", "GDP per capita": "GDP_per_capita"})
 
-        df_f["GDP_per_capita"] = pd.to_numeric(df_f["GDP_per_capita"], errors='coerce')
+    # Filtra para o ano de 2030 e remove duplicatas
+    df_f = df_f[df_f['Year'] == 2030].drop_duplicates(subset=['Country', 'Year'], keep='last').copy()
 
-        # --- Cálculo do CAGR ---
-        print("Calculando CAGR para dados de previsão...")
-        # 1. Tenta preencher com valores do mapa pré-calculado
-        df_f['CAGR'] = df_f["Country"].map(country_to_cagr_map)
+    df_f['Type'] = "Forecast"
+    # Mapeamento especial de ISO para 'Eswatini', que pode estar como 'Swaziland' nos dados de mapeamento
+    df_f = apply_mappings(df_f, maps, iso_replacements={"Eswatini": "Swaziland"})
 
-        # 2. Para os que faltam, calcula dinamicamente
-        latest_historical = df_h.loc[df_h.groupby('Country')['Year'].idxmax()][
-            ['Country', 'Year', 'GDP_per_capita']
-        ].rename(columns={'Year': 'Last_Hist_Year', 'GDP_per_capita': 'Last_Hist_GDP'})
+    df_f["GDP_per_capita"] = pd.to_numeric(df_f["GDP_per_capita"], errors='coerce')
+    return df_f
 
-        df_f_merged = pd.merge(df_f, latest_historical, on='Country', how='left')
 
-        # Condições para o cálculo ser válido
-        mask_cagr_null = df_f_merged['CAGR'].isnull()
-        valid_calc_mask = (
-                mask_cagr_null &
-                df_f_merged['Last_Hist_GDP'].notna() & (df_f_merged['Last_Hist_GDP'] > 0) &
-                df_f_merged['GDP_per_capita'].notna() &
-                (df_f_merged['Year'] - df_f_merged['Last_Hist_Year']) > 0
-        )
+def process_forecast_path(df_f_raw, maps):
+    """Etapa 3b: trajetória da previsão antes do ano-alvo (sem CAGR), para as séries temporais."""
+    df_p = df_f_raw.rename(columns={"Entity": "Country", "GDP per capita": "GDP_per_capita"})
+    df_p = df_p[df_p['Year'] < FORECAST_YEAR].drop_duplicates(subset=['Country', 'Year'], keep='last').copy()
 
-        # Aplica a fórmula do CAGR
-        anos = df_f_merged.loc[valid_calc_mask, 'Year'] - df_f_merged.loc[valid_calc_mask, 'Last_Hist_Year']
-        crescimento = (df_f_merged.loc[valid_calc_mask, 'GDP_per_capita'] / df_f_merged.loc[
-            valid_calc_mask, 'Last_Hist_GDP'])
+    df_p['Type'] = "Forecast"
+    df_p = apply_mappings(df_p, maps, iso_replacements={"Eswatini": "Swaziland"})
 
-        df_f_merged.loc[valid_calc_mask, 'CAGR'] = (crescimento ** (1 / anos)) - 1
+    df_p["GDP_per_capita"] = pd.to_numeric(df_p["GDP_per_capita"], errors='coerce')
+    return df_p
 
-        # Atualiza a coluna CAGR no dataframe original e preenche NaNs restantes com 0
-        df_f['CAGR'] = df_f_merged['CAGR']
-        df_f['CAGR'] = pd.to_numeric(df_f['CAGR'], errors='coerce').fillna(0)
 
-    except FileNotFoundError:
-        print(f"ERRO CRÍTICO: Arquivo de previsão '{df_f_path.name}' não encontrado. Abortando.")
-        return
-    except Exception as e:
-        print(f"Erro ao processar '{df_f_path.name}': {e}")
-        return
+def latest_historic_rows(df_h):
+    """Última linha histórica válida (maior ano) de cada país, usada como base do CAGR."""
+    df_h = df_h.dropna(subset=['Country', 'Year', 'GDP_per_capita'])
+    return df_h.loc[df_h.groupby('Country')['Year'].idxmax()][
+        ['Country', 'Year', 'GDP_per_capita']
+    ].rename(columns={'Year': 'Last_Hist_Year', 'GDP_per_capita': 'Last_Hist_GDP'})
 
-    # --- ETAPA 4: Combinar DataFrames e Salvar ---
-    print("Combinando dados históricos e de previsão...")
 
+def compute_cagr(df_f, latest_historical, country_to_cagr_map):
+    """Calcula o CAGR das linhas de previsão de `df_f` (modifica e retorna `df_f`)."""
+    # 1. Tenta preencher com valores do mapa pré-calculado
+    df_f['CAGR'] = df_f["Country"].map(country_to_cagr_map)
+
+    # 2. Para os que faltam, calcula dinamicamente
+    df_f_merged = pd.merge(df_f, latest_historical, on='Country', how='left')
+
+    # Condições para o cálculo ser válido
+    mask_cagr_null = df_f_merged['CAGR'].isnull()
+    valid_calc_mask = (
+            mask_cagr_null &
+            df_f_merged['Last_Hist_GDP'].notna() & (df_f_merged['Last_Hist_GDP'] > 0) &
+            df_f_merged['GDP_per_capita'].notna() &
+            ((df_f_merged['Year'] - df_f_merged['Last_Hist_Year']) > 0)
+    )
+
+    # Aplica a fórmula do CAGR
+    anos = df_f_merged.loc[valid_calc_mask, 'Year'] - df_f_merged.loc[valid_calc_mask, 'Last_Hist_Year']
+    crescimento = (df_f_merged.loc[valid_calc_mask, 'GDP_per_capita'] / df_f_merged.loc[
+        valid_calc_mask, 'Last_Hist_GDP'])
+
+    df_f_merged.loc[valid_calc_mask, 'CAGR'] = (crescimento ** (1 / anos)) - 1
+
+    # Atualiza a coluna CAGR no dataframe original (o merge preserva a ordem) e preenche NaNs restantes com 0
+    df_f['CAGR'] = pd.to_numeric(df_f_merged['CAGR'], errors='coerce').fillna(0).to_numpy()
+    return df_f
+
+
+def combine(df_h, df_f, df_path=None):
+    """Etapa 4: concatena histórico, previsão do ano-alvo e trajetória no layout final do Parquet."""
     # Selecionar e reordenar colunas para consistência
-    cols_final = ['Country', 'Year', 'GDP_per_capita', 'Continent', 'Type', 'ISO_Alpha3', 'CAGR']
-    df_h = df_h.reindex(columns=cols_final)  # CAGR ficará como NaN nos históricos, o que é correto
-    df_f = df_f.reindex(columns=cols_final)
+    # (CAGR ficará como NaN nos históricos e na trajetória, o que é correto)
+    frames = [df.reindex(columns=COLS_FINAL) for df in (df_h, df_f, df_path) if df is not None]
 
-    # Concatena os dois dataframes
-    df_final = pd.concat([df_h, df_f], ignore_index=True)
+    # Concatena os dataframes
+    return finalize_rows(pd.concat(frames, ignore_index=True))
 
-    # Limpeza final
+
+def finalize_rows(df_final):
+    """Limpeza final: descarta linhas sem ano, PIB ou país e fixa os tipos do Parquet."""
+    df_final = df_final.reindex(columns=COLS_FINAL)
     df_final.dropna(subset=['Year', 'GDP_per_capita', 'Country'], inplace=True)
     df_final["Year"] = df_final["Year"].astype('int32')
     df_final["GDP_per_capita"] = df_final["GDP_per_capita"].astype('float64')
+    return df_final
+
+
+def historic_digests(df_final):
+    """Hash por país das linhas históricas já limpas do Parquet final."""
+    return country_digests(df_final[df_final['Type'] == 'Historic'], HISTORIC_DIGEST_COLS)
+
+
+def cagr_input_digests(df_f, latest_historical, maps):
+    """Hash por país de tudo o que entra no cálculo do CAGR."""
+    if df_f.empty:
+        return {}
+    inputs = pd.merge(df_f[['Country', 'Year', 'GDP_per_capita']], latest_historical, on='Country', how='left')
+    inputs['Mapped_CAGR'] = inputs['Country'].map(maps["cagr"])
+    return country_digests(inputs, list(inputs.columns))
+
 
+# ─── 3) PARQUET ÚNICO E DATASET PARTICIONADO ─────────────────────
+def write_output(df_final, output_path):
+    """Grava o Parquet único com a versão do esquema no rodapé (temporário + rename)."""
+    table = pa.Table.from_pandas(df_final, preserve_index=False)
+    metadata = {**(table.schema.metadata or {}), SCHEMA_METADATA_KEY: str(SCHEMA_VERSION).encode()}
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    pq.write_table(table.replace_schema_metadata(metadata), tmp_path)
+    os.replace(tmp_path, output_path)
+
+
+def read_schema_version(output_path):
+    """Versão do esquema gravada no rodapé do Parquet (None em artefatos anteriores à versão 2)."""
+    value = (pq.read_schema(output_path).metadata or {}).get(SCHEMA_METADATA_KEY)
+    return int(value) if value else None
+
+
+def partition_key(values):
+    """Caminho relativo Hive de uma partição, ex.: 'Type=Forecast/Continent=Asia%2FAfrica'."""
+    return "/".join(f"{col}={quote(str(value), safe='')}" for col, value in zip(PARTITION_COLS, values))
+
+
+def write_partitioned_dataset(df_final, dataset_dir, previous_digests=None):
+    """
+    Grava `df_final` como dataset Hive particionado por PARTITION_COLS.
+
+    Cada partição vira um único arquivo ordenado por (Country, Year), com row groups de
+    ROW_GROUP_SIZE linhas e estatísticas por coluna. Partições cujo conteúdo não mudou
+    em relação a `previous_digests` não são reescritas. Retorna {partição: hash}.
+
+    Numa reconstrução completa (sem `previous_digests`), o dataset é gravado num
+    diretório irmão e só então troca de lugar com o atual: os dashboards em execução,
+    que leem as partições sob demanda, nunca veem a árvore apagada ou pela metade.
+    """
+    previous_digests = previous_digests or {}
+    final_dir = dataset_dir
+    if not previous_digests:
+        dataset_dir = final_dir.with_name(final_dir.name + ".tmp")
+        shutil.rmtree(dataset_dir, ignore_errors=True)  # sobra de uma execução interrompida
+    dataset_dir.mkdir(parents=True, exist_ok=True)
+
+    data_cols = [c for c in COLS_FINAL if c not in PARTITION_COLS]
+    digests, written = {}, 0
+    for values, part in df_final.groupby(PARTITION_COLS, sort=True):
+        key = partition_key(values)
+        part = part.sort_values(['Country', 'Year'])[data_cols]
+        digests[key] = format(int(pd.util.hash_pandas_object(part, index=False).sum()), "016x")
+        part_dir = dataset_dir / key
+        if previous_digests.get(key) == digests[key] and part_dir.exists():
+            continue
+        part_dir.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pandas(part, preserve_index=False)
+        tmp_path = part_dir / "part-0.parquet.tmp"
+        pq.write_table(table, tmp_path, row_group_size=ROW_GROUP_SIZE, write_statistics=True)
+        os.replace(tmp_path, part_dir / "part-0.parquet")
+        written += 1
+
+    # Remove partições que deixaram de existir (ex.: continente renomeado)
+    for key in set(previous_digests) - set(digests):
+        shutil.rmtree(dataset_dir / key, ignore_errors=True)
+        parent = (dataset_dir / key).parent
+        if parent != dataset_dir and parent.exists() and not any(parent.iterdir()):
+            parent.rmdir()
+
+    if dataset_dir != final_dir:
+        _swap_dir(dataset_dir, final_dir)
+    print(f"Dataset particionado: {written} de {len(digests)} partição(ões) gravada(s) em '{final_dir.name}/'.")
+    return digests
+
+
+def _swap_dir(new_dir, final_dir):
+    """Põe `new_dir` no lugar de `final_dir` com renomeações (o rename não sobrescreve um diretório não vazio)."""
+    old_dir = final_dir.with_name(final_dir.name + ".old")
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if final_dir.exists():
+        os.replace(final_dir, old_dir)
+    os.replace(new_dir, final_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+# ─── 4) EXECUÇÃO INCREMENTAL ─────────────────────────────────────
+def _incremental_update(data_dir, output_path, manifest, fingerprints, changed_sources):
+    """
+    Reaproveita o Parquet anterior e refaz só o que mudou. Retorna (df_final, manifest)
+    ou None quando não é possível (ex.: Parquet anterior ilegível), forçando reconstrução completa.
+    """
+    try:
+        df_prev = pd.read_parquet(output_path)
+    except Exception as e:
+        print(f"AVISO: Não foi possível ler o Parquet anterior ({e}). Executando reconstrução completa.")
+        return None
+
+    old_maps = manifest["mappings"]
+    old_countries = manifest["countries"]
+
+    if "ready" in changed_sources:
+        maps = read_mappings(data_dir / SOURCES["ready"])
+    else:
+        maps = old_maps
+
+    # Países cujo continente/ISO/CAGR pré-calculado mudou no arquivo 'pronto'
+    remapped = set()
+    for key in ("continent", "iso", "cagr"):
+        remapped |= _changed_keys(maps[key], old_maps.get(key, {}))
+
+    prev_h = df_prev[df_prev['Type'] == 'Historic']
+    is_target_year = df_prev['Year'] == FORECAST_YEAR
+    prev_f = df_prev[(df_prev['Type'] == 'Forecast') & is_target_year]
+    prev_path = df_prev[(df_prev['Type'] == 'Forecast') & ~is_target_year]
+
+    # Etapa 2: só relê o histórico se o CSV mudou; senão remapeia apenas os países afetados
+    if "historic" in changed_sources:
+        print(f"Fonte '{SOURCES['historic']}' alterada. Reprocessando dados históricos...")
+        df_h = process_historic(read_source(data_dir / SOURCES["historic"]), maps)
+    else:
+        df_h = prev_h.copy()
+        mask = df_h['Country'].isin(remapped)
+        if mask.any():
+            df_h.loc[mask] = apply_mappings(df_h.loc[mask].copy(), maps)
+
+    # Etapa 3: idem para a previsão
+    if "forecast" in changed_sources:
+        print(f"Fonte '{SOURCES['forecast']}' alterada. Reprocessando dados de previsão...")
+        df_f_raw = read_source(data_dir / SOURCES["forecast"])
+        df_f = process_forecast(df_f_raw, maps)
+        df_path = process_forecast_path(df_f_raw, maps)
+    else:
+        df_f = prev_f.drop(columns=['CAGR']).copy()
+        df_path = prev_path.copy()
+        for df in (df_f, df_path):
+            mask = df['Country'].isin(remapped)
+            if mask.any():
+                df.loc[mask] = apply_mappings(df.loc[mask].copy(), maps, iso_replacements={"Eswatini": "Swaziland"})
+
+    # CAGR: recalcula apenas países cujas entradas (previsão, última linha histórica, mapa) mudaram
+    latest_historical = latest_historic_rows(df_h)
+    cagr_digests = cagr_input_digests(df_f, latest_historical, maps)
+    affected = _changed_keys(cagr_digests, old_countries.get("cagr_inputs", {}))
+
+    prev_cagr = prev_f.drop_duplicates('Country', keep='last').set_index('Country')['CAGR']
+    df_f['CAGR'] = df_f['Country'].map(prev_cagr)
+    mask_recalc = df_f['Country'].isin(affected) | df_f['CAGR'].isna()
+    if mask_recalc.any():
+        print(f"Recalculando CAGR para {int(mask_recalc.sum())} país(es) afetado(s)...")
+        df_f.loc[mask_recalc, 'CAGR'] = compute_cagr(
+            df_f.loc[mask_recalc].copy(), latest_historical, maps["cagr"])['CAGR'].to_numpy()
+
+    df_final = combine(df_h, df_f, df_path)
+    hist_digests = historic_digests(df_final)
+    changed_hist = _changed_keys(hist_digests, old_countries.get("historic", {}))
+    print(f"Delta: {len(changed_hist)} país(es) com histórico alterado, {len(affected)} com CAGR recalculado.")
+
+    new_manifest = {
+        "sources": fingerprints,
+        "mappings": maps,
+        "countries": {"historic": hist_digests, "cagr_inputs": cagr_digests},
+    }
+    return df_final, new_manifest
+
+
+def _full_build(data_dir, timings, fingerprints=None):
+    """
+    Executa todas as etapas do ETL como um grafo (ver `run_stages`): as leituras das
+    três fontes e as impressões digitais rodam juntas, e cada transformação começa
+    assim que suas entradas ficam prontas. Retorna (df_final, manifest) ou None em erro crítico.
+    """
+    df_h_path = data_dir / SOURCES["historic"]
+    df_f_path = data_dir / SOURCES["forecast"]
+
+    def forecast(df_f_raw, maps):
+        return process_forecast(df_f_raw, maps), process_forecast_path(df_f_raw, maps)
+
+    def cagr(forecast_parts, latest_historical, maps):
+        return compute_cagr(forecast_parts[0], latest_historical, maps["cagr"])
+
+    def combined(df_h, df_f, forecast_parts):
+        return combine(df_h, df_f, forecast_parts[1])
+
+    stages = {
+        # --- ETAPA 1: o arquivo "pronto" é a fonte de verdade dos mapeamentos de
+        # continente, CAGR pré-calculado e códigos ISO ---
+        "mapeamentos": (lambda: read_mappings(data_dir / SOURCES["ready"]), []),
+        "leitura: histórico": (lambda: read_source(df_h_path), []),
+        "leitura: previsão": (lambda: read_source(df_f_path), []),
+        # --- ETAPAS 2 e 3: normalização e mapeamentos ---
+        "histórico": (process_historic, ["leitura: histórico", "mapeamentos"]),
+        "previsão": (forecast, ["leitura: previsão", "mapeamentos"]),
+        # --- Cálculo do CAGR ---
+        "base do CAGR": (latest_historic_rows, ["histórico"]),
+        "CAGR": (cagr, ["previsão", "base do CAGR", "mapeamentos"]),
+        # --- ETAPA 4: Combinar DataFrames ---
+        "combinação": (combined, ["histórico", "CAGR", "previsão"]),
+        # Mesmas linhas históricas do Parquet final, sem esperar a combinação
+        "hash do histórico": (lambda df_h: historic_digests(finalize_rows(df_h)), ["histórico"]),
+        "hash das entradas do CAGR": (cagr_input_digests, ["CAGR", "base do CAGR", "mapeamentos"]),
+    }
+    if fingerprints is None:
+        stages["impressões digitais"] = (lambda: fingerprint_sources(data_dir), [])
+
+    print("Lendo e processando as fontes (leituras em paralelo)...")
+    try:
+        results = run_stages(stages, timings)
+    except StageError as e:
+        cause = e.__cause__
+        if e.stage in ("leitura: histórico", "histórico", "base do CAGR"):
+            path, label = df_h_path, "de dados históricos"
+        elif e.stage in ("leitura: previsão", "previsão", "CAGR"):
+            path, label = df_f_path, "de previsão"
+        else:
+            raise
+        if isinstance(cause, FileNotFoundError):
+            print(f"ERRO CRÍTICO: Arquivo {label} '{path.name}' não encontrado. Abortando.")
+        else:
+            print(f"Erro ao processar '{path.name}': {cause}")
+        return None
+
+    manifest = {
+        "sources": fingerprints if fingerprints is not None else results["impressões digitais"],
+        "mappings": results["mapeamentos"],
+        "countries": {
+            "historic": results["hash do histórico"],
+            "cagr_inputs": results["hash das entradas do CAGR"],
+        },
+    }
+    return results["combinação"], manifest
+
+
+# ─── 5) INGESTÃO EM STREAMING ────────────────────────────────────
+# Em streaming, valores que não casam com o tipo declarado em SOURCE_COLUMNS
+# interrompem a leitura com erro (não há como reler um lote já gravado).
+# O leitor do pyarrow mantém até ~32 blocos lidos à frente: o pico de memória fica em
+# torno de 32 x STREAM_BLOCK_BYTES mais o lote em processamento, seja qual for a fonte
+STREAM_BLOCK_BYTES = 4 << 20
+OUTPUT_SCHEMA = pa.schema([
+    ("Country", pa.string()), ("Year", pa.int32()), ("GDP_per_capita", pa.float64()),
+    ("Continent", pa.string()), ("Type", pa.string()), ("ISO_Alpha3", pa.string()), ("CAGR", pa.float64()),
+])
+PARTITION_SCHEMA = pa.schema([f for f in OUTPUT_SCHEMA if f.name not in PARTITION_COLS])
+
+
+def iter_source_batches(path, block_size=STREAM_BLOCK_BYTES):
+    """Lê uma fonte CSV em lotes de ~`block_size` bytes com o esquema declarado; gera DataFrames."""
+    import pyarrow.csv as pacsv
+    reader = pacsv.open_csv(path, read_options=pacsv.ReadOptions(block_size=block_size),
+                            convert_options=_convert_options(SOURCE_COLUMNS))
+    for batch in reader:
+        yield batch.to_pandas()
+
+
+def merge_latest(running, batch_latest):
+    """Junta a última linha histórica por país de dois lotes (no empate de ano, fica a vista primeiro)."""
+    if running is None:
+        return batch_latest
+    both = pd.concat([running, batch_latest], ignore_index=True)
+    return both.loc[both.groupby('Country')['Last_Hist_Year'].idxmax()].reset_index(drop=True)
+
+
+def _is_sorted(part):
+    """Se as linhas de `part` estão em ordem de (Country, Year)."""
+    countries, years = part['Country'].to_numpy(), part['Year'].to_numpy()
+    same = countries[1:] == countries[:-1]
+    return bool(((countries[1:] > countries[:-1]) | (same & (years[1:] >= years[:-1]))).all())
+
+
+class PartitionSpool:
+    """
+    Arquivo de uma partição do dataset gravado à medida que os lotes chegam.
+
+    Acumula linhas até completar row groups de ROW_GROUP_SIZE e soma o hash das
+    linhas (o mesmo de `write_partitioned_dataset`, que independe da ordem). Se as
+    linhas chegarem fora da ordem (Country, Year), a partição é reordenada ao fechar;
+    só nesse caso o pico de memória passa a ser o da maior partição.
+    """
+
+    def __init__(self, part_dir):
+        self.part_dir = part_dir
+        self.tmp_path = part_dir / "part-0.parquet.tmp"
+        self.writer = None
+        self.buffer, self.buffered = [], 0
+        self.digest = 0
+        self.last_key = None
+        self.in_order = True
+
+    def append(self, part):
+        if self.in_order:
+            first = (part['Country'].iat[0], part['Year'].iat[0])
+            self.in_order = (self.last_key is None or first >= self.last_key) and _is_sorted(part)
+        self.last_key = (part['Country'].iat[-1], part['Year'].iat[-1])
+        self.digest = (self.digest + int(pd.util.hash_pandas_object(part, index=False).sum())) % (1 << 64)
+        self.buffer.append(part)
+        self.buffered += len(part)
+        if self.buffered >= ROW_GROUP_SIZE:
+            self._flush(self.buffered // ROW_GROUP_SIZE * ROW_GROUP_SIZE)
+
+    def _flush(self, n_rows):
+        df = pd.concat(self.buffer, ignore_index=True)
+        if self.writer is None:
+            self.part_dir.mkdir(parents=True, exist_ok=True)
+            self.writer = pq.ParquetWriter(self.tmp_path, PARTITION_SCHEMA, write_statistics=True)
+        table = pa.Table.from_pandas(df.iloc[:n_rows], schema=PARTITION_SCHEMA, preserve_index=False)
+        self.writer.write_table(table, row_group_size=ROW_GROUP_SIZE)
+        rest = df.iloc[n_rows:]
+        self.buffer, self.buffered = ([rest] if len(rest) else []), len(rest)
+
+    def close(self):
+        """Grava o resto, reordena se preciso e publica o arquivo. Retorna o hash da partição."""
+        if self.buffered:
+            self._flush(self.buffered)
+        self.writer.close()
+        if not self.in_order:
+            key = f"{self.part_dir.parent.name}/{self.part_dir.name}"
+            print(f"AVISO: Partição '{key}' fora da ordem (País, Ano) na fonte; reordenando.")
+            table = pq.read_table(self.tmp_path).sort_by([("Country", "ascending"), ("Year", "ascending")])
+            pq.write_table(table, self.tmp_path, row_group_size=ROW_GROUP_SIZE, write_statistics=True)
+        os.replace(self.tmp_path, self.part_dir / "part-0.parquet")
+        return format(self.digest, "016x")
+
+
+class StreamingOutput:
+    """Parquet único (com a versão do esquema no rodapé) e dataset particionado gravados lote a lote."""
+
+    def __init__(self, output_path, dataset_dir):
+        self.output_path = output_path
+        self.tmp_path = output_path.with_name(output_path.name + ".tmp")
+        self.dataset_dir = dataset_dir
+        # As partições são montadas ao lado e trocadas no fim: um erro no meio não apaga o dataset anterior
+        self.tmp_dataset_dir = dataset_dir.with_name(dataset_dir.name + ".tmp")
+        if self.tmp_dataset_dir.exists():
+            shutil.rmtree(self.tmp_dataset_dir)
+        self.tmp_dataset_dir.mkdir(parents=True)
+        schema = OUTPUT_SCHEMA.with_metadata({SCHEMA_METADATA_KEY: str(SCHEMA_VERSION).encode()})
+        self.writer = pq.ParquetWriter(self.tmp_path, schema)
+        self.spools = {}
+        self.rows = 0
+
+    def write_rows(self, df):
+        """Acrescenta linhas já finalizadas (`finalize_rows`) ao Parquet único."""
+        if not df.empty:
+            self.writer.write_table(pa.Table.from_pandas(df, schema=OUTPUT_SCHEMA, preserve_index=False))
+            self.rows += len(df)
+
+    def write_partitions(self, df):
+        """Distribui linhas já finalizadas entre os arquivos das partições."""
+        data_cols = [c for c in COLS_FINAL if c not in PARTITION_COLS]
+        for values, part in df.groupby(PARTITION_COLS, sort=False):
+            key = partition_key(values)
+            if key not in self.spools:
+                self.spools[key] = PartitionSpool(self.tmp_dataset_dir / key)
+            self.spools[key].append(part[data_cols])
+
+    def close(self):
+        """Publica o Parquet único e as partições. Retorna {partição: hash}."""
+        self.writer.close()
+        digests = {key: self.spools[key].close() for key in sorted(self.spools)}
+        os.replace(self.tmp_path, self.output_path)
+        _swap_dir(self.tmp_dataset_dir, self.dataset_dir)
+        print(f"Dataset particionado: {len(digests)} partição(ões) gravada(s) em '{self.dataset_dir.name}/'.")
+        return digests
+
+    def abort(self):
+        self.writer.close()
+        self.tmp_path.unlink(missing_ok=True)
+        for spool in self.spools.values():
+            if spool.writer is not None:
+                spool.writer.close()
+        shutil.rmtree(self.tmp_dataset_dir, ignore_errors=True)
+
+
+def _streaming_build(data_dir, block_size=STREAM_BLOCK_BYTES):
+    """
+    Reconstrução completa em lotes, gravando os artefatos. O histórico nunca fica
+    inteiro em memória: cada lote é limpo, mapeado e gravado, e dele só se guardam
+    o hash por país (manifesto) e a última linha histórica por país (base do CAGR).
+    A previsão, uma linha por país e ano até o ano-alvo, é processada de uma vez.
+    Retorna (manifest, linhas gravadas) ou None em erro crítico.
+    """
+    maps = read_mappings(data_dir / SOURCES["ready"])
+    out = StreamingOutput(data_dir / OUTPUT_NAME, data_dir / DATASET_NAME)
+    hist_sums, latest_historical, n_batches = {}, None, 0
+
+    df_h_path = data_dir / SOURCES["historic"]
+    try:
+        print(f"Lendo e processando dados históricos de '{df_h_path.name}' em lotes de "
+              f"{block_size / (1 << 20):g} MB...")
+        for batch in iter_source_batches(df_h_path, block_size):
+            df_h = finalize_rows(process_historic(batch, maps))
+            out.write_rows(df_h)
+            out.write_partitions(df_h)
+            for country, value in country_hash_sums(df_h, HISTORIC_DIGEST_COLS).items():
+                hist_sums[country] = (hist_sums.get(country, 0) + value) % (1 << 64)
+            latest_historical = merge_latest(latest_historical, latest_historic_rows(df_h))
+            n_batches += 1
+        print(f"{n_batches} lote(s) de dados históricos gravado(s).")
+        if latest_historical is None:
+            latest_historical = pd.DataFrame(columns=['Country', 'Last_Hist_Year', 'Last_Hist_GDP'])
+    except FileNotFoundError:
+        out.abort()
+        print(f"ERRO CRÍTICO: Arquivo de dados históricos '{df_h_path.name}' não encontrado. Abortando.")
+        return None
+    except Exception as e:
+        out.abort()
+        print(f"Erro ao processar '{df_h_path.name}': {e}")
+        return None
+
+    df_f_path = data_dir / SOURCES["forecast"]
+    try:
+        print(f"Lendo e processando dados de previsão de '{df_f_path.name}'...")
+        df_f_raw = pd.concat(iter_source_batches(df_f_path, block_size), ignore_index=True)
+        df_f = process_forecast(df_f_raw, maps)
+        df_path = process_forecast_path(df_f_raw, maps)
+        print("Calculando CAGR para dados de previsão...")
+        df_f = compute_cagr(df_f, latest_historical, maps["cagr"])
+    except FileNotFoundError:
+        out.abort()
+        print(f"ERRO CRÍTICO: Arquivo de previsão '{df_f_path.name}' não encontrado. Abortando.")
+        return None
+    except Exception as e:
+        out.abort()
+        print(f"Erro ao processar '{df_f_path.name}': {e}")
+        return None
+
+    # Parquet único na mesma ordem do modo padrão (ano-alvo, depois a trajetória);
+    # as partições recebem a previsão já ordenada por (País, Ano)
+    df_fc = finalize_rows(df_f)
+    df_forecast = pd.concat([df_fc, finalize_rows(df_path)], ignore_index=True)
+    out.write_rows(df_forecast)
+    out.write_partitions(df_forecast.sort_values(['Country', 'Year'], kind='stable'))
+    partitions = out.close()
+    build_aggregates(df_fc).to_parquet(data_dir / AGGREGATES_NAME, index=False)
+
+    manifest = {
+        "mappings": maps,
+        "countries": {
+            "historic": {country: format(value, "016x") for country, value in hist_sums.items()},
+            "cagr_inputs": cagr_input_digests(df_f, latest_historical, maps),
+        },
+        "partitions": partitions,
+    }
+    return manifest, out.rows
+
+
+# ─── 6) GRAFO DE ETAPAS E TEMPOS ─────────────────────────────────
+class StageTimings:
+    """Início e fim (s, relativos à criação) de cada etapa, para o resumo ao fim do ETL."""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.records = []
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter() - self.origin
+        try:
+            yield
+        finally:
+            self.records.append((name, start, time.perf_counter() - self.origin))
+
+    def report(self):
+        """Tabela das etapas em ordem de início, com o tempo de parede total e a soma das etapas."""
+        lines = [f"{'Etapa':<30} {'início':>8} {'duração':>8}"]
+        for name, start, end in sorted(self.records, key=lambda r: r[1]):
+            lines.append(f"{name:<30} {start:>7.2f}s {end - start:>7.2f}s")
+        total = time.perf_counter() - self.origin
+        busy = sum(end - start for _, start, end in self.records)
+        lines.append(f"Total: {total:.2f} s de parede (soma das etapas: {busy:.2f} s)")
+        return "\n".join(lines)
+
+
+class StageError(Exception):
+    """Falha de uma etapa do grafo; a exceção original fica em `__cause__`."""
+
+    def __init__(self, stage, cause):
+        super().__init__(f"etapa '{stage}': {cause}")
+        self.stage = stage
+
+
+def run_stages(stages, timings, max_workers=4):
+    """
+    Executa um grafo de etapas {nome: (função, [dependências])}. Cada função recebe
+    os resultados das dependências, na ordem declarada, e roda numa thread assim que
+    elas terminam; leituras de arquivo, o parser CSV do Arrow e a escrita de Parquet
+    liberam o GIL, então etapas independentes avançam juntas. Retorna {nome: resultado}.
+    A primeira falha cancela o que não começou e é relançada como StageError.
+    """
+    results, pending, running = {}, dict(stages), {}
+
+    def timed(name, fn, args):
+        with timings.stage(name):
+            return fn(*args)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="etl") as pool:
+        while pending or running:
+            for name, (fn, deps) in list(pending.items()):
+                if all(dep in results for dep in deps):
+                    del pending[name]
+                    running[pool.submit(timed, name, fn, [results[dep] for dep in deps])] = name
+            if not running:
+                raise ValueError(f"Etapas com dependências ausentes ou cíclicas: {sorted(pending)}")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    for other in running:
+                        other.cancel()
+                    raise StageError(name, e) from e
+    return results
+
+
+# ─── 7) FUNÇÃO PRINCIPAL ─────────────────────────────────────────
+def preprocess_data(incremental=False, data_dir=DATA_DIR, streaming=False, block_size=STREAM_BLOCK_BYTES):
+    """
+    Função principal de ETL para preparar os dados do dashboard.
+
+    Com `incremental=True`, usa o manifesto ao lado do Parquet para pular fontes
+    inalteradas e recalcular somente os países afetados.
+
+    Com `streaming=True`, toda reconstrução (completa ou por fonte alterada) lê as
+    fontes em lotes de ~`block_size` bytes e grava os artefatos lote a lote, com
+    memória limitada independentemente do tamanho do histórico.
+
+    Ao final, imprime o início e a duração de cada etapa.
+    """
+    timings = StageTimings()
+    data_dir = Path(data_dir)
+    output_path = data_dir / OUTPUT_NAME
+    manifest_path = data_dir / MANIFEST_NAME
+    dataset_dir = data_dir / DATASET_NAME
+
+    print("Iniciando o pré-processamento de dados...")
+
+    # Geometrias do globo em níveis de detalhe (só refeitas quando o shapefile muda)
+    with timings.stage("geometrias"):
+        ensure_geometry_cache(data_dir)
+
+    manifest = load_manifest(manifest_path) if incremental else None
+    fingerprints = None
+    if manifest is not None:
+        # A decisão incremental depende das impressões digitais; na reconstrução completa
+        # elas são calculadas junto com as leituras
+        with timings.stage("impressões digitais"):
+            fingerprints = fingerprint_sources(data_dir, manifest["sources"])
+
+    result, previous_partitions = None, None
+    if manifest is not None and output_path.exists():
+        old_sources = manifest["sources"]
+        changed_sources = {key for key, fp in fingerprints.items()
+                           if (fp or {}).get("sha256") != (old_sources.get(key) or {}).get("sha256")}
+        if not changed_sources and dataset_dir.exists() and (data_dir / AGGREGATES_NAME).exists():
+            # Atualiza os mtimes registrados para que a próxima execução nem precise recalcular hashes
+            manifest["sources"] = fingerprints
+            save_manifest(manifest_path, manifest)
+            print("-" * 50)
+            print(f"✅ Nenhuma fonte foi alterada desde a última execução. '{output_path.name}' já está atualizado.")
+            print("-" * 50)
+            return
+        if changed_sources:
+            print(f"Fontes alteradas: {', '.join(sorted(SOURCES[k] for k in changed_sources))}")
+        else:
+            print("Artefatos derivados ausentes. Regravando a partir do Parquet anterior...")
+        if not streaming:
+            with timings.stage("atualização incremental"):
+                result = _incremental_update(data_dir, output_path, manifest, fingerprints, changed_sources)
+            if result is not None:
+                previous_partitions = manifest.get("partitions")
+    elif incremental:
+        print("Manifesto ausente ou incompatível. Executando reconstrução completa...")
+
+    if streaming:
+        # A atualização incremental carrega o Parquet anterior inteiro; em streaming, reconstrói em lotes
+        data_dir.mkdir(exist_ok=True)
+        try:
+            if fingerprints is None:
+                with timings.stage("impressões digitais"):
+                    fingerprints = fingerprint_sources(data_dir)
+            with timings.stage("reconstrução em streaming"):
+                built = _streaming_build(data_dir, block_size)
+            if built is not None:
+                new_manifest, n_rows = built
+                new_manifest["sources"] = fingerprints
+                save_manifest(manifest_path, new_manifest)
+                _report_done(output_path, n_rows, timings)
+        except Exception as e:
+            print(f"ERRO CRÍTICO: Não foi possível salvar o arquivo Parquet. Erro: {e}")
+        return
+
+    if result is None:
+        result = _full_build(data_dir, timings, fingerprints)
+        if result is None:
+            return
+    df_final, new_manifest = result
+
+    # --- Salvar ---
     # Garantir que a pasta de dados exista
-    DATA_DIR.mkdir(exist_ok=True)
-    output_path = DATA_DIR / "dashboard_data.parquet"
+    data_dir.mkdir(exist_ok=True)
 
     try:
         print(f"Salvando o arquivo de dados final em '{output_path}'...")
-        df_final.to_parquet(output_path, index=False)
-        processing_time = time.time() - start_time
-        print("-" * 50)
-        print(f"✅ Pré-processamento concluído com sucesso em {processing_time:.2f} segundos!")
-        print(f"O arquivo '{output_path.name}' foi criado com {len(df_final)} linhas.")
-        print("Agora você pode executar 'streamlit run app.py'.")
-        print("-" * 50)
+        df_fc = df_final[(df_final['Type'] == 'Forecast') & (df_final['Year'] == FORECAST_YEAR)]
+        # Os três artefatos só leem `df_final`: são gravados em paralelo
+        saved = run_stages({
+            "parquet único": (lambda: write_output(df_final, output_path), []),
+            "dataset particionado": (lambda: write_partitioned_dataset(df_final, dataset_dir, previous_partitions), []),
+            "agregados": (lambda: build_aggregates(df_fc).to_parquet(data_dir / AGGREGATES_NAME, index=False), []),
+        }, timings)
+        new_manifest["partitions"] = saved["dataset particionado"]
+        save_manifest(manifest_path, new_manifest)
+        _report_done(output_path, len(df_final), timings)
 
     except Exception as e:
         print(f"ERRO CRÍTICO: Não foi possível salvar o arquivo Parquet. Erro: {e}")
 
 
+def _report_done(output_path, n_rows, timings):
+    print("-" * 50)
+    print("✅ Pré-processamento concluído com sucesso!")
+    print(timings.report())
+    print(f"O arquivo '{output_path.name}' foi criado com {n_rows} linhas.")
+    print("Agora você pode executar 'streamlit run app.py'.")
+    print("-" * 50)
+
+
 if __name__ == "__main__":
-    preprocess_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="ETL dos dados do dashboard de PIB per capita.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Reaproveita o Parquet anterior e refaz apenas fontes/países alterados.")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Lê as fontes em lotes e grava os artefatos lote a lote (memória limitada).")
+    parser.add_argument("--block-mb", type=float, default=STREAM_BLOCK_BYTES / (1 << 20),
+                        help="Tamanho aproximado de cada lote lido no modo streaming, em MB.")
+    args = parser.parse_args()
+    preprocess_data(incremental=args.incremental, streaming=args.streaming,
+                    block_size=int(args.block_mb * (1 << 20)))
@@ -0,0 +1,307 @@
+# Arquivo: scenarios.py
+# Cenários "e se" sobre a previsão: deslocamentos do CAGR (em pontos percentuais ao
+# ano) para todos os países, por continente ou por país, com KPIs, rankings e globo
+# recalculados na hora.
+#
+# O motor (`ScenarioEngine`) é montado uma vez por armazém a partir das linhas de
+# previsão do ano-alvo: vetores NumPy de PIB, CAGR, código do continente e anos até
+# o horizonte (ano-alvo - último ano histórico de cada país). Um cenário é só
+# aritmética sobre esses vetores:
+#     CAGR' = CAGR + Δ
+#     PIB'  = PIB * ((1 + CAGR') / (1 + CAGR)) ** anos
+# que é o PIB_base * (1 + CAGR') ** anos do ETL escrito em razão: com Δ = 0 devolve
+# exatamente o PIB do artefato, sem depender do PIB histórico. Os resultados ficam
+# memorizados por conjunto de deslocamentos (LRU), então voltar a um valor do slider
+# não recalcula nada, e KPIs/rankings por continente saem de fatias contíguas.
+#
+# `ScenarioResult.get(continente)` devolve registros no formato de aggregates.py, e
+# `lookup`, `rank_slice` e os KPIs dos apps funcionam sem mudanças.
+#
+# Executado como script, compara o custo de um cenário (novo e memorizado) com o
+# recálculo em pandas (merge com a base + build_aggregates).
+import argparse
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from aggregates import ALL_CONTINENTS, record_from_arrays
+from formatting import with_labels
+
+SCOPE_CONTINENT = "continent"
+SCOPE_COUNTRY = "country"
+SHIFT_RANGE_PP = (-5.0, 5.0)
+SHIFT_STEP_PP = 0.1
+MAX_CACHED_SCENARIOS = 256
+
+_engines = weakref.WeakKeyDictionary()
+_engines_lock = threading.Lock()
+
+
+# ─── 1) MOTOR ────────────────────────────────────────────────────
+def _scenario_key(shifts):
+    """Chave imutável de um conjunto de deslocamentos {(escopo, nome): p.p.}, sem os nulos."""
+    return tuple(sorted((scope, name, round(float(pp), 6)) for (scope, name), pp in shifts.items() if pp))
+
+
+class ScenarioEngine:
+    """
+    Vetores da previsão do ano-alvo e cenários memorizados sobre eles.
+
+    `df_forecast` deve vir ordenado por continente (como `DashboardStore.forecast()`);
+    `last_years` é uma função que devolve {país: último ano histórico}, chamada só no
+    primeiro cenário (o histórico é lido sob demanda).
+    """
+
+    def __init__(self, df_forecast, horizon_year, last_years, max_cached=MAX_CACHED_SCENARIOS):
+        self.frame = df_forecast
+        self.horizon_year = horizon_year
+        self.countries = df_forecast["Country"].to_numpy(dtype=object)
+        self.gdp = df_forecast["GDP_per_capita"].to_numpy(dtype="float64", na_value=np.nan)
+        self.cagr = df_forecast["CAGR"].to_numpy(dtype="float64", na_value=np.nan)
+        codes, uniques = pd.factorize(df_forecast["Continent"], sort=False)
+        self.continent_codes = codes
+        self.continent_index = {name: i for i, name in enumerate(uniques)}
+        self.ranges = {}
+        for i, name in enumerate(uniques):
+            rows = np.flatnonzero(codes == i)
+            self.ranges[name] = (int(rows[0]), int(rows[-1]) + 1)
+        self.country_rows = {}
+        for i, country in enumerate(self.countries):
+            self.country_rows.setdefault(country, []).append(i)
+        self._last_years = last_years
+        self._years = None
+        self._log_growth = None
+        self._results = OrderedDict()
+        self._max_cached = max_cached
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_store(cls, store, horizon_year):
+        """Motor sobre a previsão de um `DashboardStore` (últimos anos históricos lidos da série)."""
+        def last_years():
+            ts = store.timeseries(ALL_CONTINENTS)
+            hist = ts.loc[ts["Type"] == "Historic", ["Country", "Year"]]
+            return hist.groupby("Country")["Year"].max().to_dict()
+
+        return cls(store.forecast(), horizon_year, last_years)
+
+    def _base(self):
+        """Anos até o horizonte e log(1 + CAGR) de cada linha, calculados no primeiro cenário."""
+        if self._years is None:
+            with self._lock:
+                if self._years is None:
+                    last = pd.Series(self.countries).map(self._last_years()).to_numpy(dtype="float64",
+                                                                                      na_value=np.nan)
+                    years = self.horizon_year - last
+                    # Sem histórico, o CAGR do ETL é 0; o horizonte é o do último ano histórico da base
+                    default = np.nanmin(years) if np.isfinite(years).any() else 1.0
+                    years = np.where(np.isfinite(years) & (years > 0), years, default)
+                    with np.errstate(invalid="ignore", divide="ignore"):
+                        self._log_growth = np.log1p(self.cagr)
+                    self._years = years
+        return self._years, self._log_growth
+
+    def deltas(self, shifts):
+        """Δ do CAGR (fração ao ano) de cada linha para {(escopo, nome): p.p.}."""
+        delta = np.zeros(len(self.countries))
+        by_continent = np.zeros(len(self.continent_index) + 1)  # último = continente ausente
+        for (scope, name), pp in shifts.items():
+            value = float(pp) / 100
+            if scope == SCOPE_CONTINENT and name == ALL_CONTINENTS:
+                delta += value
+            elif scope == SCOPE_CONTINENT:
+                if name in self.continent_index:
+                    by_continent[self.continent_index[name]] += value
+            elif scope == SCOPE_COUNTRY:
+                delta[self.country_rows.get(name, [])] += value
+            else:
+                raise ValueError(f"Escopo de cenário desconhecido: {scope}")
+        return delta + by_continent[self.continent_codes]
+
+    def run(self, shifts):
+        """`ScenarioResult` dos deslocamentos {(escopo, nome): p.p.}, memorizado por conjunto."""
+        key = _scenario_key(shifts)
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                return result
+
+        years, log_growth = self._base()
+        cagr = self.cagr + self.deltas(dict(((scope, name), pp) for scope, name, pp in key))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratio = np.exp(years * (np.log1p(cagr) - log_growth))
+        # 1 + CAGR <= 0 não tem trajetória definida: o PIB da linha fica como no artefato
+        gdp = np.where(np.isfinite(ratio), self.gdp * ratio, self.gdp)
+        result = ScenarioResult(self, key, gdp, cagr)
+
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > self._max_cached:
+                self._results.popitem(last=False)
+        return result
+
+
+def engine_for(store, horizon_year):
+    """Motor do armazém (um por armazém e horizonte; some junto com o armazém)."""
+    with _engines_lock:
+        engines = _engines.setdefault(store, {})
+        engine = engines.get(horizon_year)
+        if engine is None:
+            engine = engines[horizon_year] = ScenarioEngine.from_store(store, horizon_year)
+    return engine
+
+
+# ─── 2) RESULTADO ────────────────────────────────────────────────
+class ScenarioResult:
+    """
+    PIB e CAGR de todos os países num cenário. `get(continente)` devolve o registro
+    no formato de `aggregates.py` (KPIs e ordens do ranking), calculado na primeira
+    consulta de cada continente; `frame(continente)` devolve a previsão com os
+    valores do cenário, para o globo.
+    """
+
+    def __init__(self, engine, key, gdp, cagr):
+        self.engine = engine
+        self.key = key
+        self.gdp = gdp
+        self.cagr = cagr
+        self._records = {}
+        self._frames = {}
+
+    def _slice(self, continent):
+        if continent == ALL_CONTINENTS:
+            return slice(0, len(self.gdp))
+        start, stop = self.engine.ranges.get(continent, (0, 0))
+        return slice(start, stop)
+
+    def _record(self, continent):
+        part = self._slice(continent)
+        return record_from_arrays(continent, self.engine.countries[part], self.gdp[part], self.cagr[part])
+
+    def get(self, continent, default=None):
+        if continent != ALL_CONTINENTS and continent not in self.engine.ranges:
+            return default
+        record = self._records.get(continent)
+        if record is None:
+            record = self._records[continent] = self._record(continent)
+        return record
+
+    def frame(self, continent=ALL_CONTINENTS) -> pd.DataFrame:
+        """Linhas de previsão do continente com PIB, CAGR e rótulos do cenário."""
+        df = self._frames.get(continent)
+        if df is None:
+            part = self._slice(continent)
+            base = self.engine.frame.iloc[part]
+            df = self._frames[continent] = with_labels(
+                base.assign(GDP_per_capita=self.gdp[part], CAGR=self.cagr[part]))
+        return df
+
+
+# ─── 3) CONTROLES DA BARRA LATERAL ───────────────────────────────
+def _target_label(target):
+    scope, name = target
+    if scope == SCOPE_CONTINENT and name == ALL_CONTINENTS:
+        return "Todos os países"
+    return name if scope == SCOPE_COUNTRY else f"{name} (continente)"
+
+
+def render_scenario_controls(st, engine, key="scenario"):
+    """
+    Ajustes do cenário na barra lateral: um alvo (todos, continente ou país) e o Δ do
+    CAGR em p.p. ao ano. Devolve o `ScenarioResult` ativo, ou None sem ajustes.
+    """
+    shifts = st.session_state.setdefault(f"{key}_shifts", {})
+    slider_prefix = f"{key}_delta_"
+
+    def store_shift(target, slider_key):
+        value = round(st.session_state[slider_key], 1)
+        if value:
+            shifts[target] = value
+        else:
+            shifts.pop(target, None)
+
+    def clear():
+        shifts.clear()
+        for widget_key in [k for k in st.session_state if str(k).startswith(slider_prefix)]:
+            del st.session_state[widget_key]
+
+    with st.sidebar.expander("🧪 Cenário (e se...)", expanded=bool(shifts)):
+        targets = ([(SCOPE_CONTINENT, ALL_CONTINENTS)]
+                   + [(SCOPE_CONTINENT, name) for name in sorted(engine.ranges)]
+                   + [(SCOPE_COUNTRY, name) for name in sorted(engine.country_rows)])
+        target = st.selectbox("Ajustar o crescimento de:", targets, format_func=_target_label, key=f"{key}_target")
+        slider_key = f"{slider_prefix}{target[0]}_{target[1]}"
+        st.slider("Δ CAGR (p.p. ao ano)", *SHIFT_RANGE_PP, value=float(shifts.get(target, 0.0)),
+                  step=SHIFT_STEP_PP, key=slider_key, on_change=store_shift, args=(target, slider_key))
+        if shifts:
+            st.caption("Ajustes ativos: " + "; ".join(
+                f"{_target_label(t)} {pp:+.1f} p.p." for t, pp in sorted(shifts.items())))
+            st.button("Limpar cenário", on_click=clear, key=f"{key}_clear")
+        st.caption("Aplica-se aos KPIs, ao ranking e ao globo.")
+    return engine.run(shifts) if shifts else None
+
+
+# ─── 4) BENCHMARK ────────────────────────────────────────────────
+def _pandas_scenario(engine, shifts):
+    """O mesmo cenário pelo caminho do ETL: merge com a base histórica e build_aggregates."""
+    from aggregates import build_aggregates
+    years, _ = engine._base()
+    df = engine.frame[["Country", "Continent", "GDP_per_capita", "CAGR"]].copy()
+    base = pd.DataFrame({"Country": engine.countries, "anos": years,
+                         "Base_GDP": engine.gdp / (1 + engine.cagr) ** years}).drop_duplicates("Country")
+    df = df.merge(base, on="Country", how="left")
+    df["CAGR"] = df["CAGR"] + engine.deltas(shifts)
+    df["GDP_per_capita"] = df["Base_GDP"] * (1 + df["CAGR"]) ** df["anos"]
+    return build_aggregates(df)
+
+
+def benchmark(engine, repeats=200):
+    """Tempo (µs) de um cenário novo, de um memorizado, do registro de um continente e do caminho em pandas."""
+    continent = next(iter(engine.ranges), ALL_CONTINENTS)
+    engine.run({})  # base histórica fora da medição
+    rows = {}
+
+    start = time.perf_counter()
+    for i in range(repeats):
+        engine.run({(SCOPE_CONTINENT, continent): -1 - i / 1000})
+    rows["cenario_novo_us"] = (time.perf_counter() - start) * 1e6 / repeats
+
+    shifts = {(SCOPE_CONTINENT, continent): -1.0}
+    start = time.perf_counter()
+    for _ in range(repeats):
+        engine.run(shifts)
+    rows["cenario_memorizado_us"] = (time.perf_counter() - start) * 1e6 / repeats
+
+    start = time.perf_counter()
+    for i in range(repeats):
+        engine.run({(SCOPE_CONTINENT, ALL_CONTINENTS): 2 + i / 1000}).get(continent)
+    rows["cenario_novo+kpis_continente_us"] = (time.perf_counter() - start) * 1e6 / repeats
+
+    pandas_repeats = max(1, repeats // 20)
+    start = time.perf_counter()
+    for _ in range(pandas_repeats):
+        _pandas_scenario(engine, shifts)
+    rows["pandas_merge+agregados_us"] = (time.perf_counter() - start) * 1e6 / pandas_repeats
+
+    check = _pandas_scenario(engine, shifts).set_index("Continent").loc[continent]
+    rows["max_gdp_diferenca_relativa"] = float(abs(engine.run(shifts).get(continent)["max_gdp"] / check["max_gdp"] - 1))
+    return {"linhas": len(engine.countries), **{k: round(v, 3) for k, v in rows.items()}}
+
+
+if __name__ == "__main__":
+    from data_store import DashboardStore, open_dataset
+
+    parser = argparse.ArgumentParser(description="Custo de um cenário vetorizado x recálculo em pandas.")
+    parser.add_argument("--year", type=int, default=2030)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+    dataset = open_dataset()
+    if dataset is None:
+        raise SystemExit("Dados não encontrados. Execute o script `preprocess_data.py` primeiro.")
+    store = DashboardStore.from_dataset(dataset, args.year)
+    print(benchmark(engine_for(store, args.year), args.repeats))
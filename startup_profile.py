@@ -0,0 +1,188 @@
+# Arquivo: startup_profile.py
+# Perfil de inicialização (cold start) dos dashboards.
+#
+# Dentro do app, `RunProfile` marca os tempos de cada execução do script: importações,
+# primeiro conteúdo enviado ao navegador (título + KPIs, o "first paint") e fim da
+# execução, e lista quais módulos pesados já estão carregados no processo. Os apps
+# importam Plotly Express, graph_objects e st_aggrid só dentro das funções que os
+# usam, então uma aba que não foi aberta não paga essas importações.
+# `track_cost` conta, por sessão, quantas vezes cada seção (script completo e cada
+# aba/fragmento) executou e quanto tempo gastou: com as abas como fragmentos, mover
+# o slider do ranking deve incrementar só a aba de ranking.
+# O perfil é exibido sob demanda: DASHBOARD_PROFILE=1 no ambiente (impresso no
+# console) ou ?profile=1 na URL (na barra lateral).
+#
+# Executado como script, mede numa instância nova do Python o tempo de importação
+# de cada módulo de topo dos apps e o tempo até a primeira execução completa do
+# script (streamlit.testing.AppTest):
+#   python startup_profile.py app.py dashboard_pib.py
+import argparse
+import ast
+import functools
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+PROFILE_ENV = "DASHBOARD_PROFILE"
+HEAVY_MODULES = ("plotly.express", "plotly.graph_objects", "st_aggrid", "geopandas", "matplotlib.pyplot")
+
+
+# ─── 1) PERFIL DENTRO DO APP ────────────────────────────────────
+class RunProfile:
+    """Marcas de tempo de uma execução do script do Streamlit (desde `start()`)."""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.marks = []
+
+    @classmethod
+    def start(cls):
+        return cls()
+
+    def mark(self, label):
+        self.marks.append((label, time.perf_counter() - self.t0))
+
+    def lines(self, st=None):
+        out = [f"{label}: {elapsed * 1000:,.1f} ms" for label, elapsed in self.marks]
+        loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+        out.append(f"Módulos pesados carregados: {', '.join(loaded) if loaded else 'nenhum'}")
+        if st is not None:
+            out.extend(RerunCost.for_session(st).lines())
+        return out
+
+    def emit(self, st):
+        """Mostra o perfil se pedido (variável de ambiente ou ?profile=1)."""
+        in_url = st.query_params.get("profile") == "1"
+        if os.environ.get(PROFILE_ENV) == "1":
+            print("[perfil de inicialização] " + " | ".join(self.lines(st)), flush=True)
+        if in_url:
+            with st.sidebar.expander("Perfil de inicialização", expanded=True):
+                st.text("\n".join(self.lines(st)))
+
+
+# ─── 2) CUSTO POR RERUN ─────────────────────────────────────────
+class RerunCost:
+    """Execuções e tempo acumulado de cada seção do app, por sessão."""
+
+    SESSION_KEY = "_rerun_cost"
+
+    def __init__(self):
+        self.runs = {}
+        self.ms = {}
+
+    @classmethod
+    def for_session(cls, st):
+        if cls.SESSION_KEY not in st.session_state:
+            st.session_state[cls.SESSION_KEY] = cls()
+        return st.session_state[cls.SESSION_KEY]
+
+    def add(self, name, elapsed_ms):
+        self.runs[name] = self.runs.get(name, 0) + 1
+        self.ms[name] = self.ms.get(name, 0.0) + elapsed_ms
+
+    def lines(self):
+        return [f"{name}: {self.runs[name]} execuções, {self.ms[name]:,.1f} ms" for name in self.runs]
+
+
+def track_cost(name):
+    """
+    Decorador que soma as execuções e o tempo da função no RerunCost da sessão. Use
+    por baixo de @st.fragment para contar também as reexecuções do fragmento.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            import streamlit as st
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                cost = RerunCost.for_session(st)
+                cost.add(name, (time.perf_counter() - start) * 1000)
+                if os.environ.get(PROFILE_ENV) == "1":
+                    print(f"[custo por rerun] {name}: execução {cost.runs[name]}", flush=True)
+        return wrapper
+    return decorator
+
+
+# ─── 3) PERFIL DE IMPORTAÇÃO (PROCESSO NOVO) ─────────────────────
+def top_level_imports(path):
+    """Módulos importados no nível de módulo do arquivo (importações dentro de funções ficam de fora)."""
+    tree = ast.parse(Path(path).read_text(encoding="utf-8"))
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def import_breakdown(modules):
+    """
+    Custo incremental (ms) de cada importação, na ordem dada, num processo novo: um
+    módulo já trazido por um anterior custa só o que faltava importar.
+    """
+    code = (
+        "import sys, time\n"
+        f"for name in {list(modules)!r}:\n"
+        "    t = time.perf_counter()\n"
+        "    __import__(name)\n"
+        "    print('__import__', name, (time.perf_counter() - t) * 1000)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    rows = [(name, float(ms)) for tag, name, ms in
+            (line.split() for line in result.stdout.splitlines() if line.startswith("__import__"))]
+    return rows, result.returncode
+
+
+def first_run_time(app, timeout=120):
+    """Tempo (s) da primeira execução completa do app num processo novo, sem contar o import do streamlit."""
+    code = (
+        "import time, streamlit\n"
+        "from streamlit.testing.v1 import AppTest\n"
+        "t = time.perf_counter()\n"
+        f"at = AppTest.from_file({str(ROOT / app)!r}, default_timeout={timeout}).run()\n"
+        "print('__elapsed__', time.perf_counter() - t, len(at.exception))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True,
+                            env={**os.environ, PROFILE_ENV: "1"})
+    elapsed, errors, profile = None, None, []
+    for line in result.stdout.splitlines():
+        if line.startswith("__elapsed__"):
+            _, elapsed, errors = line.split()
+            elapsed, errors = float(elapsed), int(errors)
+        elif line.startswith("[perfil de inicialização]"):
+            profile = line.split("] ", 1)[1].split(" | ")
+    return elapsed, errors, profile
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Perfil de inicialização dos dashboards.")
+    parser.add_argument("apps", nargs="*", default=["app.py", "dashboard_pib.py"])
+    parser.add_argument("--heavy", action="store_true",
+                        help="Inclui os módulos pesados importados sob demanda, para comparação.")
+    parser.add_argument("--no-run", action="store_true", help="Só o perfil de importação, sem executar o app.")
+    args = parser.parse_args()
+
+    for app in args.apps:
+        modules = top_level_imports(ROOT / app)
+        if args.heavy:
+            modules += [name for name in HEAVY_MODULES if name not in modules]
+        rows, code = import_breakdown(modules)
+        print(f"\n=== {app}: importações de topo ({sum(ms for _, ms in rows):,.0f} ms) ===")
+        for name, ms in sorted(rows, key=lambda row: -row[1]):
+            print(f"  {name:<32} {ms:>9,.1f} ms")
+        if code:
+            print("  (falha ao importar algum módulo)")
+        if not args.no_run:
+            elapsed, errors, profile = first_run_time(app)
+            if elapsed is None:
+                print("  Primeira execução: falhou")
+                continue
+            print(f"  Primeira execução do script: {elapsed * 1000:,.0f} ms ({errors} exceções)")
+            for line in profile:
+                print(f"    {line}")
@@ -0,0 +1,40 @@
+# Arquivo: tests/test_artifact_builder.py
+# Regressão do `ArtifactBuilder.refresh`: um artefato regravado por um
+# `preprocess_data.py` externo segue "em dia" antes e depois, mas o armazém em cache
+# precisa ser recarregado (a `generation` tem de mudar).
+#
+# Uso: python -m pytest -q tests
+import pandas as pd
+
+from benchmarks.synthetic_data import generate
+from data_store import ArtifactBuilder
+from preprocess_data import SOURCES, preprocess_data
+
+
+def _edit_forecast(data_dir):
+    path = data_dir / SOURCES["forecast"]
+    df = pd.read_csv(path)
+    df.loc[df.index[0], "GDP per capita"] *= 1.5
+    df.to_csv(path, index=False)
+
+
+def test_refresh_sem_mudancas_mantem_a_geracao(tmp_path):
+    generate(tmp_path, scale=1)
+    preprocess_data(data_dir=tmp_path)
+    builder = ArtifactBuilder(tmp_path)
+    assert builder.refresh() is None
+    assert builder.refresh() is None
+    assert builder.generation == 0
+
+
+def test_refresh_detecta_reconstrucao_externa(tmp_path):
+    generate(tmp_path, scale=1)
+    preprocess_data(data_dir=tmp_path)
+    builder = ArtifactBuilder(tmp_path)
+    assert builder.refresh() is None
+
+    _edit_forecast(tmp_path)
+    preprocess_data(incremental=True, data_dir=tmp_path)
+
+    assert builder.refresh() is None
+    assert builder.generation == 1
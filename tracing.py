@@ -0,0 +1,191 @@
+# Arquivo: tracing.py
+# Spans leves em volta dos caminhos quentes de cada rerun dos dashboards: carga de
+# dados, filtros, KPIs, construção de figuras, tabela detalhada e exportação.
+#
+# Desligado por padrão: `span()` devolve um objeto nulo compartilhado e o custo é o
+# de uma chamada de função. Com DASHBOARD_TRACE=1, cada span grava uma linha JSON em
+# data/cache/traces/spans.jsonl (ou em DASHBOARD_TRACE_FILE) com o tempo de parede,
+# as linhas processadas, a sessão, o número da execução do script e a seleção da
+# barra lateral (`set_selection`). Com DASHBOARD_TRACE=memory, também os bytes
+# alocados durante o span (tracemalloc + pool do Arrow; bem mais lento).
+#
+# Executado como script, agrega o arquivo em p50/p95 por span e por seleção:
+#   python tracing.py                  # por span
+#   python tracing.py --by selection   # por span e seleção da barra lateral
+import argparse
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+TRACE_ENV = "DASHBOARD_TRACE"
+TRACE_FILE_ENV = "DASHBOARD_TRACE_FILE"
+DEFAULT_TRACE_FILE = ROOT / "data" / "cache" / "traces" / "spans.jsonl"
+SELECTION_KEY = "_trace_selection"
+RUN_KEY = "_trace_run"
+
+MODE = os.environ.get(TRACE_ENV, "").strip().lower()
+ENABLED = MODE in ("1", "true", "memory")
+TRACE_MEMORY = MODE == "memory"
+
+_parent = contextvars.ContextVar("trace_parent", default=None)
+
+
+# ─── 1) SPANS ────────────────────────────────────────────────────
+class _NoopSpan:
+    """Span desligado: aceita `rows` e atributos, não mede nem grava nada."""
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def _allocated_bytes():
+    pa = sys.modules.get("pyarrow")
+    return tracemalloc.get_traced_memory()[0] + (pa.total_allocated_bytes() if pa is not None else 0)
+
+
+def _session_info():
+    """(id curto da sessão, execução do script, seleção) da sessão do Streamlit, se houver."""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx(suppress_warning=True)
+        if ctx is None:
+            return None, None, None
+        state = ctx.session_state
+        return ctx.session_id[:8], state[RUN_KEY] if RUN_KEY in state else None, \
+            state[SELECTION_KEY] if SELECTION_KEY in state else None
+    except Exception:
+        return None, None, None
+
+
+class Span:
+    """Span ligado: mede ao sair e grava um registro. `rows` pode ser preenchido dentro do bloco."""
+
+    def __init__(self, name, rows=None, attrs=None):
+        self.name = name
+        self.rows = rows
+        self.attrs = attrs or {}
+
+    def __enter__(self):
+        self._token = _parent.set(self.name)
+        self._parent_name = self._token.old_value if self._token.old_value is not contextvars.Token.MISSING else None
+        if TRACE_MEMORY:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            self._bytes0 = _allocated_bytes()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall_ms = (time.perf_counter() - self._t0) * 1000
+        _parent.reset(self._token)
+        session, run, selection = _session_info()
+        record = {"ts": round(time.time(), 3), "span": self.name, "parent": self._parent_name,
+                  "wall_ms": round(wall_ms, 3), "rows": None if self.rows is None else int(self.rows),
+                  "bytes": _allocated_bytes() - self._bytes0 if TRACE_MEMORY else None,
+                  "session": session, "run": run, "selection": selection, "error": exc_type is not None}
+        if self.attrs:
+            record["attrs"] = self.attrs
+        _SINK.write(record)
+        return False
+
+
+def span(name, rows=None, **attrs):
+    """Context manager de um span; desligado, devolve o span nulo compartilhado."""
+    if not ENABLED:
+        return _NOOP
+    return Span(name, rows, attrs)
+
+
+def set_selection(st, **selection):
+    """Registra a seleção da barra lateral e conta a execução do script (chamar uma vez por rerun)."""
+    if not ENABLED:
+        return
+    st.session_state[SELECTION_KEY] = selection
+    st.session_state[RUN_KEY] = st.session_state.get(RUN_KEY, 0) + 1
+
+
+# ─── 2) ARQUIVO JSONL ────────────────────────────────────────────
+class _Sink:
+    """Arquivo JSONL de spans, aberto em modo append na primeira gravação."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._fh = None
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            if self._fh is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._fh = open(self.path, "a", encoding="utf-8", buffering=1)
+            self._fh.write(line)
+
+
+_SINK = _Sink(os.environ.get(TRACE_FILE_ENV) or DEFAULT_TRACE_FILE)
+
+
+# ─── 3) RELATÓRIO ────────────────────────────────────────────────
+def load_spans(path=DEFAULT_TRACE_FILE):
+    import pandas as pd
+    records = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    df = pd.DataFrame.from_records(records)
+    if df.empty:
+        return df
+    df["selection"] = df["selection"].map(
+        lambda sel: ", ".join(f"{k}={v}" for k, v in sorted(sel.items())) if isinstance(sel, dict) else "-")
+    return df
+
+
+def report(df, by=("span",)):
+    """p50/p95 do tempo de parede (e linhas/bytes medianos) agrupados por `by`."""
+    by = list(by)
+    grouped = df.groupby(by, dropna=False)
+    out = grouped["wall_ms"].describe(percentiles=[0.5, 0.95])[["count", "50%", "95%", "max"]]
+    out = out.rename(columns={"count": "n", "50%": "p50_ms", "95%": "p95_ms", "max": "max_ms"})
+    out["rows_p50"] = grouped["rows"].median()
+    if "bytes" in df and df["bytes"].notna().any():
+        out["bytes_p50"] = grouped["bytes"].median()
+        out["bytes_p95"] = grouped["bytes"].quantile(0.95)
+    out["n"] = out["n"].astype(int)
+    if len(by) == 1:
+        return out.sort_values("p95_ms", ascending=False)
+    return out.sort_values([by[0], "p95_ms"], ascending=[True, False])
+
+
+if __name__ == "__main__":
+    import pandas as pd
+    parser = argparse.ArgumentParser(description="p50/p95 dos spans gravados pelos dashboards.")
+    parser.add_argument("--file", default=os.environ.get(TRACE_FILE_ENV) or str(DEFAULT_TRACE_FILE))
+    parser.add_argument("--by", choices=["span", "selection"], default="span",
+                        help="Agrupar só por span ou por span e seleção da barra lateral.")
+    args = parser.parse_args()
+    if not Path(args.file).exists():
+        raise SystemExit(f"Arquivo de spans não encontrado: {args.file} (rode os apps com {TRACE_ENV}=1).")
+    spans = load_spans(args.file)
+    if spans.empty:
+        raise SystemExit("Nenhum span registrado.")
+    keys = ["span"] if args.by == "span" else ["span", "selection"]
+    with pd.option_context("display.width", 160, "display.max_rows", 500, "display.float_format", "{:,.2f}".format):
+        print(report(spans, keys).to_string())
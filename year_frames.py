@@ -0,0 +1,226 @@
+# Arquivo: year_frames.py
+# Todos os anos do horizonte da previsão (ex.: 2023–2030) para o seletor de ano dos
+# dashboards e a animação do globo.
+#
+# O ETL já grava a trajetória da previsão (Type = "Forecast" em todos os anos); o
+# `YearCube` a guarda como uma matriz ano x país (float64, países na ordem de
+# `DashboardStore.forecast()`), montada uma vez por armazém. O CAGR de cada ano é
+# o acumulado desde o último ano histórico, como o do ETL para o ano-alvo (que é
+# usado tal como gravado), e os registros de KPIs/ranking de todos os anos e
+# continentes são calculados numa única passada, no formato de aggregates.py.
+#
+# O globo recebe uma figura só, com um quadro Plotly por ano: cada quadro leva
+# apenas z e os valores do hover (float32, codificados em binário pelo Plotly), sem
+# geometrias nem rótulos de texto. O slider e o botão de animação trocam os quadros
+# no navegador, sem rerun nem recálculo.
+#
+# Executado como script, compara o tamanho e o tempo de construção do globo de um
+# ano com o globo animado de todos os anos.
+import argparse
+import json
+import threading
+import time
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from aggregates import ALL_CONTINENTS, record_from_arrays
+from figure_cache import content_hash
+
+FRAME_DURATION_MS = 700
+
+_cubes = weakref.WeakKeyDictionary()
+_cubes_lock = threading.Lock()
+
+
+# ─── 1) MATRIZ ANO x PAÍS ────────────────────────────────────────
+class YearCube:
+    """
+    PIB (e CAGR acumulado) de cada país em cada ano do horizonte.
+
+    `df_forecast` são as linhas do ano-alvo ordenadas por continente; `df_path`, as
+    linhas de previsão de todos os anos (País/Ano/PIB); `last_historic` é uma função
+    que devolve um DataFrame (País, Last_Hist_Year, Last_Hist_GDP), chamada só na
+    primeira consulta de KPIs ou quadros (o histórico é lido sob demanda).
+    """
+
+    def __init__(self, df_forecast, df_path, horizon_year, last_historic):
+        self.frame = df_forecast
+        self.horizon_year = horizon_year
+        self.countries = df_forecast["Country"].to_numpy(dtype=object)
+        years = df_path.loc[df_path["Year"] <= horizon_year, "Year"].astype("int64").unique()
+        self.years = np.union1d(years, [horizon_year])
+
+        # Linhas da trajetória -> (ano, coluna); um país repetido em dois continentes ocupa duas colunas
+        columns = pd.DataFrame({"Country": self.countries, "col": np.arange(len(self.countries))})
+        cells = df_path.loc[df_path["Year"] <= horizon_year].merge(columns, on="Country")
+        self.gdp = np.full((len(self.years), len(self.countries)), np.nan)
+        self.gdp[np.searchsorted(self.years, cells["Year"].to_numpy()), cells["col"].to_numpy()] = \
+            cells["GDP_per_capita"].to_numpy(dtype="float64", na_value=np.nan)
+        self.gdp[-1] = df_forecast["GDP_per_capita"].to_numpy(dtype="float64", na_value=np.nan)
+
+        self.ranges = {}
+        for continent, group in pd.Series(np.arange(len(self.countries))).groupby(
+                df_forecast["Continent"].to_numpy(), sort=False):
+            self.ranges[continent] = (int(group.iloc[0]), int(group.iloc[-1]) + 1)
+        self.key = content_hash("year_cube", horizon_year, tuple(self.years), df_forecast[["Country", "Continent"]],
+                                pd.DataFrame(self.gdp))
+        self._last_historic = last_historic
+        self._cagr = None
+        self._records = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_store(cls, store, horizon_year):
+        """Matriz sobre a previsão de um `DashboardStore` (base histórica lida da série temporal)."""
+        def last_historic():
+            ts = store.timeseries(ALL_CONTINENTS)
+            hist = ts.loc[ts["Type"] == "Historic", ["Country", "Year", "GDP_per_capita"]]
+            last = hist.loc[hist.groupby("Country")["Year"].idxmax()]
+            return last.rename(columns={"Year": "Last_Hist_Year", "GDP_per_capita": "Last_Hist_GDP"})
+
+        return cls(store.forecast(), store.forecast_path(), horizon_year, last_historic)
+
+    def row(self, year):
+        """Índice do ano na matriz (KeyError fora do horizonte)."""
+        i = int(np.searchsorted(self.years, year))
+        if i == len(self.years) or self.years[i] != year:
+            raise KeyError(year)
+        return i
+
+    @property
+    def cagr(self):
+        """CAGR acumulado do último ano histórico até cada ano (mesma regra e mesmos zeros do ETL)."""
+        if self._cagr is None:
+            with self._lock:
+                if self._cagr is None:
+                    base = pd.DataFrame({"Country": self.countries}).merge(
+                        self._last_historic(), on="Country", how="left")
+                    last_year = base["Last_Hist_Year"].to_numpy(dtype="float64", na_value=np.nan)
+                    last_gdp = base["Last_Hist_GDP"].to_numpy(dtype="float64", na_value=np.nan)
+                    anos = self.years[:, None] - last_year[None, :]
+                    valid = (last_gdp > 0) & (anos > 0) & ~np.isnan(self.gdp)
+                    with np.errstate(invalid="ignore", divide="ignore"):
+                        cagr = np.where(valid, (self.gdp / last_gdp) ** (1 / anos) - 1, 0.0)
+                    cagr[-1] = self.frame["CAGR"].to_numpy(dtype="float64", na_value=np.nan)
+                    self._cagr = cagr
+        return self._cagr
+
+    def aggregates(self, year):
+        """{continente: registro} do ano (KPIs e ranking), com todos os anos calculados na primeira chamada."""
+        if self._records is None:
+            cagr = self.cagr
+            records = {}
+            for i, y in enumerate(self.years):
+                parts = [(ALL_CONTINENTS, slice(0, len(self.countries)))]
+                parts += [(c, slice(start, stop)) for c, (start, stop) in self.ranges.items()]
+                records[int(y)] = {c: record_from_arrays(c, self.countries[part], self.gdp[i, part], cagr[i, part])
+                                   for c, part in parts}
+            with self._lock:
+                if self._records is None:
+                    self._records = records
+        return self._records[int(year)]
+
+
+def cube_for(store, horizon_year):
+    """Matriz do armazém (uma por armazém e horizonte; some junto com o armazém)."""
+    with _cubes_lock:
+        cubes = _cubes.setdefault(store, {})
+        cube = cubes.get(horizon_year)
+        if cube is None:
+            cube = cubes[horizon_year] = YearCube.from_store(store, horizon_year)
+    return cube
+
+
+# ─── 2) GLOBO ANIMADO ────────────────────────────────────────────
+def _hovertemplate(year):
+    return ("<b>%{text}</b><br><br>"
+            f"PIB per Capita ({year}): %{{customdata[0]:$,.0f}}<br>"
+            f"CAGR (até {year}): %{{customdata[1]:.2%}}"
+            "<extra></extra>")
+
+
+def add_year_frames(fig, cube, year, z_transform):
+    """
+    Transforma a figura de globo de um ano (traço 0 com o país em customdata[0]) na
+    figura animada: um quadro por ano do cubo, slider de anos e botão de animação,
+    começando em `year`. `z_transform` é a escala de cor do app (ex.: np.log1p),
+    aplicada a todos os anos com a mesma faixa de cores.
+    """
+    import plotly.graph_objects as go
+
+    trace = fig.data[0]
+    countries = [row[0] for row in trace.customdata]
+    position = {}
+    for col, country in enumerate(cube.countries):
+        position.setdefault(country, col)
+    cols = np.array([position[c] for c in countries], dtype=int)
+
+    gdp = cube.gdp[:, cols]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = np.asarray(z_transform(gdp), dtype="float64")
+    finite = z[np.isfinite(z)]
+    hover = np.stack([gdp, cube.cagr[:, cols]], axis=-1).astype("float32")
+    z = z.astype("float32")
+
+    frames = [go.Frame(name=str(y), traces=[0],
+                       data=[go.Choropleth(z=z[i], customdata=hover[i], hovertemplate=_hovertemplate(y))])
+              for i, y in enumerate(cube.years)]
+    start = cube.row(year)
+    fig.update_traces(selector=0, text=countries, z=z[start], customdata=hover[start],
+                      hovertemplate=_hovertemplate(year),
+                      zmin=float(finite.min()) if finite.size else None,
+                      zmax=float(finite.max()) if finite.size else None)
+    fig.frames = frames
+
+    step_args = {"mode": "immediate", "frame": {"duration": 0, "redraw": True}, "transition": {"duration": 0}}
+    play_args = {"frame": {"duration": FRAME_DURATION_MS, "redraw": True}, "fromcurrent": True,
+                 "transition": {"duration": 0}}
+    fig.update_layout(
+        sliders=[dict(active=start, currentvalue={"prefix": "Ano: "}, pad={"t": 10, "b": 10}, x=0.08, len=0.9,
+                      steps=[dict(method="animate", label=str(y), args=[[str(y)], step_args]) for y in cube.years])],
+        updatemenus=[dict(type="buttons", showactive=False, x=0.0, y=0.0, xanchor="left", yanchor="top",
+                          pad={"t": 10}, buttons=[dict(label="▶", method="animate", args=[None, play_args])])],
+        margin={"r": 0, "t": 0, "l": 0, "b": 60},
+    )
+    return fig
+
+
+# ─── 3) BENCHMARK ────────────────────────────────────────────────
+def benchmark(cube, create_globe, z_transform, repeats=5):
+    """JSON (KB) e tempo de construção do globo de um ano x o animado com todos os anos."""
+    result = {"anos": len(cube.years), "paises": len(cube.countries)}
+    cases = {
+        "um_ano": lambda: create_globe(cube.frame),
+        "animado": lambda: add_year_frames(create_globe(cube.frame), cube, cube.horizon_year, z_transform),
+    }
+    cube.aggregates(cube.horizon_year)  # base histórica e registros fora da medição
+    create_globe(cube.frame)  # importação do Plotly e templates fora da medição
+    for name, build in cases.items():
+        start = time.perf_counter()
+        for _ in range(repeats):
+            fig_json = build().to_json()
+        result[name] = {"json_kb": round(len(fig_json) / 1024, 1),
+                        "build_ms": round((time.perf_counter() - start) * 1000 / repeats, 1)}
+    start = time.perf_counter()
+    for y in cube.years:
+        cube.aggregates(y)
+    result["kpis_todos_os_anos_us"] = round((time.perf_counter() - start) * 1e6, 1)
+    return result
+
+
+if __name__ == "__main__":
+    from data_store import DashboardStore, open_dataset
+
+    parser = argparse.ArgumentParser(description="Globo de um ano x globo animado com todos os anos da previsão.")
+    parser.add_argument("--year", type=int, default=2030)
+    args = parser.parse_args()
+    dataset = open_dataset()
+    if dataset is None:
+        raise SystemExit("Dados não encontrados. Execute o script `preprocess_data.py` primeiro.")
+    import app
+    import streamlit.logger
+    streamlit.logger.set_log_level("error")
+    store = DashboardStore.from_dataset(dataset, args.year)
+    print(json.dumps(benchmark(cube_for(store, args.year), app.create_plotly_globe_map, np.log1p), indent=1))